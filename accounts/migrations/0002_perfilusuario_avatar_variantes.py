@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='perfilusuario',
+            name='avatar_variantes',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -2,11 +2,14 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.db.models.signals import post_save
 from django.dispatch import receiver
+from heladeria.imagenes import programar_variantes
 
 class PerfilUsuario(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     telefono = models.CharField(max_length=15, blank=True, null=True)
     avatar = models.ImageField(upload_to='avatars/', default='avatars/default.png')
+    # Copias reducidas WebP/JPEG del avatar (heladeria.imagenes)
+    avatar_variantes = models.JSONField(default=dict, blank=True)
 
     def __str__(self):
         return self.user.username
@@ -20,3 +23,7 @@ def crear_perfil(sender, instance, created, **kwargs):
 def guardar_perfil(sender, instance, **kwargs):
     instance.perfilusuario.save()
 
+@receiver(post_save, sender=PerfilUsuario)
+def programar_variantes_avatar(sender, instance, raw=False, **kwargs):
+    if not raw:
+        programar_variantes(instance, 'avatar')
@@ -8,6 +8,7 @@ from .forms import PerfilUsuarioForm, UserForm, CambiarPasswordForm
 from django.contrib.auth import update_session_auth_hash
 from .forms import LoginForm
 from django.urls import reverse_lazy
+from heladeria.permisos import tiene_grupo
 
 def register(request):
     if request.method == "POST":
@@ -77,7 +78,7 @@ class CustomLoginView(LoginView):
     def get_success_url(self):
         user = self.request.user
         # Verifica si el usuario pertenece al grupo Admin
-        if user.groups.filter(name="Admin").exists():
+        if tiene_grupo(user, "Admin"):
             return reverse_lazy('reporte_dashboard')  # tu URL del dashboard
         else:
             return reverse_lazy('pos_home')  # tu URL actual del POS
\ No newline at end of file
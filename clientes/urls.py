@@ -10,5 +10,6 @@ urlpatterns = [
     path("eliminar-multiples/", views.eliminar_clientes_multiples, name="eliminar_clientes_multiples"),
     path('<int:cliente_id>/', views.detalle_cliente, name='detalle_cliente'),
     path('ajax/', views.lista_clientes_ajax, name='lista_clientes_ajax'),
+    path('buscar/', views.buscar_clientes_ajax, name='buscar_clientes_ajax'),
     path('<int:cliente_id>/detalle/ajax/',views.detalle_cliente_ajax, name="detalle_cliente_ajax"),
 ]
@@ -1,19 +1,24 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from heladeria.models import Cliente, Venta
+from heladeria.models import Cliente, DetalleVenta, Venta
 from django import forms
 from django.core.exceptions import ValidationError
 import re, json, openpyxl 
-from django.utils.timezone import localtime
 from django.contrib.auth.decorators import login_required
 from django.http import HttpResponse, JsonResponse
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
-from django.db.models import Q, Sum, F, DecimalField, ExpressionWrapper
-from collections import defaultdict
-from decimal import Decimal
+from django.db.models import Count, Q, Sum, F, DecimalField, ExpressionWrapper
+from django.db.models.functions import TruncMonth
 import pandas as pd
 from django.utils.timezone import make_naive
 from clientes.forms import ClienteForm
+from heladeria.busqueda import filtrar_clientes
 from heladeria.decorators import grupo_requerido
+from heladeria.exportacion import exportar, filas_clientes
+from heladeria.paginacion import apaginar, paginar, total_listado
+from heladeria.permisos import ausuario
+
+# Columnas sin nulos por las que se puede paginar con cursor
+CAMPOS_CURSOR_CLIENTES = ("nombre", "apellido", "rut", "email", "fecha_registro", "id")
 
 @login_required
 def lista_clientes(request):
@@ -29,21 +34,14 @@ def lista_clientes(request):
     clientes = Cliente.objects.all()
 
     if query:
-        clientes = clientes.filter(
-            Q(rut__icontains=query) |
-            Q(nombre__icontains=query) |
-            Q(telefono__icontains=query) |
-            Q(email__icontains=query)
-        )
+        clientes = filtrar_clientes(clientes, query)
 
     if direction == "desc":
         clientes = clientes.order_by(f"-{sort}")
     else:
         clientes = clientes.order_by(sort)
 
-    paginator = Paginator(clientes, per_page)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginar(request, clientes, sort, direction, per_page, CAMPOS_CURSOR_CLIENTES)
 
     next_direction = "desc" if direction == "asc" else "asc"
     rangos_pagina = [5, 10, 20, 50]
@@ -55,11 +53,12 @@ def lista_clientes(request):
         "direction": direction,
         "next_direction": next_direction,
         "per_page": per_page,
-        "total_clientes": paginator.count,
+        "total_clientes": total_listado(page_obj),
     })
 
 @login_required
-def lista_clientes_ajax(request):
+async def lista_clientes_ajax(request):
+    await ausuario(request)
     query = request.GET.get("q", "")
     sort = request.GET.get("sort", "nombre")
     direction = request.GET.get("direction", "asc")
@@ -72,21 +71,14 @@ def lista_clientes_ajax(request):
     clientes = Cliente.objects.all()
 
     if query:
-        clientes = clientes.filter(
-            Q(rut__icontains=query) |
-            Q(nombre__icontains=query) |
-            Q(telefono__icontains=query) |
-            Q(email__icontains=query)
-        )
+        clientes = filtrar_clientes(clientes, query)
 
     if direction == "desc":
         clientes = clientes.order_by(f"-{sort}")
     else:
         clientes = clientes.order_by(sort)
 
-    paginator = Paginator(clientes, per_page)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    page_obj = await apaginar(request, clientes, sort, direction, per_page, CAMPOS_CURSOR_CLIENTES)
 
     html = render(
         request,
@@ -98,12 +90,40 @@ def lista_clientes_ajax(request):
             "direction": direction,
             "next_direction": "desc" if direction == "asc" else "asc",
             "per_page": per_page,
-            "total_clientes": paginator.count,
+            "total_clientes": total_listado(page_obj),
         }
     ).content.decode("utf-8")
 
     return JsonResponse({"html": html})
 
+LIMITE_AUTOCOMPLETAR = 20
+
+
+@login_required
+def buscar_clientes_ajax(request):
+    query = (request.GET.get("q") or "").strip()
+
+    try:
+        limite = max(1, min(int(request.GET.get("limit", 10)), LIMITE_AUTOCOMPLETAR))
+    except (TypeError, ValueError):
+        limite = 10
+
+    if len(query) < 2:
+        return JsonResponse({"resultados": []})
+
+    clientes = (
+        filtrar_clientes(Cliente.objects.all(), query)
+        .only("id", "rut", "nombre", "apellido", "email")
+        .order_by("nombre", "apellido")[:limite]
+    )
+
+    return JsonResponse({
+        "resultados": [
+            {"id": c.id, "nombre": c.nombre_completo, "rut": c.rut, "email": c.email}
+            for c in clientes
+        ]
+    })
+
 @login_required
 def crear_cliente(request):
     mensaje = None
@@ -186,24 +206,7 @@ def eliminar_cliente(request):
 
 @login_required
 def exportar_clientes_excel(request):
-    clientes = Cliente.objects.all()
-
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Clientes"
-
-    ws.append(["RUT", "Nombre", "Dirección", "Teléfono", "Email", "Fecha de registro"])
-
-    for c in clientes:
-        ws.append([c.rut, c.nombre, c.direccion, c.telefono, c.email, c.fecha_registro.strftime("%Y-%m-%d %H:%M")])
-
-    response = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
-    response["Content-Disposition"] = 'attachment; filename="clientes.xlsx"'
-
-    wb.save(response)
-    return response
+    return exportar(request, "clientes", "Clientes", *filas_clientes())
 
 @login_required
 def eliminar_clientes_multiples(request):
@@ -230,16 +233,8 @@ def _get_filtered_queryset_cliente(cliente, params):
             cliente=cliente,
             estado__in=["COMPLETED", "PENDING", "CANCELLED"]
         )
-        .annotate(
-            total_calculado=Sum(
-                ExpressionWrapper(
-                    F("detalleventa__cantidad") * F("detalleventa__producto__precio"),
-                    output_field=DecimalField(max_digits=12, decimal_places=2)
-                )
-            )
-        )
+        .annotate(total_calculado=F("total"))
         .order_by("-fecha")
-        .prefetch_related("detalleventa_set__producto")
     )
 
     estado = params.get("estado")
@@ -260,10 +255,12 @@ def _get_filtered_queryset_cliente(cliente, params):
         except ValueError:
             pass
 
-    total_pedidos = ventas.count()
-    total_compras = ventas.aggregate(
-        total=Sum("total_calculado")
-    )["total"] or 0
+    totales = ventas.aggregate(
+        total_pedidos=Count("id"),
+        total_compras=Sum("total_calculado", default=0),
+    )
+    total_pedidos = totales["total_pedidos"]
+    total_compras = totales["total_compras"]
 
     avg_order_value = (
         round(total_compras / total_pedidos, 2)
@@ -278,6 +275,51 @@ def _get_filtered_queryset_cliente(cliente, params):
 
     return ventas, stats
 
+def _series_mensuales(ventas):
+    """Gasto total, pedidos y ticket promedio por mes (hora local de la tienda), en una consulta."""
+    por_mes = (
+        ventas
+        .annotate(mes=TruncMonth("fecha"))
+        .order_by()
+        .values("mes")
+        .annotate(pedidos=Count("id"), gasto=Sum("total_calculado", default=0))
+        .order_by("mes")
+    )
+    labels, promedio, total = [], [], []
+    for fila in por_mes:
+        labels.append(fila["mes"].strftime("%Y-%m"))
+        total.append(float(round(fila["gasto"], 2)))
+        promedio.append(float(round(fila["gasto"] / fila["pedidos"], 2)))
+    return labels, promedio, total
+
+
+def _mezcla_productos(ventas, umbral=5):
+    """
+    Unidades compradas por producto en las ventas dadas, en una consulta.
+    Los productos con menos del umbral (%) del total se agrupan en "Otros".
+    """
+    por_producto = (
+        DetalleVenta.objects
+        .filter(venta__in=ventas.order_by().values("id"))
+        .values("producto_id", "producto__nombre")
+        .annotate(unidades=Sum("cantidad"))
+        .order_by("-unidades")
+    )
+    filas = list(por_producto)
+    total_items = sum(fila["unidades"] for fila in filas)
+
+    labels, counts, otros = [], [], 0
+    for fila in filas:
+        if fila["unidades"] * 100 < umbral * total_items:
+            otros += fila["unidades"]
+        else:
+            labels.append(fila["producto__nombre"])
+            counts.append(fila["unidades"])
+    if otros:
+        labels.append("Otros")
+        counts.append(otros)
+    return labels, counts
+
 @login_required
 def detalle_cliente(request, cliente_id):
     cliente = get_object_or_404(Cliente, pk=cliente_id)
@@ -306,49 +348,8 @@ def detalle_cliente(request, cliente_id):
         df.to_excel(response, index=False)
         return response
 
-    gastos_por_mes = defaultdict(Decimal)
-    total_por_mes = defaultdict(Decimal)
-
-    for v in ventas:
-        key = localtime(v.fecha).strftime("%Y-%m")
-        gastos_por_mes[key] += Decimal(str(v.total_calculado or 0))
-        total_por_mes[key] += Decimal(str(v.total_calculado or 0))
-
-    monthly_labels = list(gastos_por_mes.keys())
-    monthly_avg_spend = [
-        float(round(
-            gastos_por_mes[m] /
-            (ventas.filter(
-                fecha__year=m.split("-")[0],
-                fecha__month=m.split("-")[1]
-            ).count() or 1),
-            2
-        ))
-        for m in monthly_labels
-    ]
-    monthly_total_spend = [float(round(total_por_mes[m], 2)) for m in monthly_labels]
-
-    productos = defaultdict(int)
-    total_items = 0
-
-    for v in ventas:
-        for d in v.detalleventa_set.all():
-            productos[d.producto.nombre] += d.cantidad
-            total_items += d.cantidad
-
-    product_labels, product_counts, otros = [], [], 0
-
-    for nombre, cantidad in productos.items():
-        porcentaje = (cantidad / total_items) * 100 if total_items else 0
-        if porcentaje < 5:
-            otros += cantidad
-        else:
-            product_labels.append(nombre)
-            product_counts.append(cantidad)
-
-    if otros:
-        product_labels.append("Otros")
-        product_counts.append(otros)
+    monthly_labels, monthly_avg_spend, monthly_total_spend = _series_mensuales(ventas)
+    product_labels, product_counts = _mezcla_productos(ventas)
 
     return render(request, "clientes/detalle_cliente.html", {
         "cliente": cliente,
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Producto, Venta, DetalleVenta, Cliente, Categoria
+from .models import Producto, Venta, DetalleVenta, Cliente, Categoria, TareaFondo
+from .resumen import editar_lineas, sincronizar_resumen
 
 admin.site.site_header = "Heladería"
 admin.site.site_title = "Heladería Admin"
@@ -33,6 +34,22 @@ class DetalleVentaAdmin(admin.ModelAdmin):
     ordering = ("venta", "producto")
     list_select_related = ("venta", "producto")
 
+    # Editar líneas cambia los totales de la venta y el resumen diario
+    def save_model(self, request, obj, form, change):
+        ventas = {obj.venta_id}
+        if change:
+            ventas.update(DetalleVenta.objects.filter(pk=obj.pk).values_list("venta_id", flat=True))
+        with editar_lineas(ventas):
+            super().save_model(request, obj, form, change)
+
+    def delete_model(self, request, obj):
+        with editar_lineas([obj.venta_id]):
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        with editar_lineas(set(queryset.values_list("venta_id", flat=True))):
+            super().delete_queryset(request, queryset)
+
 @admin.register(Venta)
 class VentaAdmin(admin.ModelAdmin):
     list_display = ("id", "usuario", "fecha", "total")
@@ -41,9 +58,36 @@ class VentaAdmin(admin.ModelAdmin):
     ordering = ("-fecha",)
     inlines = [DetalleVentaInline]
     list_select_related = ("usuario",)
-    
+
+    # La venta (estado, fecha) y sus líneas se guardan por separado; cada paso
+    # aplica su propia diferencia al resumen
+    def save_model(self, request, obj, form, change):
+        if not change:
+            return super().save_model(request, obj, form, change)
+        with sincronizar_resumen([obj.pk]):
+            super().save_model(request, obj, form, change)
+
+    def save_related(self, request, form, formsets, change):
+        with editar_lineas([form.instance.pk]):
+            super().save_related(request, form, formsets, change)
+
+    def delete_model(self, request, obj):
+        with sincronizar_resumen([obj.pk]):
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        with sincronizar_resumen(list(queryset.values_list("pk", flat=True))):
+            super().delete_queryset(request, queryset)
+
 @admin.register(Categoria)
 class CategoriaAdmin(admin.ModelAdmin):
     list_display = ('nombre', 'state', 'created_at')
     search_fields = ('nombre',)
-    list_filter = ('state',)
\ No newline at end of file
+    list_filter = ('state',)
+
+@admin.register(TareaFondo)
+class TareaFondoAdmin(admin.ModelAdmin):
+    list_display = ("id", "tipo", "estado", "usuario", "creada", "terminada")
+    list_filter = ("estado", "tipo")
+    ordering = ("-creada",)
+    list_select_related = ("usuario",)
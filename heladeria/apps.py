@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class DispositivosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'heladeria'
+
+    def ready(self):
+        from . import checks  # noqa: F401 (registra los checks de despliegue)
+        from .conexiones import configurar_conexion
+
+        connection_created.connect(configurar_conexion, dispatch_uid='heladeria_configurar_conexion')
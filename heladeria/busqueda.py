@@ -0,0 +1,128 @@
+import re
+import unicodedata
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+# Tabla FTS5 (SQLite) e índice FULLTEXT (MySQL) sobre Cliente.busqueda
+TABLA_FTS_CLIENTES = "devices_cliente_fts"
+INDICE_FULLTEXT_CLIENTES = "cliente_busqueda_ft"
+
+# Consultas que parecen RUT o teléfono: "12.345.678-9", "+56 9 1234 5678"
+_PARECE_NUMERO = re.compile(r"[\d.\-\s+()kK]+")
+_NO_ALFANUMERICO = re.compile(r"[^0-9a-z]+")
+
+
+def normalizar(texto):
+    """Minúsculas y sin tildes: "Sofía Muñoz" -> "sofia munoz"."""
+    descompuesto = unicodedata.normalize("NFKD", texto or "")
+    return "".join(c for c in descompuesto if not unicodedata.combining(c)).lower()
+
+
+def solo_digitos(texto):
+    return re.sub(r"\D", "", texto or "")
+
+
+def normalizar_rut(rut):
+    """Cuerpo y dígito verificador sin puntos ni guion: "12.345.678-k" -> "12345678k"."""
+    return re.sub(r"[^0-9k]", "", (rut or "").lower())
+
+
+def texto_busqueda(rut, nombre, apellido, telefono, email):
+    """Contenido de la columna Cliente.busqueda."""
+    partes = [normalizar_rut(rut), normalizar(nombre), normalizar(apellido)]
+    telefono = solo_digitos(telefono)
+    if telefono:
+        partes.append(telefono)
+        # También sin el código de país, que casi nadie digita en caja
+        if telefono.startswith("56") and len(telefono) > 9:
+            partes.append(telefono[2:])
+    partes.append(normalizar(email))
+    return " ".join(p for p in partes if p)[:255]
+
+
+def terminos(query):
+    """Términos normalizados de una búsqueda; un RUT o teléfono es un solo término."""
+    query = (query or "").strip()
+    if _PARECE_NUMERO.fullmatch(query) and any(c.isdigit() for c in query):
+        return [normalizar_rut(query)]
+    return [t for t in _NO_ALFANUMERICO.split(normalizar(query)) if t]
+
+
+def filtrar_clientes(clientes, query):
+    """
+    Filtra un queryset de Cliente: todos los términos deben aparecer como
+    prefijo de alguna palabra (RUT, nombre, apellido, teléfono o email).
+    Usa FTS5 en SQLite y FULLTEXT en MySQL; en otros motores, LIKE sobre
+    la columna normalizada.
+    """
+    lista = terminos(query)
+    if not lista:
+        return clientes
+
+    if connection.vendor == "sqlite":
+        expresion = " ".join(f'"{t}"*' for t in lista)
+        return clientes.filter(id__in=RawSQL(
+            f"SELECT rowid FROM {TABLA_FTS_CLIENTES} WHERE {TABLA_FTS_CLIENTES} MATCH %s", [expresion]
+        ))
+
+    if connection.vendor == "mysql":
+        expresion = " ".join(f"+{t}*" for t in lista)
+        return clientes.alias(
+            relevancia=RawSQL("MATCH (busqueda) AGAINST (%s IN BOOLEAN MODE)", [expresion])
+        ).filter(relevancia__gt=0)
+
+    filtro = Q()
+    for t in lista:
+        filtro &= Q(busqueda__startswith=t) | Q(busqueda__contains=f" {t}")
+    return clientes.filter(filtro)
+
+
+def indexar_cliente(cliente_id, busqueda):
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLA_FTS_CLIENTES} WHERE rowid = %s", [cliente_id])
+        cursor.execute(
+            f"INSERT INTO {TABLA_FTS_CLIENTES} (rowid, busqueda) VALUES (%s, %s)", [cliente_id, busqueda]
+        )
+
+
+def desindexar_cliente(cliente_id):
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLA_FTS_CLIENTES} WHERE rowid = %s", [cliente_id])
+
+
+def reconstruir_indice_clientes(lote=2000):
+    """
+    Recalcula Cliente.busqueda y la tabla FTS5 desde cero. Necesario tras
+    cargas con bulk_create o update(), que no disparan las señales.
+    """
+    from .models import Cliente
+
+    campos = ("id", "rut", "nombre", "apellido", "telefono", "email")
+    with transaction.atomic():
+        pendientes = []
+        for fila in Cliente.objects.values_list(*campos).order_by().iterator(chunk_size=lote):
+            pendientes.append(Cliente(id=fila[0], busqueda=texto_busqueda(*fila[1:])))
+            if len(pendientes) >= lote:
+                Cliente.objects.bulk_update(pendientes, ["busqueda"])
+                pendientes = []
+        if pendientes:
+            Cliente.objects.bulk_update(pendientes, ["busqueda"])
+
+        sincronizar_fts_clientes()
+
+
+def sincronizar_fts_clientes():
+    """Vuelve a llenar la tabla FTS5 desde Cliente.busqueda (solo SQLite)."""
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLA_FTS_CLIENTES}")
+        cursor.execute(
+            f"INSERT INTO {TABLA_FTS_CLIENTES} (rowid, busqueda) SELECT id, busqueda FROM devices_cliente"
+        )
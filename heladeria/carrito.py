@@ -0,0 +1,76 @@
+from django.core.cache import cache
+
+from .models import Producto
+
+# El carrito vive en la caché, no en la base de datos: agregar o quitar productos
+# no escribe nada hasta que la venta se confirma (heladeria.checkout)
+TTL_CARRITO = 60 * 60 * 12
+MAX_CANTIDAD = 100
+
+
+def _clave(usuario_id):
+    return f"carrito:{usuario_id}"
+
+
+class Carrito:
+    """Carrito del POS de un cajero: {producto_id: cantidad}."""
+
+    def __init__(self, usuario):
+        self.usuario_id = usuario.pk
+        self.items = {int(k): v for k, v in (cache.get(_clave(self.usuario_id)) or {}).items()}
+
+    def guardar(self):
+        if self.items:
+            cache.set(_clave(self.usuario_id), self.items, TTL_CARRITO)
+        else:
+            cache.delete(_clave(self.usuario_id))
+
+    def agregar(self, producto_id, cantidad=1):
+        self.actualizar(producto_id, self.items.get(producto_id, 0) + cantidad)
+
+    def actualizar(self, producto_id, cantidad):
+        """Fija la cantidad de un producto; 0 o menos lo quita del carrito."""
+        if cantidad <= 0:
+            self.items.pop(producto_id, None)
+        else:
+            self.items[producto_id] = min(cantidad, MAX_CANTIDAD)
+        self.guardar()
+
+    def quitar(self, producto_ids):
+        for producto_id in producto_ids:
+            self.items.pop(producto_id, None)
+        self.guardar()
+
+    def vaciar(self):
+        self.items = {}
+        self.guardar()
+
+    def como_pedido(self):
+        """Formato que espera registrar_venta: {producto_id: {"cantidad": n}}."""
+        return {producto_id: {"cantidad": cantidad} for producto_id, cantidad in self.items.items()}
+
+    def resumen(self):
+        """
+        Líneas con nombre y precio actual, más el total. Una sola consulta de
+        lectura; los productos desactivados o borrados salen del carrito.
+        """
+        productos = (
+            Producto.objects.filter(state="ACTIVE")
+            .only("id", "nombre", "precio")
+            .in_bulk(list(self.items))
+        )
+        if set(productos) != set(self.items):
+            self.items = {k: v for k, v in self.items.items() if k in productos}
+            self.guardar()
+
+        lineas = [
+            {
+                "producto_id": producto_id,
+                "nombre": productos[producto_id].nombre,
+                "precio": int(productos[producto_id].precio),
+                "cantidad": cantidad,
+                "subtotal": int(productos[producto_id].precio) * cantidad,
+            }
+            for producto_id, cantidad in self.items.items()
+        ]
+        return {"items": lineas, "total": sum(linea["subtotal"] for linea in lineas)}
@@ -0,0 +1,84 @@
+import hashlib
+
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.template.loader import render_to_string
+
+from .models import Producto
+from .paginacion import apagina, numero_pagina
+from .versiones import aversion, version
+
+TTL_CATALOGO = 60 * 60
+
+
+def productos_activos(q=""):
+    productos = Producto.objects.filter(state="ACTIVE").order_by("nombre")
+    if q:
+        productos = productos.filter(nombre__icontains=q)
+    return productos
+
+
+def _busqueda(q):
+    return hashlib.md5(q.lower().encode()).hexdigest()
+
+
+def _clave_catalogo(version_catalogo, q, page, per_page):
+    return f"catalogo_pos:{version_catalogo}:{_busqueda(q)}:{page}:{per_page}"
+
+
+def _clave_total(version_catalogo, q):
+    return f"catalogo_pos_total:{version_catalogo}:{_busqueda(q)}"
+
+
+def _renderizar(page_obj, q, per_page):
+    return {
+        "html": render_to_string("heladeria/_pos_parcial.html", {
+            "productos": page_obj.object_list,
+            "page_obj": page_obj,
+            "query": q,
+            "per_page": per_page,
+        }),
+        "total": page_obj.paginator.count,
+    }
+
+
+def pagina_catalogo(q, page, per_page):
+    """
+    Fragmento HTML de una página del catálogo del POS y el total de productos
+    que coinciden. Se cachea por (búsqueda, página servida, tamaño) y por la
+    versión del catálogo, que cambia al guardar o borrar productos y categorías.
+    La página se normaliza antes de armar la clave para que ?page=abc, ?page=0
+    o ?page=99999 reutilicen la entrada de la página que de verdad se muestra.
+    """
+    version_catalogo = version("catalogo")
+    productos = productos_activos(q)
+    paginator = Paginator(productos, per_page)
+    paginator.count = cache.get_or_set(_clave_total(version_catalogo, q), productos.count, TTL_CATALOGO)
+    page = numero_pagina(paginator, page)
+    clave = _clave_catalogo(version_catalogo, q, page, per_page)
+
+    pagina = cache.get(clave)
+    if pagina is None:
+        pagina = _renderizar(paginator.page(page), q, per_page)
+        cache.set(clave, pagina, TTL_CATALOGO)
+    return pagina
+
+
+async def apagina_catalogo(q, page, per_page):
+    """Versión async de pagina_catalogo (mismas claves de caché)."""
+    version_catalogo = await aversion("catalogo")
+    productos = productos_activos(q)
+    clave_total = _clave_total(version_catalogo, q)
+    paginator = Paginator(productos, per_page)
+    paginator.count = await cache.aget(clave_total)
+    if paginator.count is None:
+        paginator.count = await productos.acount()
+        await cache.aset(clave_total, paginator.count, TTL_CATALOGO)
+    page = numero_pagina(paginator, page)
+    clave = _clave_catalogo(version_catalogo, q, page, per_page)
+
+    pagina = await cache.aget(clave)
+    if pagina is None:
+        pagina = _renderizar(await apagina(productos, per_page, page), q, per_page)
+        await cache.aset(clave, pagina, TTL_CATALOGO)
+    return pagina
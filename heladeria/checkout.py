@@ -0,0 +1,88 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models import F
+
+from .contadores import invalidar_contadores
+from .models import Cliente, DetalleVenta, Producto, Venta
+from .resumen import sumar_al_resumen
+
+
+def _normalizar_carrito(carrito):
+    cantidades, fallos = {}, []
+    for producto_id, item in carrito.items():
+        try:
+            cantidades[int(producto_id)] = max(int(item.get("cantidad", 1)), 1)
+        except (TypeError, ValueError, AttributeError):
+            fallos.append({"producto_id": producto_id, "nombre": None, "motivo": "Ítem inválido"})
+    return cantidades, fallos
+
+
+def registrar_venta(usuario, carrito, cliente_id=None):
+    """
+    Registra una venta a partir del carrito del POS ({producto_id: {"cantidad": n}}).
+
+    Todo ocurre en una transacción con un número fijo de consultas por ítem: los
+    productos se cargan con un solo in_bulk, el stock se descuenta con un UPDATE
+    condicional (stock >= cantidad) que no puede sobrevender aunque dos cajas
+    vendan el último helado a la vez, y las líneas se insertan con bulk_create.
+
+    Devuelve (venta, fallos). Los ítems sin stock o inactivos quedan fuera de la
+    venta y se informan en fallos; si ninguno se pudo vender, venta es None.
+    """
+    cantidades, fallos = _normalizar_carrito(carrito)
+
+    with transaction.atomic():
+        productos = Producto.objects.filter(state="ACTIVE").in_bulk(list(cantidades))
+        lineas = []
+
+        for producto_id, cantidad in cantidades.items():
+            producto = productos.get(producto_id)
+            if producto is None:
+                fallos.append({"producto_id": producto_id, "nombre": None, "motivo": "Producto no disponible"})
+                continue
+
+            descontado = Producto.objects.filter(pk=producto_id, stock__gte=cantidad).update(
+                stock=F("stock") - cantidad
+            )
+            if not descontado:
+                fallos.append({
+                    "producto_id": producto_id,
+                    "nombre": producto.nombre,
+                    "motivo": f"Stock insuficiente (quedan {producto.stock})",
+                })
+                continue
+
+            lineas.append(DetalleVenta(
+                producto=producto,
+                cantidad=cantidad,
+                precio_unitario=producto.precio,
+                precio_compra=producto.precio_compra,
+            ))
+
+        if not lineas:
+            return None, fallos
+
+        total = sum(linea.precio_unitario * linea.cantidad for linea in lineas)
+        costo = sum(linea.precio_compra * linea.cantidad for linea in lineas)
+        cliente = Cliente.objects.filter(id=cliente_id).first() if cliente_id else None
+
+        venta = Venta.objects.create(
+            usuario=usuario,
+            cliente=cliente,
+            estado="PENDING",
+            total=total,
+            costo=costo,
+            ganancia=total - costo,
+        )
+        for linea in lineas:
+            linea.venta = venta
+        DetalleVenta.objects.bulk_create(lineas)
+
+        # El resumen es una tabla de reportes: se actualiza tras el commit para
+        # que un error en él nunca revierta la venta
+        transaction.on_commit(partial(sumar_al_resumen, [venta.id]), robust=True)
+        # El stock se descontó con update(), que no dispara señales
+        invalidar_contadores("productos")
+
+    return venta, fallos
@@ -0,0 +1,64 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+
+CARGADOR_CACHEADO = "django.template.loaders.cached.Loader"
+STORAGE_MANIFEST = "django.contrib.staticfiles.storage.ManifestStaticFilesStorage"
+
+
+def _usa_cargador_cacheado():
+    for plantillas in settings.TEMPLATES:
+        for cargador in plantillas.get("OPTIONS", {}).get("loaders", []):
+            nombre = cargador[0] if isinstance(cargador, (list, tuple)) else cargador
+            if nombre == CARGADOR_CACHEADO:
+                return True
+    return False
+
+
+@register(Tags.security, deploy=True)
+def verificar_perfil_produccion(app_configs, **kwargs):
+    """Configuración que el perfil prod debe tener; se ejecuta con check --deploy."""
+    errores = []
+
+    if settings.DEBUG:
+        errores.append(Error(
+            "DEBUG está activo: cada consulta SQL se guarda en connection.queries y la memoria de los workers crece sin límite.",
+            hint="Usar DJANGO_ENTORNO=prod.",
+            id="heladeria.E001",
+        ))
+    if settings.SECRET_KEY == getattr(settings, "SECRET_KEY_INSEGURA", None):
+        errores.append(Error(
+            "SECRET_KEY es la clave de desarrollo.",
+            hint="Definir DJANGO_SECRET_KEY.",
+            id="heladeria.E002",
+        ))
+    if not _usa_cargador_cacheado():
+        errores.append(Error(
+            "Las plantillas no usan el cargador cacheado y se vuelven a compilar en cada petición.",
+            id="heladeria.E003",
+        ))
+    if settings.CACHES["default"]["BACKEND"].endswith("LocMemCache"):
+        errores.append(Error(
+            "La caché es locmem: cada worker tiene la suya y las invalidaciones por versión no llegan a los demás.",
+            hint="CACHE_BACKEND=file o CACHE_BACKEND=redis.",
+            id="heladeria.E004",
+        ))
+    if settings.STORAGES["staticfiles"]["BACKEND"] != STORAGE_MANIFEST:
+        errores.append(Error(
+            "Los archivos estáticos no usan ManifestStaticFilesStorage.",
+            id="heladeria.E005",
+        ))
+    if "*" in settings.ALLOWED_HOSTS:
+        errores.append(Warning(
+            "ALLOWED_HOSTS acepta cualquier host.",
+            hint="Definir DJANGO_ALLOWED_HOSTS.",
+            id="heladeria.W001",
+        ))
+    if getattr(settings, "SERVIDOR", "wsgi") == "wsgi":
+        sin_persistentes = [alias for alias, db in settings.DATABASES.items() if not db.get("CONN_MAX_AGE")]
+        if sin_persistentes:
+            errores.append(Warning(
+                f"Conexiones no persistentes en {', '.join(sin_persistentes)}: cada petición abre una conexión nueva.",
+                hint="DB_CONN_MAX_AGE mayor que 0.",
+                id="heladeria.W002",
+            ))
+    return errores
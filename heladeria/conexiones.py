@@ -0,0 +1,10 @@
+from django.conf import settings
+
+
+def configurar_conexion(sender, connection, **kwargs):
+    """Receptor de connection_created: aplica settings.SQLITE_PRAGMAS a conexiones SQLite."""
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for pragma, valor in getattr(settings, "SQLITE_PRAGMAS", {}).items():
+            cursor.execute(f"PRAGMA {pragma} = {valor}")
@@ -0,0 +1,49 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+
+from .versiones import incrementar_version, version
+
+# Los contadores se invalidan por señales, y explícitamente tras los update()
+# masivos que no las disparan; el TTL corto cubre los que se escapen
+TTL_CONTADORES = 30
+
+CONTADORES_VENTAS = {
+    "total_ventas": Q(),
+    "ventas_completadas": Q(estado="COMPLETED"),
+    "ventas_pendientes": Q(estado="PENDING"),
+    "ventas_canceladas": Q(estado="CANCELLED"),
+}
+
+CONTADORES_PRODUCTOS = {
+    "total_productos": Q(),
+    "productos_con_stock": Q(stock__gt=0),
+    "productos_sin_stock": Q(stock=0),
+}
+
+
+def _contar(nombre, queryset, filtros):
+    """Todos los contadores de un listado con un solo COUNT condicional, cacheados por versión."""
+    clave = f"contadores:{nombre}:{version(f'contadores_{nombre}')}"
+    contadores = cache.get(clave)
+    if contadores is None:
+        contadores = queryset.aggregate(**{
+            clave_contador: Count("pk", filter=filtro or None)
+            for clave_contador, filtro in filtros.items()
+        })
+        cache.set(clave, contadores, TTL_CONTADORES)
+    return contadores
+
+
+def contadores_ventas():
+    from .models import Venta
+    return _contar("ventas", Venta.objects.all(), CONTADORES_VENTAS)
+
+
+def contadores_productos():
+    from .models import Producto
+    return _contar("productos", Producto.objects.all(), CONTADORES_PRODUCTOS)
+
+
+def invalidar_contadores(nombre):
+    transaction.on_commit(lambda: incrementar_version(f"contadores_{nombre}"))
@@ -1,10 +1,22 @@
+from asgiref.sync import iscoroutinefunction
 from django.core.exceptions import PermissionDenied
 
+from .permisos import atiene_grupo, ausuario, tiene_grupo
+
 def grupo_requerido(*grupos):
     def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            async def _wrapped_view(request, *args, **kwargs):
+                user = await ausuario(request)
+                if user.is_authenticated:
+                    if await atiene_grupo(user, *grupos):
+                        return await view_func(request, *args, **kwargs)
+                raise PermissionDenied
+            return _wrapped_view
+
         def _wrapped_view(request, *args, **kwargs):
             if request.user.is_authenticated:
-                if request.user.groups.filter(name__in=grupos).exists():
+                if tiene_grupo(request.user, *grupos):
                     return view_func(request, *args, **kwargs)
             raise PermissionDenied
         return _wrapped_view
@@ -0,0 +1,139 @@
+import csv
+import tempfile
+
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils.timezone import make_naive
+from openpyxl import Workbook
+
+from .models import Cliente, Producto, Venta
+
+# Filas que se leen de la base por cada viaje del cursor
+TAMANO_LOTE_EXPORTACION = 2000
+
+TIPO_XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+class _Eco:
+    """Buffer mínimo para csv.writer: devuelve lo escrito en vez de guardarlo."""
+
+    def write(self, valor):
+        return valor
+
+
+def _lineas_csv(encabezados, filas):
+    escritor = csv.writer(_Eco())
+    # BOM para que Excel abra el archivo en UTF-8 con tildes correctas
+    yield "\ufeff" + escritor.writerow(encabezados)
+    for fila in filas:
+        yield escritor.writerow(fila)
+
+
+def respuesta_csv(nombre, encabezados, filas):
+    response = StreamingHttpResponse(_lineas_csv(encabezados, filas), content_type="text/csv; charset=utf-8")
+    response["Content-Disposition"] = f'attachment; filename="{nombre}.csv"'
+    return response
+
+
+def escribir_xlsx(destino, titulo, encabezados, filas):
+    """
+    Escribe el libro en modo write-only: las filas van directo a disco y no se
+    guardan en memoria. destino puede ser una ruta o un archivo abierto.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(titulo)
+    ws.append(encabezados)
+    for fila in filas:
+        ws.append(fila)
+    wb.save(destino)
+
+
+def respuesta_xlsx(nombre, titulo, encabezados, filas):
+    """
+    Envía el libro por partes desde un temporal que se borra al cerrar la
+    respuesta. A propósito no es streaming: un xlsx es un zip cuyo índice va
+    al final, así que el libro entero se escribe al temporal (en modo
+    write-only, sin crecer en memoria) antes de mandar el primer byte. Para
+    descargas que empiecen de inmediato está ?formato=csv.
+    """
+    archivo = tempfile.TemporaryFile(suffix=".xlsx")
+    escribir_xlsx(archivo, titulo, encabezados, filas)
+    archivo.seek(0)
+    return FileResponse(archivo, as_attachment=True, filename=f"{nombre}.xlsx", content_type=TIPO_XLSX)
+
+
+def exportar(request, nombre, titulo, encabezados, filas):
+    """Exporta como xlsx (por defecto) o como CSV con ?formato=csv."""
+    if request.GET.get("formato") == "csv":
+        return respuesta_csv(nombre, encabezados, filas)
+    return respuesta_xlsx(nombre, titulo, encabezados, filas)
+
+
+# ---------------------------------------------------------------------------
+# Contenido de cada exportación: (encabezados, filas). Las filas son generadores
+# para que tanto las vistas como las tareas de fondo escriban sin acumularlas.
+# ---------------------------------------------------------------------------
+
+def filas_ventas():
+    ventas = (
+        Venta.objects
+        .select_related("usuario", "cliente")
+        .order_by("id")
+        .iterator(chunk_size=TAMANO_LOTE_EXPORTACION)
+    )
+    filas = (
+        [
+            v.id,
+            v.usuario.username,
+            v.cliente.nombre_completo if v.cliente else "-",
+            v.fecha.strftime("%Y-%m-%d %H:%M"),
+            v.get_estado_display(),
+            float(v.total)
+        ]
+        for v in ventas
+    )
+    return ["ID", "Usuario", "Cliente", "Fecha", "Estado", "Total"], filas
+
+
+def filas_clientes():
+    clientes = (
+        Cliente.objects
+        .only("rut", "nombre", "direccion", "telefono", "email", "fecha_registro")
+        .order_by("id")
+        .iterator(chunk_size=TAMANO_LOTE_EXPORTACION)
+    )
+    filas = (
+        [c.rut, c.nombre, c.direccion, c.telefono, c.email, c.fecha_registro.strftime("%Y-%m-%d %H:%M")]
+        for c in clientes
+    )
+    return ["RUT", "Nombre", "Dirección", "Teléfono", "Email", "Fecha de registro"], filas
+
+
+def filas_productos():
+    productos = (
+        Producto.objects
+        .only("nombre", "precio", "stock")
+        .order_by("id")
+        .iterator(chunk_size=TAMANO_LOTE_EXPORTACION)
+    )
+    return ["Nombre", "Precio", "Stock"], ([p.nombre, float(p.precio), p.stock] for p in productos)
+
+
+def filas_detalle_producto(detalles):
+    """Líneas de venta de un producto (ya filtradas) para el detalle de producto."""
+    detalles = (
+        detalles
+        .select_related("venta", "producto")
+        .order_by("-venta__fecha")
+        .iterator(chunk_size=TAMANO_LOTE_EXPORTACION)
+    )
+    filas = (
+        [
+            d.venta.id,
+            make_naive(d.venta.fecha),
+            d.cantidad,
+            float(d.subtotal()),
+            d.venta.estado,
+        ]
+        for d in detalles
+    )
+    return ["ID Venta", "Fecha", "Cantidad", "Subtotal", "Estado"], filas
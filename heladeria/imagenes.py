@@ -0,0 +1,117 @@
+import os
+from io import BytesIO
+
+from django.apps import apps
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+# Anchos (px) de las variantes; cubren la tarjeta del POS en 1x/2x y miniaturas
+ANCHOS_VARIANTES = (160, 320, 640)
+
+# clave en el JSON, formato de Pillow, extensión y opciones de guardado
+FORMATOS_VARIANTES = (
+    ("webp", "WEBP", "webp", {"quality": 80, "method": 4}),
+    ("jpeg", "JPEG", "jpg", {"quality": 82, "optimize": True, "progressive": True}),
+)
+
+
+def _sin_transparencia(imagen):
+    if imagen.mode in ("RGBA", "LA", "P"):
+        imagen = imagen.convert("RGBA")
+        fondo = Image.new("RGB", imagen.size, (255, 255, 255))
+        fondo.paste(imagen, mask=imagen.split()[-1])
+        return fondo
+    return imagen.convert("RGB")
+
+
+def generar_variantes(archivo):
+    """
+    Genera copias reducidas en WebP y JPEG de una imagen subida y las guarda
+    junto al original (<carpeta>/variantes/<nombre>_<ancho>.<ext>). Devuelve
+    el diccionario que se guarda en el campo <campo>_variantes.
+    """
+    storage = archivo.storage
+    with archivo.open("rb") as f:
+        original = Image.open(f)
+        original.load()
+    original = ImageOps.exif_transpose(original)
+
+    carpeta, nombre = os.path.split(os.path.splitext(archivo.name)[0])
+    variantes = {"origen": archivo.name}
+    # Nunca se agranda: si el original es chico queda una sola variante de su ancho
+    anchos = [ancho for ancho in ANCHOS_VARIANTES if ancho < original.width] or [original.width]
+
+    for ancho in anchos:
+        alto = max(round(original.height * ancho / original.width), 1)
+        reducida = original.resize((ancho, alto), Image.LANCZOS)
+        for clave, formato, extension, opciones in FORMATOS_VARIANTES:
+            imagen = _sin_transparencia(reducida) if formato == "JPEG" else reducida.convert("RGBA")
+            buffer = BytesIO()
+            imagen.save(buffer, formato, **opciones)
+
+            ruta = f"{carpeta}/variantes/{nombre}_{ancho}.{extension}"
+            if storage.exists(ruta):
+                storage.delete(ruta)
+            variantes.setdefault(clave, {})[str(ancho)] = storage.save(ruta, ContentFile(buffer.getvalue()))
+    return variantes
+
+
+def imagen_por_defecto(modelo, campo):
+    """Ruta de la imagen por defecto del campo (compartida por todas las filas), o ''."""
+    default = modelo._meta.get_field(campo).default
+    return default if isinstance(default, str) else ""
+
+
+def variantes_por_defecto(modelo, campo):
+    """
+    Variantes de la imagen por defecto ya generadas por generar_variantes_imagenes
+    (se copian de cualquier fila que las tenga), o {} si aún no existen.
+    """
+    ruta = imagen_por_defecto(modelo, campo)
+    campo_variantes = f"{campo}_variantes"
+    if not ruta:
+        return {}
+    return (
+        modelo.objects
+        .filter(**{campo: ruta, f"{campo_variantes}__origen": ruta, f"{campo_variantes}__has_key": "jpeg"})
+        .values_list(campo_variantes, flat=True)
+        .first()
+    ) or {}
+
+
+def programar_variantes(instancia, campo):
+    """
+    Encola la generación de variantes si la imagen del campo cambió desde la
+    última vez. Se llama desde post_save; marca el origen de inmediato para no
+    encolar otra vez mientras la tarea espera al worker.
+
+    La imagen por defecto es un archivo compartido: no se encola nada, se
+    reutilizan las variantes que generó una vez el comando de backfill.
+    """
+    archivo = getattr(instancia, campo)
+    campo_variantes = f"{campo}_variantes"
+    actuales = getattr(instancia, campo_variantes) or {}
+    modelo = type(instancia)
+
+    if not archivo:
+        if actuales:
+            modelo.objects.filter(pk=instancia.pk).update(**{campo_variantes: {}})
+            setattr(instancia, campo_variantes, {})
+        return
+    if actuales.get("origen") == archivo.name:
+        return
+    if archivo.name == imagen_por_defecto(modelo, campo):
+        compartidas = variantes_por_defecto(modelo, campo)
+        if compartidas:
+            modelo.objects.filter(pk=instancia.pk).update(**{campo_variantes: compartidas})
+            setattr(instancia, campo_variantes, compartidas)
+        return
+
+    pendiente = {"origen": archivo.name}
+    modelo.objects.filter(pk=instancia.pk).update(**{campo_variantes: pendiente})
+    setattr(instancia, campo_variantes, pendiente)
+
+    apps.get_model("heladeria", "TareaFondo").objects.create(
+        tipo="variantes_imagen",
+        parametros={"modelo": instancia._meta.label_lower, "pk": instancia.pk, "campo": campo},
+    )
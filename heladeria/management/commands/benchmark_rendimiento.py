@@ -0,0 +1,174 @@
+import json
+import statistics
+import subprocess
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from heladeria.models import Cliente, Producto
+
+
+class _Revertir(Exception):
+    pass
+
+
+def _escenarios():
+    """(nombre, método, url, datos). Los POST se ejecutan y se revierten."""
+    producto = Producto.objects.filter(state="ACTIVE", stock__gt=10).order_by("id").first()
+    # Un cliente con historial, para que detalle_cliente tenga trabajo real
+    cliente = Cliente.objects.filter(venta__isnull=False).order_by("-venta__id").first()
+
+    escenarios = [
+        ("pos_home", "get", reverse("pos_home"), None),
+        ("lista_ventas_ajax", "get", reverse("lista_ventas_ajax"), None),
+        ("lista_ventas_ajax_filtrada", "get", reverse("lista_ventas_ajax") + "?estado=COMPLETED&sort=total", None),
+        ("reporte_dashboard_12m", "get", reverse("reporte_dashboard"), None),
+        ("reporte_dashboard_7d", "get", reverse("reporte_dashboard") + "?periodo=7dias", None),
+        ("exportar_ventas", "get", reverse("exportar_ventas_excel"), None),
+        ("exportar_clientes", "get", reverse("exportar_clientes_excel"), None),
+        ("exportar_productos", "get", reverse("exportar_productos_excel"), None),
+    ]
+    if cliente:
+        escenarios.append(("detalle_cliente", "get", reverse("detalle_cliente", args=[cliente.id]), None))
+    if producto:
+        carrito = {str(producto.id): {"cantidad": 1}}
+        escenarios.append(("confirmar_venta", "post", reverse("confirmar_venta"), {
+            "carrito_json": json.dumps(carrito),
+            "cliente": cliente.id if cliente else "",
+        }))
+    return escenarios
+
+
+def _commit_actual():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[round((p / 100) * (len(ordenados) - 1))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide tiempos y consultas SQL de las vistas críticas con el cliente de pruebas de Django "
+        "y guarda los resultados en JSON para comparar entre commits."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--usuario", help="Usuario con el que se ejecutan las vistas (por defecto el primer superusuario)")
+        parser.add_argument("--repeticiones", type=int, default=5)
+        parser.add_argument("--solo", nargs="*", help="Ejecutar solo estos escenarios")
+        parser.add_argument("--salida", help="Archivo JSON donde guardar los resultados")
+        parser.add_argument("--comparar", help="JSON de una ejecución anterior para mostrar diferencias")
+
+    def handle(self, *args, **options):
+        usuario = self._usuario(options["usuario"])
+        client = Client()
+        client.force_login(usuario)
+
+        resultados = {}
+        for nombre, metodo, url, datos in _escenarios():
+            if options["solo"] and nombre not in options["solo"]:
+                continue
+            resultados[nombre] = self._medir(client, metodo, url, datos, options["repeticiones"])
+            r = resultados[nombre]
+            self.stdout.write(
+                f"{nombre:<28} mediana {r['mediana_ms']:>9.1f} ms   p95 {r['p95_ms']:>9.1f} ms   "
+                f"{r['consultas']:>4} consultas   HTTP {r['status']}"
+            )
+
+        informe = {
+            "commit": _commit_actual(),
+            "fecha": timezone.now().isoformat(),
+            "motor": connection.vendor,
+            "repeticiones": options["repeticiones"],
+            "escenarios": resultados,
+        }
+
+        if options["salida"]:
+            with open(options["salida"], "w", encoding="utf-8") as f:
+                json.dump(informe, f, indent=2, ensure_ascii=False)
+            self.stdout.write(self.style.SUCCESS(f"Resultados guardados en {options['salida']}"))
+
+        if options["comparar"]:
+            self._comparar(options["comparar"], resultados)
+
+    def _usuario(self, username):
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f"No existe el usuario {username}")
+        usuario = User.objects.filter(is_superuser=True).order_by("id").first()
+        if usuario is None:
+            raise CommandError("No hay superusuarios; indique --usuario")
+        return usuario
+
+    def _peticion(self, client, metodo, url, datos):
+        if metodo == "get":
+            response = client.get(url)
+            if response.streaming:
+                b"".join(response.streaming_content)
+            return response
+
+        # Las escrituras (p. ej. confirmar_venta) se deshacen para no alterar los datos
+        response = None
+        try:
+            with transaction.atomic():
+                response = client.post(url, datos, HTTP_X_REQUESTED_WITH="XMLHttpRequest")
+                raise _Revertir
+        except _Revertir:
+            pass
+        return response
+
+    def _medir(self, client, metodo, url, datos, repeticiones):
+        # Una ejecución de calentamiento (plantillas, caché de consultas del motor)
+        self._peticion(client, metodo, url, datos)
+
+        tiempos = []
+        for _ in range(max(repeticiones, 1)):
+            with CaptureQueriesContext(connection) as consultas:
+                inicio = time.perf_counter()
+                response = self._peticion(client, metodo, url, datos)
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+
+        return {
+            "url": url,
+            "status": response.status_code,
+            "consultas": len(consultas),
+            "mediana_ms": round(statistics.median(tiempos), 2),
+            "p95_ms": round(_percentil(tiempos, 95), 2),
+            "min_ms": round(min(tiempos), 2),
+        }
+
+    def _comparar(self, ruta, resultados):
+        try:
+            with open(ruta, encoding="utf-8") as f:
+                base = json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"No se pudo leer {ruta}: {e}")
+
+        self.stdout.write(f"\nComparación con {base.get('commit') or ruta}:")
+        for nombre, actual in resultados.items():
+            anterior = base.get("escenarios", {}).get(nombre)
+            if not anterior:
+                self.stdout.write(f"{nombre:<28} (sin datos anteriores)")
+                continue
+            delta = actual["mediana_ms"] - anterior["mediana_ms"]
+            porcentaje = (delta / anterior["mediana_ms"] * 100) if anterior["mediana_ms"] else 0
+            estilo = self.style.ERROR if porcentaje > 10 else self.style.SUCCESS if porcentaje < -10 else str
+            self.stdout.write(estilo(
+                f"{nombre:<28} {anterior['mediana_ms']:>9.1f} -> {actual['mediana_ms']:>9.1f} ms "
+                f"({porcentaje:+.0f}%)   consultas {anterior['consultas']} -> {actual['consultas']}"
+            ))
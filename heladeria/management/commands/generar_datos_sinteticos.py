@@ -0,0 +1,180 @@
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from heladeria.busqueda import sincronizar_fts_clientes, texto_busqueda
+from heladeria.models import Categoria, Cliente, DetalleVenta, Producto, Venta
+from heladeria.resumen import reconstruir_resumen
+
+NOMBRES = [
+    "Ana", "Benjamín", "Camila", "Diego", "Fernanda", "Gabriel", "Isidora", "Javiera",
+    "José", "Martina", "Matías", "Sofía", "Tomás", "Valentina", "Vicente", "Catalina",
+]
+APELLIDOS = [
+    "González", "Muñoz", "Rojas", "Díaz", "Pérez", "Soto", "Contreras", "Silva",
+    "Martínez", "Sepúlveda", "Morales", "Rodríguez", "López", "Fuentes", "Hernández", "Torres",
+]
+COMUNAS = ["Viña del Mar", "Valparaíso", "Quilpué", "Villa Alemana", "Concón", "Santiago"]
+SABORES = [
+    "Chocolate", "Vainilla", "Frutilla", "Lúcuma", "Manjar", "Menta", "Pistacho", "Limón",
+    "Mango", "Frambuesa", "Coco", "Café", "Cookies", "Maracuyá", "Chirimoya", "Avellana",
+]
+FORMATOS = ["Cono simple", "Cono doble", "Vaso", "Paleta", "Litro", "Medio litro", "Sundae", "Batido"]
+CATEGORIAS = ["Helados", "Paletas", "Postres", "Bebidas"]
+
+# Proporción aproximada de estados en ventas reales
+ESTADOS = ["COMPLETED"] * 80 + ["PENDING"] * 15 + ["CANCELLED"] * 5
+
+
+def _digito_verificador(cuerpo):
+    suma, factor = 0, 2
+    for digito in reversed(str(cuerpo)):
+        suma += int(digito) * factor
+        factor = 2 if factor == 7 else factor + 1
+    resto = 11 - suma % 11
+    return {11: "0", 10: "K"}.get(resto, str(resto))
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera datos sintéticos (productos, clientes, ventas y líneas) para medir rendimiento. "
+        "Ejemplo a escala real: --productos 1000 --clientes 100000 --ventas 2000000 --anios 3"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--productos", type=int, default=100)
+        parser.add_argument("--clientes", type=int, default=2000)
+        parser.add_argument("--ventas", type=int, default=20000)
+        parser.add_argument("--lineas-por-venta", type=float, default=2.5,
+                            help="Promedio de líneas por venta (por defecto 2.5)")
+        parser.add_argument("--anios", type=int, default=3, help="Años de historial hacia atrás")
+        parser.add_argument("--cajeros", type=int, default=5)
+        parser.add_argument("--semilla", type=int, default=42, help="Semilla para datos reproducibles")
+        parser.add_argument("--lote", type=int, default=2000, help="Ventas por lote de inserción")
+
+    def handle(self, *args, **options):
+        if options["ventas"] and not (options["productos"] or Producto.objects.exists()):
+            raise CommandError("Se necesitan productos para generar ventas")
+
+        self.rnd = random.Random(options["semilla"])
+
+        cajeros = self._cajeros(options["cajeros"])
+        self._productos(options["productos"])
+        self._clientes(options["clientes"])
+        lineas = self._ventas(options, cajeros)
+
+        self.stdout.write("Reconstruyendo resumen diario...")
+        filas = reconstruir_resumen()
+        self.stdout.write(self.style.SUCCESS(
+            f"Listo: {options['ventas']} ventas, {lineas} líneas, {filas} filas de resumen"
+        ))
+
+    def _cajeros(self, cantidad):
+        cajeros = []
+        for i in range(1, cantidad + 1):
+            usuario, creado = User.objects.get_or_create(username=f"cajero_sintetico_{i}")
+            if creado:
+                usuario.set_unusable_password()
+                usuario.save()
+            cajeros.append(usuario.id)
+        return cajeros
+
+    def _productos(self, cantidad):
+        categorias = [Categoria.objects.get_or_create(nombre=nombre)[0] for nombre in CATEGORIAS]
+        inicio = (Producto.objects.aggregate(m=Max("id"))["m"] or 0) + 1
+        productos = []
+        for i in range(inicio, inicio + cantidad):
+            precio = self.rnd.randrange(800, 6000, 100)
+            productos.append(Producto(
+                nombre=f"{self.rnd.choice(FORMATOS)} {self.rnd.choice(SABORES)} #{i}",
+                precio=precio,
+                precio_compra=int(precio * self.rnd.uniform(0.35, 0.6)),
+                stock=self.rnd.randint(1000, 5000),
+                categoria=self.rnd.choice(categorias),
+            ))
+        Producto.objects.bulk_create(productos, batch_size=1000)
+        self.stdout.write(f"{cantidad} productos")
+
+    def _clientes(self, cantidad, lote=5000):
+        inicio = (Cliente.objects.aggregate(m=Max("id"))["m"] or 0) + 1
+        for desde in range(inicio, inicio + cantidad, lote):
+            clientes = []
+            for i in range(desde, min(desde + lote, inicio + cantidad)):
+                cuerpo = 30_000_000 + i
+                rut = f"{cuerpo}-{_digito_verificador(cuerpo)}"
+                nombre = self.rnd.choice(NOMBRES)
+                apellido = self.rnd.choice(APELLIDOS)
+                telefono = f"9{self.rnd.randint(10_000_000, 99_999_999)}"
+                email = f"sintetico{i}@ejemplo.cl"
+                clientes.append(Cliente(
+                    rut=rut,
+                    nombre=nombre,
+                    apellido=apellido,
+                    direccion=f"Calle {self.rnd.randint(1, 999)} #{self.rnd.randint(1, 9999)}",
+                    region="Valparaíso",
+                    comuna=self.rnd.choice(COMUNAS),
+                    telefono=telefono,
+                    email=email,
+                    # bulk_create no dispara pre_save: la columna de búsqueda se llena aquí
+                    busqueda=texto_busqueda(rut, nombre, apellido, telefono, email),
+                ))
+            Cliente.objects.bulk_create(clientes)
+        sincronizar_fts_clientes()
+        self.stdout.write(f"{cantidad} clientes")
+
+    def _ventas(self, options, cajeros):
+        productos = list(Producto.objects.values_list("id", "precio", "precio_compra"))
+        clientes = list(Cliente.objects.values_list("id", flat=True))
+        ahora = timezone.now()
+        segundos_historial = options["anios"] * 365 * 24 * 3600
+        max_lineas = max(int(options["lineas_por_venta"] * 2) - 1, 1)
+
+        # Ids explícitos para enlazar las líneas sin depender de que el motor
+        # devuelva las claves de un bulk_create (MySQL no lo hace)
+        siguiente_id = (Venta.objects.aggregate(m=Max("id"))["m"] or 0) + 1
+        total_lineas = 0
+
+        restantes = options["ventas"]
+        while restantes > 0:
+            tamano = min(options["lote"], restantes)
+            ventas, detalles = [], []
+            for venta_id in range(siguiente_id, siguiente_id + tamano):
+                elegidos = self.rnd.sample(productos, min(self.rnd.randint(1, max_lineas), len(productos)))
+                total = costo = Decimal(0)
+                for producto_id, precio, precio_compra in elegidos:
+                    cantidad = self.rnd.choices([1, 2, 3, 4], weights=[60, 25, 10, 5])[0]
+                    total += precio * cantidad
+                    costo += precio_compra * cantidad
+                    detalles.append(DetalleVenta(
+                        venta_id=venta_id,
+                        producto_id=producto_id,
+                        cantidad=cantidad,
+                        precio_unitario=precio,
+                        precio_compra=precio_compra,
+                    ))
+                ventas.append(Venta(
+                    id=venta_id,
+                    usuario_id=self.rnd.choice(cajeros),
+                    cliente_id=self.rnd.choice(clientes) if clientes and self.rnd.random() < 0.7 else None,
+                    estado=self.rnd.choice(ESTADOS),
+                    fecha=ahora - timedelta(seconds=self.rnd.randint(0, segundos_historial)),
+                    total=total,
+                    costo=costo,
+                    ganancia=total - costo,
+                ))
+
+            with transaction.atomic():
+                Venta.objects.bulk_create(ventas)
+                DetalleVenta.objects.bulk_create(detalles, batch_size=5000)
+
+            siguiente_id += tamano
+            restantes -= tamano
+            total_lineas += len(detalles)
+            self.stdout.write(f"{options['ventas'] - restantes}/{options['ventas']} ventas")
+        return total_lineas
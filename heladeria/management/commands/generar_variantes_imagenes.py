@@ -0,0 +1,70 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from heladeria.imagenes import generar_variantes, imagen_por_defecto, variantes_por_defecto
+
+# (modelo, campo) con variantes de imagen
+CAMPOS_CON_VARIANTES = [
+    ("heladeria.Producto", "imagen"),
+    ("accounts.PerfilUsuario", "avatar"),
+]
+
+
+class Command(BaseCommand):
+    help = "Genera las variantes WebP/JPEG de las imágenes existentes de productos y avatares."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--forzar", action="store_true", help="Regenerar aunque ya existan")
+
+    def handle(self, *args, **options):
+        for etiqueta, campo in CAMPOS_CON_VARIANTES:
+            modelo = apps.get_model(etiqueta)
+            campo_variantes = f"{campo}_variantes"
+            generadas = errores = 0
+
+            por_defecto = imagen_por_defecto(modelo, campo)
+            if por_defecto:
+                generadas += self._variantes_por_defecto(modelo, campo, por_defecto, options["forzar"])
+
+            instancias = (
+                modelo.objects
+                .exclude(**{campo: ""})
+                .exclude(**{f"{campo}__isnull": True})
+                .exclude(**{campo: por_defecto})
+            )
+            for instancia in instancias.iterator():
+                archivo = getattr(instancia, campo)
+                variantes = getattr(instancia, campo_variantes) or {}
+                if not options["forzar"] and variantes.get("origen") == archivo.name and "jpeg" in variantes:
+                    continue
+                try:
+                    setattr(instancia, campo_variantes, generar_variantes(archivo))
+                except (OSError, ValueError) as e:
+                    errores += 1
+                    self.stderr.write(f"{etiqueta} #{instancia.pk} ({archivo.name}): {e}")
+                    continue
+                instancia.save(update_fields=[campo_variantes])
+                generadas += 1
+
+            self.stdout.write(self.style.SUCCESS(f"{etiqueta}: {generadas} generadas, {errores} con error"))
+
+    def _variantes_por_defecto(self, modelo, campo, ruta, forzar):
+        """
+        La imagen por defecto se comparte entre filas: sus variantes se generan
+        una sola vez y se copian a todas las filas que la usan.
+        """
+        campo_variantes = f"{campo}_variantes"
+        filas = modelo.objects.filter(**{campo: ruta})
+        variantes = {} if forzar else variantes_por_defecto(modelo, campo)
+        if not variantes:
+            archivo = modelo._meta.get_field(campo).attr_class(None, modelo._meta.get_field(campo), ruta)
+            if not archivo.storage.exists(ruta):
+                return 0
+            try:
+                variantes = generar_variantes(archivo)
+            except (OSError, ValueError) as e:
+                self.stderr.write(f"{modelo._meta.label} (imagen por defecto {ruta}): {e}")
+                return 0
+        # update() y no save(): es una copia idéntica para cada fila
+        filas.update(**{campo_variantes: variantes})
+        return 1
@@ -0,0 +1,80 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+from multiprocessing import get_context
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from heladeria.tareas import (
+    TIMEOUT_TAREA,
+    ejecutar_tarea,
+    liberar_interrumpidas,
+    reclamar_pendientes,
+    recuperar_huerfanas,
+)
+
+
+class Command(BaseCommand):
+    help = "Worker de tareas de fondo (exportaciones): ejecuta las pendientes en un pool de procesos."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--procesos", type=int, default=2, help="Procesos del pool (por defecto 2)")
+        parser.add_argument("--intervalo", type=float, default=2.0, help="Segundos entre consultas a la cola")
+        parser.add_argument("--una-vez", action="store_true", help="Procesa lo pendiente y termina")
+        parser.add_argument(
+            "--timeout", type=float, default=TIMEOUT_TAREA.total_seconds(),
+            help="Segundos tras los cuales una tarea EN_PROCESO se considera huérfana y se reencola",
+        )
+
+    def handle(self, *args, **options):
+        procesos = max(options["procesos"], 1)
+        timeout = timedelta(seconds=options["timeout"])
+
+        pool = _nuevo_pool(procesos)
+        try:
+            while True:
+                reencoladas, fallidas = recuperar_huerfanas(timeout)
+                if reencoladas or fallidas:
+                    self.stdout.write(self.style.WARNING(
+                        f"Tareas huérfanas: {reencoladas} reencoladas, {fallidas} marcadas como fallidas"
+                    ))
+                reclamadas = reclamar_pendientes(procesos)
+                connections.close_all()
+
+                if not reclamadas:
+                    if options["una_vez"]:
+                        return
+                    time.sleep(options["intervalo"])
+                    continue
+
+                futuros = {tarea_id: pool.submit(ejecutar_tarea, tarea_id) for tarea_id in reclamadas}
+                interrumpidas = []
+                for tarea_id, futuro in futuros.items():
+                    try:
+                        estado = futuro.result()
+                    except BrokenProcessPool:
+                        interrumpidas.append(tarea_id)
+                        continue
+                    estilo = self.style.SUCCESS if estado == "COMPLETADA" else self.style.ERROR
+                    self.stdout.write(estilo(f"Tarea #{tarea_id}: {estado}"))
+
+                if interrumpidas:
+                    # Un hijo murió (kill, OOM): el pool ya no sirve y no se sabe
+                    # cuál de las tareas en curso lo mató, así que se liberan todas
+                    reencoladas, fallidas = liberar_interrumpidas(interrumpidas)
+                    self.stdout.write(self.style.ERROR(
+                        f"Un proceso del pool murió con las tareas {interrumpidas}: "
+                        f"{reencoladas} reencoladas, {fallidas} marcadas como fallidas"
+                    ))
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    pool = _nuevo_pool(procesos)
+        finally:
+            pool.shutdown()
+
+
+def _nuevo_pool(procesos):
+    # Los hijos se crean con fork: no deben heredar conexiones abiertas del padre
+    connections.close_all()
+    return ProcessPoolExecutor(max_workers=procesos, mp_context=get_context("fork"))
@@ -0,0 +1,168 @@
+import json
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from heladeria.models import Producto
+
+from .benchmark_rendimiento import _commit_actual, _percentil
+
+
+def _rutas_por_defecto():
+    """Los endpoints AJAX de solo lectura que disparan las pantallas con búsqueda."""
+    rutas = [
+        reverse("pos_ajax") + "?q=a",
+        reverse("lista_ventas_ajax") + "?sort=fecha&direction=desc",
+        reverse("lista_clientes_ajax") + "?q=an",
+        reverse("lista_productos_ajax"),
+    ]
+    producto = Producto.objects.order_by("id").first()
+    if producto:
+        rutas.append(reverse("detalle_productos_ajax", args=[producto.id]))
+    return rutas
+
+
+class Command(BaseCommand):
+    help = (
+        "Prueba de carga contra un servidor en marcha: N conexiones concurrentes piden los "
+        "endpoints AJAX durante un tiempo fijo. Ejecutarla contra el despliegue WSGI y el ASGI "
+        "(con la misma base de datos) y comparar con --comparar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://127.0.0.1:8000", help="URL base del servidor")
+        parser.add_argument("--rutas", nargs="*", help="Rutas a pedir (por defecto los endpoints AJAX)")
+        parser.add_argument("--usuario", help="Usuario de la sesión (por defecto el primer superusuario)")
+        parser.add_argument("--concurrencia", type=int, default=20, help="Conexiones simultáneas")
+        parser.add_argument("--duracion", type=float, default=15.0, help="Segundos de carga")
+        parser.add_argument("--etiqueta", default="", help="Nombre de la corrida, p. ej. wsgi o asgi")
+        parser.add_argument("--salida", help="Archivo JSON donde guardar los resultados")
+        parser.add_argument("--comparar", help="JSON de otra corrida para mostrar diferencias")
+
+    def handle(self, *args, **options):
+        rutas = options["rutas"] or _rutas_por_defecto()
+        sesion = self._sesion(options["usuario"])
+        base = options["url"].rstrip("/")
+
+        muestras = defaultdict(list)
+        estados = Counter()
+        errores = Counter()
+        lock = threading.Lock()
+        fin = time.perf_counter() + options["duracion"]
+
+        def trabajador(indice):
+            cabeceras = {
+                "Cookie": f"{settings.SESSION_COOKIE_NAME}={sesion}",
+                "X-Requested-With": "XMLHttpRequest",
+            }
+            i = indice
+            while time.perf_counter() < fin:
+                ruta = rutas[i % len(rutas)]
+                i += 1
+                inicio = time.perf_counter()
+                try:
+                    with urllib.request.urlopen(urllib.request.Request(base + ruta, headers=cabeceras), timeout=30) as r:
+                        r.read()
+                        estado = r.status
+                except urllib.error.HTTPError as e:
+                    estado = e.code
+                except (urllib.error.URLError, OSError) as e:
+                    with lock:
+                        errores[type(e).__name__] += 1
+                    continue
+                duracion = (time.perf_counter() - inicio) * 1000
+                with lock:
+                    estados[estado] += 1
+                    if estado == 200:
+                        muestras[ruta].append(duracion)
+
+        hilos = [threading.Thread(target=trabajador, args=(i,)) for i in range(max(options["concurrencia"], 1))]
+        inicio = time.perf_counter()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        transcurrido = time.perf_counter() - inicio
+
+        todas = [d for lista in muestras.values() for d in lista]
+        if not todas:
+            raise CommandError(f"Ninguna petición respondió 200 (estados: {dict(estados)}, errores: {dict(errores)})")
+
+        informe = {
+            "etiqueta": options["etiqueta"],
+            "commit": _commit_actual(),
+            "fecha": timezone.now().isoformat(),
+            "url": base,
+            "concurrencia": options["concurrencia"],
+            "duracion_s": round(transcurrido, 2),
+            "peticiones_ok": len(todas),
+            "por_segundo": round(len(todas) / transcurrido, 1),
+            "p50_ms": round(statistics.median(todas), 1),
+            "p95_ms": round(_percentil(todas, 95), 1),
+            "p99_ms": round(_percentil(todas, 99), 1),
+            "estados": {str(k): v for k, v in estados.items()},
+            "errores": dict(errores),
+            "rutas": {
+                ruta: {"peticiones": len(lista), "p50_ms": round(statistics.median(lista), 1),
+                       "p95_ms": round(_percentil(lista, 95), 1)}
+                for ruta, lista in muestras.items()
+            },
+        }
+
+        self.stdout.write(
+            f"{options['etiqueta'] or base}: {informe['por_segundo']} req/s con {options['concurrencia']} "
+            f"conexiones   p50 {informe['p50_ms']} ms   p95 {informe['p95_ms']} ms   p99 {informe['p99_ms']} ms"
+        )
+        for ruta, datos in informe["rutas"].items():
+            self.stdout.write(f"  {ruta:<50} {datos['peticiones']:>6}   p50 {datos['p50_ms']:>8} ms   p95 {datos['p95_ms']:>8} ms")
+        otros = {k: v for k, v in informe["estados"].items() if k != "200"}
+        if otros or errores:
+            self.stdout.write(self.style.WARNING(f"  Respuestas no 200: {otros}   errores: {dict(errores)}"))
+
+        if options["salida"]:
+            with open(options["salida"], "w", encoding="utf-8") as f:
+                json.dump(informe, f, indent=2, ensure_ascii=False)
+            self.stdout.write(self.style.SUCCESS(f"Resultados guardados en {options['salida']}"))
+
+        if options["comparar"]:
+            self._comparar(options["comparar"], informe)
+
+    def _sesion(self, username):
+        """Cookie de sesión válida para el usuario, creada directamente en la base de datos."""
+        if username:
+            usuario = User.objects.filter(username=username).first()
+        else:
+            usuario = User.objects.filter(is_superuser=True).order_by("id").first()
+        if usuario is None:
+            raise CommandError("No se encontró el usuario; indique --usuario")
+        cliente = Client()
+        cliente.force_login(usuario)
+        return cliente.cookies[settings.SESSION_COOKIE_NAME].value
+
+    def _comparar(self, ruta, actual):
+        try:
+            with open(ruta, encoding="utf-8") as f:
+                base = json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"No se pudo leer {ruta}: {e}")
+
+        nombre = base.get("etiqueta") or ruta
+        self.stdout.write(f"\nComparación con {nombre}:")
+        for clave, unidad in (("por_segundo", "req/s"), ("p50_ms", "ms"), ("p95_ms", "ms"), ("p99_ms", "ms")):
+            anterior, ahora = base.get(clave), actual[clave]
+            if not anterior:
+                continue
+            porcentaje = (ahora - anterior) / anterior * 100
+            mejor = porcentaje > 0 if clave == "por_segundo" else porcentaje < 0
+            estilo = self.style.SUCCESS if mejor else self.style.ERROR
+            self.stdout.write(estilo(f"  {clave:<12} {anterior:>9} -> {ahora:>9} {unidad} ({porcentaje:+.0f}%)"))
@@ -0,0 +1,23 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from heladeria.resumen import reconstruir_resumen
+
+
+class Command(BaseCommand):
+    help = "Reconstruye el resumen diario de ventas a partir del historial de DetalleVenta."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--desde", help="Primer día a reconstruir (YYYY-MM-DD)")
+        parser.add_argument("--hasta", help="Último día a reconstruir (YYYY-MM-DD)")
+
+    def handle(self, *args, **options):
+        try:
+            desde = date.fromisoformat(options["desde"]) if options["desde"] else None
+            hasta = date.fromisoformat(options["hasta"]) if options["hasta"] else None
+        except ValueError:
+            raise CommandError("Las fechas deben tener formato YYYY-MM-DD")
+
+        creados = reconstruir_resumen(desde, hasta)
+        self.stdout.write(self.style.SUCCESS(f"Resumen reconstruido: {creados} filas"))
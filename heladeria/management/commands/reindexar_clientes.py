@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from heladeria.busqueda import reconstruir_indice_clientes
+
+
+class Command(BaseCommand):
+    help = "Recalcula la columna de búsqueda de clientes y el índice FTS5 (tras cargas masivas)."
+
+    def handle(self, *args, **options):
+        reconstruir_indice_clientes()
+        self.stdout.write(self.style.SUCCESS("Índice de búsqueda de clientes reconstruido"))
@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Falla si el perfil de producción está mal configurado: ejecuta los checks de "
+        "despliegue (check --deploy) con DJANGO_ENTORNO=prod. Pensado para el paso de build."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--fail-level", default="ERROR", choices=["CRITICAL", "ERROR", "WARNING", "INFO", "DEBUG"],
+            help="Nivel a partir del cual el comando falla (por defecto ERROR)",
+        )
+
+    def handle(self, *args, **options):
+        if getattr(settings, "ENTORNO", None) != "prod":
+            raise CommandError(
+                f'El perfil cargado es "{getattr(settings, "ENTORNO", "?")}"; '
+                "ejecutar con DJANGO_ENTORNO=prod."
+            )
+        call_command("check", deploy=True, fail_level=options["fail_level"])
+        self.stdout.write(self.style.SUCCESS("Configuración de producción correcta"))
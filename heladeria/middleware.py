@@ -0,0 +1,174 @@
+import logging
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Mediciones que se conservan por vista (las más recientes)
+MUESTRAS_POR_VISTA = 500
+# Veces que una misma consulta (mismo SQL, distintos parámetros) puede repetirse
+# en una petición antes de avisar de un posible N+1
+UMBRAL_REPETICIONES = 10
+
+
+class _RegistroConsultas:
+    """execute_wrapper que cuenta consultas, tiempo SQL y repeticiones."""
+
+    def __init__(self):
+        self.cantidad = 0
+        self.tiempo = 0.0
+        self.exactas = Counter()
+        self.plantillas = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.tiempo += time.perf_counter() - inicio
+            self.cantidad += 1
+            self.plantillas[sql] += 1
+            try:
+                self.exactas[(sql, repr(params))] += 1
+            except Exception:
+                pass
+
+    @property
+    def duplicadas(self):
+        """Consultas idénticas (mismo SQL y parámetros) ejecutadas más de una vez."""
+        return sum(n - 1 for n in self.exactas.values())
+
+    def mas_repetida(self):
+        if not self.plantillas:
+            return None, 0
+        return self.plantillas.most_common(1)[0]
+
+
+class EstadisticasVistas:
+    """Mediciones recientes por vista, en memoria del proceso y con tamaño acotado."""
+
+    def __init__(self, maximo=MUESTRAS_POR_VISTA):
+        self._muestras = defaultdict(lambda: deque(maxlen=maximo))
+        self._lock = threading.Lock()
+
+    def registrar(self, vista, duracion_ms, consultas, sql_ms, duplicadas):
+        with self._lock:
+            self._muestras[vista].append((duracion_ms, consultas, sql_ms, duplicadas))
+
+    def limpiar(self):
+        with self._lock:
+            self._muestras.clear()
+
+    def resumen(self):
+        with self._lock:
+            copia = {vista: list(muestras) for vista, muestras in self._muestras.items()}
+
+        filas = []
+        for vista, muestras in copia.items():
+            duraciones = sorted(m[0] for m in muestras)
+            consultas = sorted(m[1] for m in muestras)
+            sql = sorted(m[2] for m in muestras)
+            filas.append({
+                "vista": vista,
+                "peticiones": len(muestras),
+                "p50_ms": _percentil(duraciones, 50),
+                "p95_ms": _percentil(duraciones, 95),
+                "consultas_p50": _percentil(consultas, 50),
+                "consultas_max": consultas[-1],
+                "sql_p95_ms": _percentil(sql, 95),
+                "duplicadas_max": max(m[3] for m in muestras),
+            })
+        return sorted(filas, key=lambda fila: fila["p95_ms"], reverse=True)
+
+
+def _percentil(valores_ordenados, p):
+    if not valores_ordenados:
+        return 0
+    indice = round((p / 100) * (len(valores_ordenados) - 1))
+    return valores_ordenados[indice]
+
+
+ESTADISTICAS = EstadisticasVistas()
+
+
+def _abrir_envoltura(registro):
+    stack = ExitStack()
+    for conexion in connections.all():
+        stack.enter_context(conexion.execute_wrapper(registro))
+    return stack
+
+
+class MetricasMiddleware:
+    """
+    Mide cada petición: tiempo total, cantidad y tiempo de consultas SQL y
+    consultas duplicadas. Lo acumula para la página de métricas y lo informa
+    en la cabecera Server-Timing (visible en las herramientas del navegador),
+    solo con DEBUG o al staff: revela detalles internos del servidor.
+    Funciona igual con WSGI y ASGI (no obliga a las vistas async a un hilo).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.habilitado = getattr(settings, "METRICAS_HABILITADAS", True)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.habilitado:
+            return self.get_response(request)
+
+        registro = _RegistroConsultas()
+        inicio = time.perf_counter()
+        with _abrir_envoltura(registro):
+            response = self.get_response(request)
+        return self._registrar(request, response, registro, inicio, getattr(request, "user", None))
+
+    async def __acall__(self, request):
+        if not self.habilitado:
+            return await self.get_response(request)
+
+        registro = _RegistroConsultas()
+        inicio = time.perf_counter()
+        # Las conexiones son por hilo y el ORM async consulta desde el hilo de
+        # sync_to_async de la petición: el wrapper se instala y retira allí
+        envoltura = await sync_to_async(_abrir_envoltura)(registro)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(envoltura.close)()
+        # request.user cargaría el usuario con el ORM sync desde el event loop
+        usuario = await request.auser() if hasattr(request, "auser") else None
+        return self._registrar(request, response, registro, inicio, usuario)
+
+    def _registrar(self, request, response, registro, inicio, usuario):
+        duracion_ms = (time.perf_counter() - inicio) * 1000
+        sql_ms = registro.tiempo * 1000
+
+        match = getattr(request, "resolver_match", None)
+        vista = match.view_name if match else "sin_ruta"
+        ESTADISTICAS.registrar(vista, duracion_ms, registro.cantidad, sql_ms, registro.duplicadas)
+
+        if settings.DEBUG or getattr(usuario, "is_staff", False):
+            response["Server-Timing"] = (
+                f'total;dur={duracion_ms:.1f}, '
+                f'sql;dur={sql_ms:.1f};desc="{registro.cantidad} consultas", '
+                f'dup;desc="{registro.duplicadas} duplicadas"'
+            )
+
+        sql, veces = registro.mas_repetida()
+        if veces >= UMBRAL_REPETICIONES:
+            logger.warning(
+                "Posible N+1 en %s: la misma consulta se ejecutó %s veces: %s",
+                vista, veces, sql[:200],
+            )
+        return response
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, F, Sum
+from django.db.models.functions import Coalesce, TruncDate
+
+
+def poblar_resumen(apps, schema_editor):
+    DetalleVenta = apps.get_model('heladeria', 'DetalleVenta')
+    ResumenVentaDiaria = apps.get_model('heladeria', 'ResumenVentaDiaria')
+
+    precio = Coalesce(F('precio_unitario'), F('producto__precio'), output_field=DecimalField())
+    costo = Coalesce(F('precio_compra'), precio, output_field=DecimalField())
+    filas = (
+        DetalleVenta.objects
+        .filter(venta__estado__in=['PENDING', 'COMPLETED', 'CANCELLED'])
+        .annotate(dia=TruncDate('venta__fecha'))
+        .values('dia', 'producto_id', 'venta__estado')
+        .annotate(
+            total_unidades=Sum('cantidad'),
+            total_ingreso=Sum(F('cantidad') * precio, output_field=DecimalField()),
+            total_costo=Sum(F('cantidad') * costo, output_field=DecimalField()),
+            total_ordenes=Count('venta', distinct=True),
+            total_clientes=Count('venta__cliente', distinct=True),
+        )
+        .order_by()
+    )
+    ResumenVentaDiaria.objects.bulk_create(
+        [
+            ResumenVentaDiaria(
+                fecha=fila['dia'],
+                producto_id=fila['producto_id'],
+                estado=fila['venta__estado'],
+                unidades=fila['total_unidades'] or 0,
+                ingreso=fila['total_ingreso'] or 0,
+                costo=fila['total_costo'] or 0,
+                ordenes=fila['total_ordenes'],
+                clientes=fila['total_clientes'],
+            )
+            for fila in filas
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('heladeria', '0009_detalleventa_precio_compra_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenVentaDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('estado', models.CharField(max_length=10)),
+                ('unidades', models.PositiveIntegerField(default=0)),
+                ('ingreso', models.DecimalField(decimal_places=0, default=0, max_digits=14)),
+                ('costo', models.DecimalField(decimal_places=0, default=0, max_digits=14)),
+                ('ordenes', models.PositiveIntegerField(default=0)),
+                ('clientes', models.PositiveIntegerField(default=0)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_diarios', to='heladeria.producto')),
+            ],
+            options={
+                'db_table': 'devices_resumenventadiaria',
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'producto', 'estado'), name='resumen_dia_producto_estado')],
+            },
+        ),
+        migrations.RunPython(poblar_resumen, migrations.RunPython.noop),
+    ]
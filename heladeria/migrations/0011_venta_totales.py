@@ -0,0 +1,57 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:19
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def calcular_totales(apps, schema_editor):
+    Venta = apps.get_model('heladeria', 'Venta')
+    DetalleVenta = apps.get_model('heladeria', 'DetalleVenta')
+
+    precio = Coalesce(F('precio_unitario'), F('producto__precio'), output_field=DecimalField())
+    costo = Coalesce(F('precio_compra'), precio, output_field=DecimalField())
+
+    def suma_lineas(expresion):
+        return Coalesce(
+            Subquery(
+                DetalleVenta.objects
+                .filter(venta=OuterRef('pk'))
+                .values('venta')
+                .annotate(suma=Sum(F('cantidad') * expresion))
+                .values('suma')
+            ),
+            Decimal('0'),
+            output_field=DecimalField(),
+        )
+
+    Venta.objects.update(total=suma_lineas(precio), costo=suma_lineas(costo))
+    Venta.objects.update(ganancia=F('total') - F('costo'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('heladeria', '0010_resumenventadiaria'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='venta',
+            name='costo',
+            field=models.DecimalField(decimal_places=0, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='venta',
+            name='ganancia',
+            field=models.DecimalField(decimal_places=0, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='venta',
+            name='total',
+            field=models.DecimalField(db_index=True, decimal_places=0, default=0, max_digits=12),
+        ),
+        migrations.RunPython(calcular_totales, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,15 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:21
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('heladeria', '0011_venta_totales'),
+    ]
+
+    # Los índices Lower() que creaba esta migración quedaron reemplazados por la
+    # columna busqueda (0015) antes de publicarse; se deja vacía para no romper
+    # la cadena de dependencias
+    operations = []
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:35
+
+from django.db import migrations, models
+
+from heladeria.busqueda import INDICE_FULLTEXT_CLIENTES, TABLA_FTS_CLIENTES, texto_busqueda
+
+
+# Clientes leídos y actualizados por lote: la tabla puede tener cientos de miles
+TAMANO_LOTE = 2000
+
+
+def crear_indice_busqueda(apps, schema_editor):
+    Cliente = apps.get_model('heladeria', 'Cliente')
+    db = schema_editor.connection.alias
+
+    clientes = Cliente.objects.using(db).only('rut', 'nombre', 'apellido', 'telefono', 'email').order_by('pk')
+    lote = []
+    for cliente in clientes.iterator(chunk_size=TAMANO_LOTE):
+        cliente.busqueda = texto_busqueda(cliente.rut, cliente.nombre, cliente.apellido, cliente.telefono, cliente.email)
+        lote.append(cliente)
+        if len(lote) == TAMANO_LOTE:
+            Cliente.objects.using(db).bulk_update(lote, ['busqueda'], batch_size=500)
+            lote = []
+    Cliente.objects.using(db).bulk_update(lote, ['busqueda'], batch_size=500)
+
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {TABLA_FTS_CLIENTES} USING fts5(busqueda, tokenize='unicode61')"
+        )
+        schema_editor.execute(
+            f"INSERT INTO {TABLA_FTS_CLIENTES} (rowid, busqueda) SELECT id, busqueda FROM devices_cliente"
+        )
+    elif vendor == 'mysql':
+        schema_editor.execute(
+            f"ALTER TABLE devices_cliente ADD FULLTEXT INDEX {INDICE_FULLTEXT_CLIENTES} (busqueda)"
+        )
+
+
+def eliminar_indice_busqueda(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {TABLA_FTS_CLIENTES}")
+    elif vendor == 'mysql':
+        schema_editor.execute(f"ALTER TABLE devices_cliente DROP INDEX {INDICE_FULLTEXT_CLIENTES}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('heladeria', '0014_producto_imagen_variantes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cliente',
+            name='busqueda',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(crear_indice_busqueda, eliminar_indice_busqueda),
+    ]
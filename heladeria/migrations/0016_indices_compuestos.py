@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('heladeria', '0015_cliente_busqueda'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='detalleventa',
+            index=models.Index(fields=['producto', 'venta'], name='detalle_producto_venta_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['state', 'nombre'], name='producto_state_nombre_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venta',
+            index=models.Index(fields=['estado', 'fecha'], name='venta_estado_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venta',
+            index=models.Index(fields=['usuario', 'estado'], name='venta_usuario_estado_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+from django.db import migrations
+
+
+def eliminar_carritos(apps, schema_editor):
+    # El carrito del POS ahora vive en la caché (heladeria.carrito); las ventas
+    # CART que quedaban no son ventas y sus líneas ensuciaban los reportes
+    Venta = apps.get_model('heladeria', 'Venta')
+    Venta.objects.using(schema_editor.connection.alias).filter(estado='CART').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('heladeria', '0016_indices_compuestos'),
+    ]
+
+    operations = [
+        migrations.RunPython(eliminar_carritos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('heladeria', '0017_eliminar_ventas_cart'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tareafondo',
+            name='intentos',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+    ]
@@ -1,6 +1,23 @@
 from django.db import models
-from django.contrib.auth.models import User
+from django.db.models import DecimalField, F, Sum
+from django.db.models.functions import Coalesce
+from django.contrib.auth.models import Group, User
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
 from django.utils import timezone
+from decimal import Decimal
+
+from .busqueda import desindexar_cliente, indexar_cliente, texto_busqueda
+from .contadores import invalidar_contadores
+from .imagenes import programar_variantes
+from .permisos import invalidar_grupos
+from .versiones import incrementar_version
+
+# Precio de una línea de venta: el congelado al vender o, en líneas antiguas, el actual
+PRECIO_EFECTIVO = Coalesce(F('precio_unitario'), F('producto__precio'), output_field=DecimalField())
+# Las líneas anteriores al registro de precio_compra se costean a precio de
+# venta para que no aporten ganancia.
+COSTO_EFECTIVO = Coalesce(F('precio_compra'), PRECIO_EFECTIVO, output_field=DecimalField())
 
 class BaseModel(models.Model):
     STATE_CHOICES = [
@@ -34,6 +51,8 @@ class Producto(BaseModel):
     precio_compra = models.DecimalField(max_digits=10, decimal_places=0, default=0)
     stock = models.PositiveIntegerField(default=0)
     imagen = models.ImageField(upload_to='productos/', blank=True, null=True)
+    # Copias reducidas WebP/JPEG de la imagen (heladeria.imagenes)
+    imagen_variantes = models.JSONField(default=dict, blank=True)
 
     categoria = models.ForeignKey(
         Categoria,
@@ -48,6 +67,10 @@ class Producto(BaseModel):
 
     class Meta:
         db_table = 'devices_producto'
+        indexes = [
+            # Catálogo del POS y listados: activos ordenados por nombre
+            models.Index(fields=['state', 'nombre'], name='producto_state_nombre_idx'),
+        ]
 
 class Venta(models.Model):
     usuario = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -59,8 +82,24 @@ class Venta(models.Model):
     )
     fecha = models.DateTimeField(default=timezone.now)
 
-    def total(self):
-        return sum(detalle.subtotal() for detalle in self.detalleventa_set.all())
+    # Totales desnormalizados a partir de los precios congelados en cada línea
+    total = models.DecimalField(max_digits=12, decimal_places=0, default=0, db_index=True)
+    costo = models.DecimalField(max_digits=12, decimal_places=0, default=0)
+    ganancia = models.DecimalField(max_digits=12, decimal_places=0, default=0)
+
+    def recalcular_totales(self):
+        totales = DetalleVenta.objects.filter(venta_id=self.pk).aggregate(
+            total=Coalesce(Sum(F('cantidad') * PRECIO_EFECTIVO), Decimal('0')),
+            costo=Coalesce(Sum(F('cantidad') * COSTO_EFECTIVO), Decimal('0')),
+        )
+        self.total = totales['total']
+        self.costo = totales['costo']
+        self.ganancia = self.total - self.costo
+        # update() y no save(): la venta puede estar borrándose en cascada
+        Venta.objects.filter(pk=self.pk).update(
+            total=self.total, costo=self.costo, ganancia=self.ganancia
+        )
+        invalidar_contadores('ventas')
 
     def __str__(self):
         cliente_info = f" ({self.cliente.nombre_completo})" if self.cliente else ""
@@ -68,6 +107,12 @@ class Venta(models.Model):
     
     class Meta:
         db_table = 'devices_venta'
+        indexes = [
+            # Reportes y listados: ventas de ciertos estados en un rango de fechas
+            models.Index(fields=['estado', 'fecha'], name='venta_estado_fecha_idx'),
+            # Carrito abierto del cajero (usuario + estado CART)
+            models.Index(fields=['usuario', 'estado'], name='venta_usuario_estado_idx'),
+        ]
 
 class DetalleVenta(models.Model):
     venta = models.ForeignKey(Venta, on_delete=models.CASCADE)
@@ -102,6 +147,10 @@ class DetalleVenta(models.Model):
     
     class Meta:
         db_table = 'devices_detalleventa'
+        indexes = [
+            # Ventas de un producto (detalle de producto, filtros por producto de los reportes)
+            models.Index(fields=['producto', 'venta'], name='detalle_producto_venta_idx'),
+        ]
 
 class Cliente(models.Model):
     TIPO_CLIENTE_CHOICES = [
@@ -136,6 +185,9 @@ class Cliente(models.Model):
     recibe_promociones = models.BooleanField(default=False)
     fecha_registro = models.DateTimeField(auto_now_add=True)
 
+    # RUT y teléfono solo con dígitos, nombres sin tildes y en minúsculas (heladeria.busqueda)
+    busqueda = models.CharField(max_length=255, blank=True, default='', editable=False)
+
     def __str__(self):
         return f"{self.nombre} {self.apellido}"
 
@@ -144,4 +196,128 @@ class Cliente(models.Model):
         return f"{self.nombre} {self.apellido}"
     
     class Meta:
-        db_table = 'devices_cliente'
\ No newline at end of file
+        db_table = 'devices_cliente'
+class ResumenVentaDiaria(models.Model):
+    fecha = models.DateField()
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='resumenes_diarios')
+    estado = models.CharField(max_length=10)
+
+    unidades = models.PositiveIntegerField(default=0)
+    ingreso = models.DecimalField(max_digits=14, decimal_places=0, default=0)
+    costo = models.DecimalField(max_digits=14, decimal_places=0, default=0)
+    ordenes = models.PositiveIntegerField(default=0)
+    clientes = models.PositiveIntegerField(default=0)
+
+    def ganancia(self):
+        return self.ingreso - self.costo
+
+    def __str__(self):
+        return f"{self.fecha} - {self.producto_id} ({self.estado})"
+
+    class Meta:
+        db_table = 'devices_resumenventadiaria'
+        constraints = [
+            models.UniqueConstraint(fields=['fecha', 'producto', 'estado'], name='resumen_dia_producto_estado'),
+        ]
+
+class TareaFondo(models.Model):
+    ESTADO_CHOICES = [
+        ('PENDIENTE', 'Pendiente'),
+        ('EN_PROCESO', 'En proceso'),
+        ('COMPLETADA', 'Completada'),
+        ('FALLIDA', 'Fallida'),
+    ]
+
+    tipo = models.CharField(max_length=50)
+    parametros = models.JSONField(default=dict, blank=True)
+    estado = models.CharField(max_length=10, choices=ESTADO_CHOICES, default='PENDIENTE')
+    usuario = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+
+    # Ruta relativa a MEDIA_ROOT del archivo generado
+    archivo = models.FileField(upload_to='exportaciones/', blank=True)
+    error = models.TextField(blank=True)
+
+    creada = models.DateTimeField(auto_now_add=True)
+    # Momento en que un worker la reclamó; si sigue EN_PROCESO mucho después,
+    # el worker murió y la tarea se vuelve a encolar (heladeria.tareas)
+    iniciada = models.DateTimeField(null=True, blank=True)
+    terminada = models.DateTimeField(null=True, blank=True)
+    intentos = models.PositiveSmallIntegerField(default=0)
+
+    def __str__(self):
+        return f"Tarea #{self.id} - {self.tipo} ({self.estado})"
+
+    class Meta:
+        db_table = 'devices_tareafondo'
+        indexes = [
+            models.Index(fields=['estado', 'creada'], name='tarea_estado_creada_idx'),
+        ]
+
+
+# Caché de grupos por usuario (heladeria.permisos): se invalida al cambiar la membresía
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidar_grupos_usuario(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and reverse:
+        # Tras group.user_set.clear() ya no se sabe quiénes eran miembros
+        instance._miembros_antes_de_clear = list(instance.user_set.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        invalidar_grupos([instance.pk])
+    elif action == 'post_clear':
+        invalidar_grupos(instance.__dict__.pop('_miembros_antes_de_clear', []))
+    else:
+        invalidar_grupos(pk_set)
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def invalidar_grupos_miembros(sender, instance, **kwargs):
+    invalidar_grupos(instance.user_set.values_list('pk', flat=True))
+
+
+# El catálogo del POS se cachea por versión (heladeria.catalogo)
+@receiver(post_save, sender=Producto)
+@receiver(post_delete, sender=Producto)
+@receiver(post_save, sender=Categoria)
+@receiver(post_delete, sender=Categoria)
+def invalidar_catalogo(sender, **kwargs):
+    incrementar_version('catalogo')
+
+
+# Contadores de las cabeceras de listados (heladeria.contadores)
+@receiver(post_save, sender=Venta)
+@receiver(post_delete, sender=Venta)
+def invalidar_contadores_ventas(sender, **kwargs):
+    invalidar_contadores('ventas')
+
+
+@receiver(post_save, sender=Producto)
+@receiver(post_delete, sender=Producto)
+def invalidar_contadores_productos(sender, **kwargs):
+    invalidar_contadores('productos')
+
+
+@receiver(post_save, sender=Producto)
+def programar_variantes_producto(sender, instance, raw=False, **kwargs):
+    if not raw:
+        programar_variantes(instance, 'imagen')
+
+
+# Búsqueda de clientes: columna normalizada y, en SQLite, la tabla FTS5
+@receiver(pre_save, sender=Cliente)
+def actualizar_busqueda_cliente(sender, instance, **kwargs):
+    instance.busqueda = texto_busqueda(
+        instance.rut, instance.nombre, instance.apellido, instance.telefono, instance.email
+    )
+
+
+@receiver(post_save, sender=Cliente)
+def indexar_cliente_guardado(sender, instance, **kwargs):
+    indexar_cliente(instance.pk, instance.busqueda)
+
+
+@receiver(post_delete, sender=Cliente)
+def desindexar_cliente_eliminado(sender, instance, **kwargs):
+    desindexar_cliente(instance.pk)
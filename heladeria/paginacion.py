@@ -0,0 +1,207 @@
+import base64
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.db.models import Q
+
+# Tiempo que se reutiliza un conteo antes de volver a ejecutar el COUNT(*)
+TTL_CONTEO_APROXIMADO = 300
+
+
+def _codificar_cursor(valor, pk, sentido):
+    datos = json.dumps({"v": valor, "id": pk, "s": sentido}, default=str)
+    return base64.urlsafe_b64encode(datos.encode()).decode().rstrip("=")
+
+
+def _decodificar_cursor(cursor):
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        datos = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        return datos["v"], int(datos["id"]), datos["s"]
+    except (ValueError, TypeError, KeyError):
+        return None
+
+
+def _clave_conteo(queryset):
+    sql = str(queryset.order_by().query)
+    return "conteo:%s:%s" % (
+        queryset.model._meta.label_lower,
+        hashlib.md5(sql.encode()).hexdigest(),
+    )
+
+
+def conteo_aproximado(queryset):
+    """COUNT(*) del queryset reutilizado durante unos minutos desde la caché."""
+    return cache.get_or_set(_clave_conteo(queryset), queryset.count, TTL_CONTEO_APROXIMADO)
+
+
+async def aconteo_aproximado(queryset):
+    clave = _clave_conteo(queryset)
+    total = await cache.aget(clave)
+    if total is None:
+        total = await queryset.acount()
+        await cache.aset(clave, total, TTL_CONTEO_APROXIMADO)
+    return total
+
+
+class PaginaCursor:
+    """
+    Página de una paginación por cursor (keyset). Expone lo que usan las
+    tablas (iteración, has_next, has_previous) más los cursores de las páginas
+    vecinas y un total aproximado; no hay número de página ni COUNT exacto.
+    """
+    es_cursor = True
+
+    def __init__(self, object_list, has_next, has_previous, next_cursor, previous_cursor, total_aproximado):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.total_aproximado = total_aproximado
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+
+def _cursor_valido(queryset, campo, cursor):
+    """
+    (valor, pk, sentido) del cursor con el valor convertido al tipo del campo,
+    o None si el cursor está mal formado o manipulado: se sirve la primera
+    página en vez de dejar que el filtro falle con un 500.
+    """
+    decodificado = _decodificar_cursor(cursor) if cursor else None
+    if decodificado is None:
+        return None
+    valor, pk, sentido = decodificado
+    try:
+        valor = queryset.model._meta.get_field(campo).to_python(valor)
+    except (ValidationError, TypeError, ValueError):
+        return None
+    if valor is None:
+        return None
+    return valor, pk, sentido
+
+
+def _consulta_cursor(queryset, campo, descendente, cursor, per_page):
+    decodificado = _cursor_valido(queryset, campo, cursor)
+    orden = [f"-{campo}", "-id"] if descendente else [campo, "id"]
+    hacia_atras = False
+
+    qs = queryset
+    if decodificado:
+        valor, pk, sentido = decodificado
+        hacia_atras = sentido == "p"
+        # Hacia adelante en orden descendente (o atrás en ascendente) se buscan menores
+        lookup = "lt" if descendente != hacia_atras else "gt"
+        qs = qs.filter(
+            Q(**{f"{campo}__{lookup}": valor}) | Q(**{campo: valor, f"id__{lookup}": pk})
+        )
+        if hacia_atras:
+            orden = [o[1:] if o.startswith("-") else f"-{o}" for o in orden]
+
+    return qs.order_by(*orden)[:per_page + 1], decodificado is not None, hacia_atras
+
+
+def _pagina_cursor(filas, campo, per_page, con_cursor, hacia_atras, total_aproximado):
+    hay_mas = len(filas) > per_page
+    filas = filas[:per_page]
+    if hacia_atras:
+        filas.reverse()
+        has_next, has_previous = True, hay_mas
+    else:
+        has_next, has_previous = hay_mas, con_cursor
+
+    primero, ultimo = (filas[0], filas[-1]) if filas else (None, None)
+    return PaginaCursor(
+        filas,
+        has_next=has_next,
+        has_previous=has_previous,
+        next_cursor=_codificar_cursor(getattr(ultimo, campo), ultimo.pk, "n") if has_next and ultimo else None,
+        previous_cursor=_codificar_cursor(getattr(primero, campo), primero.pk, "p") if has_previous and primero else None,
+        total_aproximado=total_aproximado,
+    )
+
+
+def paginar_por_cursor(queryset, campo, descendente, cursor, per_page):
+    """
+    Pagina el queryset ordenado por (campo, id) filtrando a partir del último
+    registro visto en lugar de usar OFFSET, así el costo de cada página no
+    depende de lo lejos que esté. El campo no debe admitir nulos.
+    """
+    consulta, con_cursor, hacia_atras = _consulta_cursor(queryset, campo, descendente, cursor, per_page)
+    return _pagina_cursor(
+        list(consulta), campo, per_page, con_cursor, hacia_atras, conteo_aproximado(queryset)
+    )
+
+
+async def apaginar_por_cursor(queryset, campo, descendente, cursor, per_page):
+    consulta, con_cursor, hacia_atras = _consulta_cursor(queryset, campo, descendente, cursor, per_page)
+    filas = [fila async for fila in consulta]
+    return _pagina_cursor(
+        filas, campo, per_page, con_cursor, hacia_atras, await aconteo_aproximado(queryset)
+    )
+
+
+def numero_pagina(paginator, numero):
+    """Número de la página que get_page serviría: la primera si no es válido, la última si se pasa."""
+    try:
+        return paginator.validate_number(numero)
+    except PageNotAnInteger:
+        return 1
+    except EmptyPage:
+        return paginator.num_pages
+
+
+async def apagina(queryset, per_page, numero):
+    """
+    Equivalente async de Paginator(queryset, per_page).get_page(numero) con
+    la página ya evaluada, para que la plantilla no consulte la base de datos.
+    """
+    paginator = Paginator(queryset, per_page)
+    paginator.count = await queryset.acount()
+    numero = numero_pagina(paginator, numero)
+
+    desde = (numero - 1) * paginator.per_page
+    filas = [fila async for fila in queryset[desde:desde + paginator.per_page]]
+    return paginator._get_page(filas, numero, paginator)
+
+
+def paginar(request, queryset, sort, direction, per_page, campos_cursor):
+    """
+    Pagina un listado. Con ?paginacion=cursor (o un ?cursor=) y un orden por
+    alguno de los campos permitidos usa paginación por cursor; en cualquier
+    otro caso conserva el Paginator clásico con número de página.
+    """
+    modo_cursor = request.GET.get("paginacion") == "cursor" or "cursor" in request.GET
+    if modo_cursor and sort in campos_cursor:
+        return paginar_por_cursor(
+            queryset, sort, direction == "desc", request.GET.get("cursor"), per_page
+        )
+    return Paginator(queryset, per_page).get_page(request.GET.get("page"))
+
+
+async def apaginar(request, queryset, sort, direction, per_page, campos_cursor):
+    """Versión async de paginar para las vistas AJAX async."""
+    modo_cursor = request.GET.get("paginacion") == "cursor" or "cursor" in request.GET
+    if modo_cursor and sort in campos_cursor:
+        return await apaginar_por_cursor(
+            queryset, sort, direction == "desc", request.GET.get("cursor"), per_page
+        )
+    return await apagina(queryset, per_page, request.GET.get("page"))
+
+
+def total_listado(page_obj):
+    """Total de registros del listado: exacto con Paginator, aproximado con cursor."""
+    if isinstance(page_obj, PaginaCursor):
+        return page_obj.total_aproximado
+    return page_obj.paginator.count
@@ -0,0 +1,72 @@
+from django.core.cache import cache
+from django.db import transaction
+
+# Los cambios de grupos invalidan la entrada al instante; el TTL es solo un respaldo
+TTL_GRUPOS = 600
+
+
+def _clave(user_id):
+    return f"grupos_usuario:{user_id}"
+
+
+def grupos_de(user):
+    """
+    Nombres de los grupos del usuario. Se consultan una vez por petición
+    (quedan memorizados en el propio objeto user) y se guardan en la caché
+    entre peticiones hasta que cambie la membresía.
+    """
+    if not user.is_authenticated:
+        return frozenset()
+
+    grupos = getattr(user, "_grupos_memo", None)
+    if grupos is None:
+        grupos = cache.get(_clave(user.pk))
+        if grupos is None:
+            grupos = frozenset(user.groups.values_list("name", flat=True))
+            cache.set(_clave(user.pk), grupos, TTL_GRUPOS)
+        user._grupos_memo = grupos
+    return grupos
+
+
+def tiene_grupo(user, *nombres):
+    return not grupos_de(user).isdisjoint(nombres)
+
+
+def invalidar_grupos(user_ids):
+    """
+    Borra las entradas tras el commit: antes, una petición concurrente podría
+    volver a cachear los grupos aún no cambiados y dejarlos por todo el TTL.
+    """
+    claves = [_clave(user_id) for user_id in user_ids]
+    transaction.on_commit(lambda: cache.delete_many(claves))
+
+
+async def agrupos_de(user):
+    """Versión async de grupos_de para vistas async (misma memoria y caché)."""
+    if not user.is_authenticated:
+        return frozenset()
+
+    grupos = getattr(user, "_grupos_memo", None)
+    if grupos is None:
+        grupos = await cache.aget(_clave(user.pk))
+        if grupos is None:
+            grupos = frozenset([nombre async for nombre in user.groups.values_list("name", flat=True)])
+            await cache.aset(_clave(user.pk), grupos, TTL_GRUPOS)
+        user._grupos_memo = grupos
+    return grupos
+
+
+async def atiene_grupo(user, *nombres):
+    return not (await agrupos_de(user)).isdisjoint(nombres)
+
+
+async def ausuario(request):
+    """
+    Usuario de la petición en una vista async. Deja en request.user el usuario
+    ya cargado y con sus grupos en memoria, para que las plantillas (p. ej. el
+    filtro tiene_grupo) no consulten la base de datos desde el contexto async.
+    """
+    user = await request.auser()
+    await agrupos_de(user)
+    request.user = user
+    return user
@@ -0,0 +1,273 @@
+import logging
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from itertools import islice
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import COSTO_EFECTIVO, PRECIO_EFECTIVO, DetalleVenta, ResumenVentaDiaria, Venta
+from .versiones import incrementar_version
+
+logger = logging.getLogger(__name__)
+
+# Los carritos abiertos no son ventas y no se resumen
+ESTADOS_RESUMIDOS = ['PENDING', 'COMPLETED', 'CANCELLED']
+
+
+def _filas_resumen(detalles):
+    """Agrupa líneas de venta por (día, producto, estado) con las métricas del resumen."""
+    return (
+        detalles
+        .filter(venta__estado__in=ESTADOS_RESUMIDOS)
+        .annotate(dia=TruncDate('venta__fecha'))
+        .values('dia', 'producto_id', 'venta__estado')
+        .annotate(
+            total_unidades=Sum('cantidad'),
+            total_ingreso=Sum(F('cantidad') * PRECIO_EFECTIVO, output_field=DecimalField()),
+            total_costo=Sum(F('cantidad') * COSTO_EFECTIVO, output_field=DecimalField()),
+            total_ordenes=Count('venta', distinct=True),
+            total_clientes=Count('venta__cliente', distinct=True),
+        )
+        .order_by()
+    )
+
+
+def _crear_resumenes(filas, batch_size=1000):
+    objetos = (
+        ResumenVentaDiaria(
+            fecha=fila['dia'],
+            producto_id=fila['producto_id'],
+            estado=fila['venta__estado'],
+            unidades=fila['total_unidades'] or 0,
+            ingreso=fila['total_ingreso'] or 0,
+            costo=fila['total_costo'] or 0,
+            ordenes=fila['total_ordenes'],
+            clientes=fila['total_clientes'],
+        )
+        for fila in filas.iterator(chunk_size=batch_size)
+    )
+    creados = 0
+    while True:
+        lote = list(islice(objetos, batch_size))
+        if not lote:
+            return creados
+        ResumenVentaDiaria.objects.bulk_create(lote)
+        creados += len(lote)
+
+
+def rango_fechas(desde, hasta):
+    """
+    Días [desde, hasta] como rango semiabierto de datetimes [inicio, fin).
+    Filtrar con fecha__gte/fecha__lt usa los índices sobre Venta.fecha;
+    fecha__date no, porque aplica una función a la columna.
+    """
+    inicio = timezone.make_aware(datetime.combine(desde, time.min))
+    fin = timezone.make_aware(datetime.combine(hasta + timedelta(days=1), time.min))
+    return inicio, fin
+
+
+def _rango_dia(dia):
+    return rango_fechas(dia, dia)
+
+
+def _aportes(venta_ids):
+    """
+    Lo que las ventas dadas suman hoy a cada celda (día, producto, estado) del
+    resumen, con las ventas y clientes que cuentan en ella.
+    """
+    aportes = defaultdict(lambda: {
+        'unidades': 0, 'ingreso': Decimal(0), 'costo': Decimal(0),
+        'ventas': set(), 'clientes': set(),
+    })
+    filas = (
+        DetalleVenta.objects
+        .filter(venta_id__in=venta_ids, venta__estado__in=ESTADOS_RESUMIDOS)
+        .annotate(dia=TruncDate('venta__fecha'))
+        .values('dia', 'producto_id', 'venta__estado', 'venta_id', 'venta__cliente_id')
+        .annotate(
+            total_unidades=Sum('cantidad'),
+            total_ingreso=Sum(F('cantidad') * PRECIO_EFECTIVO, output_field=DecimalField()),
+            total_costo=Sum(F('cantidad') * COSTO_EFECTIVO, output_field=DecimalField()),
+        )
+        .order_by()
+    )
+    for fila in filas:
+        celda = aportes[(fila['dia'], fila['producto_id'], fila['venta__estado'])]
+        celda['unidades'] += fila['total_unidades'] or 0
+        celda['ingreso'] += fila['total_ingreso'] or 0
+        celda['costo'] += fila['total_costo'] or 0
+        celda['ventas'].add(fila['venta_id'])
+        if fila['venta__cliente_id'] is not None:
+            celda['clientes'].add(fila['venta__cliente_id'])
+    return aportes
+
+
+def _clientes_de_otras_ventas(pares, venta_ids):
+    """
+    De los pares (celda, cliente) dados, los que siguen contando en su celda
+    por alguna venta ajena a venta_ids.
+    """
+    if not pares:
+        return set()
+    dias = [dia for (dia, _, _), _ in pares]
+    inicio, fin = rango_fechas(min(dias), max(dias))
+    otros = (
+        DetalleVenta.objects
+        .filter(
+            venta__fecha__gte=inicio,
+            venta__fecha__lt=fin,
+            producto_id__in={producto for (_, producto, _), _ in pares},
+            venta__estado__in={estado for (_, _, estado), _ in pares},
+            venta__cliente_id__in={cliente for _, cliente in pares},
+        )
+        .exclude(venta_id__in=venta_ids)
+        .annotate(dia=TruncDate('venta__fecha'))
+        .values_list('dia', 'producto_id', 'venta__estado', 'venta__cliente_id')
+        .distinct()
+    )
+    return {((dia, producto, estado), cliente) for dia, producto, estado, cliente in otros} & pares
+
+
+def _sumar_celda(celda, cambios):
+    """
+    Suma los cambios a una celda con un UPDATE ... SET campo = campo + n; si la
+    celda aún no existe se crea en un savepoint, y si otra transacción la creó
+    entretanto se vuelve a sumar sobre la suya.
+    """
+    dia, producto_id, estado = celda
+    filas = ResumenVentaDiaria.objects.filter(fecha=dia, producto_id=producto_id, estado=estado)
+    incrementos = {campo: F(campo) + valor for campo, valor in cambios.items()}
+    if filas.update(**incrementos):
+        return
+    if any(valor < 0 for valor in cambios.values()):
+        # Restar de una celda inexistente: el resumen ya estaba desfasado
+        logger.warning(
+            "Celda del resumen %s inexistente al restar; ejecuta reconstruir_resumen_ventas", celda
+        )
+        return
+    try:
+        with transaction.atomic():
+            ResumenVentaDiaria.objects.create(
+                fecha=dia, producto_id=producto_id, estado=estado, **cambios
+            )
+    except IntegrityError:
+        filas.update(**incrementos)
+
+
+def _aplicar_aportes(antes, despues, venta_ids):
+    """
+    Lleva el resumen del estado 'antes' al 'despues' de las ventas dadas
+    sumando solo la diferencia a cada celda; el resto del resumen no se toca.
+    """
+    celdas = sorted(antes.keys() | despues.keys())
+    vacio = {'unidades': 0, 'ingreso': 0, 'costo': 0, 'ventas': set(), 'clientes': set()}
+
+    # Un cliente que entra o sale de una celda solo cambia la cuenta si no
+    # tiene otras ventas en ella
+    pares = {
+        (celda, cliente)
+        for celda in celdas
+        for cliente in antes.get(celda, vacio)['clientes'] ^ despues.get(celda, vacio)['clientes']
+    }
+    siguen = _clientes_de_otras_ventas(pares, venta_ids)
+
+    tocadas = []
+    for celda in celdas:
+        previo, nuevo = antes.get(celda, vacio), despues.get(celda, vacio)
+        cambios = {
+            campo: nuevo[campo] - previo[campo] for campo in ('unidades', 'ingreso', 'costo')
+        }
+        cambios['ordenes'] = len(nuevo['ventas']) - len(previo['ventas'])
+        cambios['clientes'] = sum(
+            1 if cliente in nuevo['clientes'] else -1
+            for cliente in previo['clientes'] ^ nuevo['clientes']
+            if (celda, cliente) not in siguen
+        )
+        cambios = {campo: valor for campo, valor in cambios.items() if valor}
+        if cambios:
+            _sumar_celda(celda, cambios)
+            tocadas.append(celda)
+
+    # Una celda sin órdenes es una celda que ya no existe
+    for dia, producto_id, estado in tocadas:
+        ResumenVentaDiaria.objects.filter(
+            fecha=dia, producto_id=producto_id, estado=estado, ordenes__lte=0
+        ).delete()
+
+    # Tras el commit, para que nadie cachee de nuevo los datos anteriores a la venta
+    productos = {producto_id for _, producto_id, _ in tocadas}
+    transaction.on_commit(lambda: [incrementar_version(f'producto:{p}') for p in productos])
+    # Los reportes de períodos cerrados solo se invalidan si cambió un día pasado
+    if any(dia < timezone.localdate() for dia, _, _ in tocadas):
+        transaction.on_commit(lambda: incrementar_version('resumen_cerrado'))
+
+
+def sumar_al_resumen(venta_ids):
+    """
+    Suma al resumen ventas recién creadas. Pensada para transaction.on_commit:
+    si falla, la venta ya está guardada y el resumen se repara con
+    reconstruir_resumen_ventas.
+    """
+    venta_ids = list(venta_ids)
+    try:
+        with transaction.atomic():
+            _aplicar_aportes({}, _aportes(venta_ids), venta_ids)
+    except Exception:
+        logger.exception(
+            "No se pudo sumar al resumen las ventas %s; ejecuta reconstruir_resumen_ventas",
+            venta_ids,
+        )
+
+
+@contextmanager
+def sincronizar_resumen(venta_ids):
+    """
+    Mantiene el resumen al día mientras se modifican ventas. Todo el bloque
+    corre en una transacción: al salir se aplica al resumen la diferencia
+    entre lo que las ventas aportaban antes y después, y si el bloque lanza
+    una excepción se revierte sin tocar el resumen.
+    """
+    venta_ids = list(venta_ids)
+    with transaction.atomic():
+        # Bloquea las ventas para que dos cambios simultáneos no partan del mismo 'antes'
+        list(Venta.objects.select_for_update().filter(id__in=venta_ids).values_list('id', flat=True))
+        antes = _aportes(venta_ids)
+        yield
+        _aplicar_aportes(antes, _aportes(venta_ids), venta_ids)
+
+
+@contextmanager
+def editar_lineas(venta_ids):
+    """
+    Para escribir líneas de venta fuera del checkout (admin, correcciones):
+    al salir recalcula los totales guardados en Venta y aplica el cambio al
+    resumen, en la misma transacción que la escritura.
+    """
+    venta_ids = list(venta_ids)
+    with sincronizar_resumen(venta_ids):
+        yield
+        for venta in Venta.objects.filter(id__in=venta_ids):
+            venta.recalcular_totales()
+
+
+def reconstruir_resumen(desde=None, hasta=None):
+    """Regenera el resumen a partir del historial completo (o de un rango de días)."""
+    resumenes = ResumenVentaDiaria.objects.all()
+    detalles = DetalleVenta.objects.all()
+    if desde:
+        resumenes = resumenes.filter(fecha__gte=desde)
+        detalles = detalles.filter(venta__fecha__gte=_rango_dia(desde)[0])
+    if hasta:
+        resumenes = resumenes.filter(fecha__lte=hasta)
+        detalles = detalles.filter(venta__fecha__lt=_rango_dia(hasta)[1])
+
+    with transaction.atomic():
+        resumenes.delete()
+        creados = _crear_resumenes(_filas_resumen(detalles))
+        transaction.on_commit(lambda: incrementar_version('resumen'))
+    return creados
@@ -0,0 +1,162 @@
+import traceback
+from pathlib import Path
+
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .exportacion import (
+    escribir_xlsx,
+    filas_clientes,
+    filas_detalle_producto,
+    filas_productos,
+    filas_ventas,
+)
+from .imagenes import generar_variantes
+from .models import Producto, TareaFondo
+from .permisos import tiene_grupo
+
+# tipo -> (función, grupos que pueden encolarla; vacío = cualquier usuario,
+# None = solo la encola el sistema)
+REGISTRO = {}
+
+CARPETA_EXPORTACIONES = "exportaciones"
+
+# Una tarea EN_PROCESO por más de este tiempo quedó huérfana (el worker murió)
+TIMEOUT_TAREA = timedelta(minutes=30)
+# Reclamos antes de darla por fallida: evita reintentar para siempre una tarea que mata al worker
+MAX_INTENTOS = 3
+
+
+def registrar(tipo, grupos=()):
+    """Registra una función tarea(tarea) -> ruta del archivo relativa a MEDIA_ROOT."""
+    def decorador(funcion):
+        REGISTRO[tipo] = (funcion, None if grupos is None else tuple(grupos))
+        return funcion
+    return decorador
+
+
+def _guardar_xlsx(tarea, nombre, titulo, encabezados, filas):
+    relativa = f"{CARPETA_EXPORTACIONES}/{nombre}_{tarea.id}.xlsx"
+    destino = Path(settings.MEDIA_ROOT) / relativa
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    escribir_xlsx(destino, titulo, encabezados, filas)
+    return relativa
+
+
+@registrar("exportar_ventas", grupos=("Admin",))
+def exportar_ventas(tarea):
+    return _guardar_xlsx(tarea, "ventas", "Ventas", *filas_ventas())
+
+
+@registrar("exportar_clientes")
+def exportar_clientes(tarea):
+    return _guardar_xlsx(tarea, "clientes", "Clientes", *filas_clientes())
+
+
+@registrar("exportar_productos", grupos=("Admin",))
+def exportar_productos(tarea):
+    return _guardar_xlsx(tarea, "productos", "Productos", *filas_productos())
+
+
+@registrar("exportar_detalle_producto", grupos=("Admin",))
+def exportar_detalle_producto(tarea):
+    # Import diferido: heladeria no depende de la app productos al cargar
+    from productos.views import _get_filtered_queryset
+
+    producto = Producto.objects.get(pk=tarea.parametros["producto_id"])
+    detalles, _ = _get_filtered_queryset(producto, tarea.parametros.get("filtros", {}))
+    return _guardar_xlsx(
+        tarea, f"detalle_producto_{producto.id}", "Detalle", *filas_detalle_producto(detalles)
+    )
+
+
+@registrar("variantes_imagen", grupos=None)
+def variantes_imagen(tarea):
+    """Genera las variantes de un ImageField; no produce archivo descargable."""
+    p = tarea.parametros
+    instancia = apps.get_model(p["modelo"]).objects.get(pk=p["pk"])
+    setattr(instancia, f"{p['campo']}_variantes", generar_variantes(getattr(instancia, p["campo"])))
+    # save() y no update(): post_save invalida la caché del catálogo
+    instancia.save(update_fields=[f"{p['campo']}_variantes"])
+    return ""
+
+
+def puede_encolar(usuario, tipo):
+    if tipo not in REGISTRO:
+        return False
+    grupos = REGISTRO[tipo][1]
+    if grupos is None:
+        return False
+    return not grupos or tiene_grupo(usuario, *grupos)
+
+
+def encolar(tipo, usuario=None, **parametros):
+    if tipo not in REGISTRO:
+        raise ValueError(f"Tarea desconocida: {tipo}")
+    return TareaFondo.objects.create(tipo=tipo, usuario=usuario, parametros=parametros)
+
+
+def reclamar_pendientes(limite):
+    """
+    Marca como EN_PROCESO hasta `limite` tareas pendientes y devuelve sus ids.
+    El UPDATE condicional evita que dos workers tomen la misma tarea.
+    """
+    candidatas = (
+        TareaFondo.objects
+        .filter(estado="PENDIENTE")
+        .order_by("creada")
+        .values_list("id", flat=True)[:limite]
+    )
+    reclamadas = []
+    for tarea_id in candidatas:
+        tomada = TareaFondo.objects.filter(pk=tarea_id, estado="PENDIENTE").update(
+            estado="EN_PROCESO", iniciada=timezone.now(), intentos=F("intentos") + 1
+        )
+        if tomada:
+            reclamadas.append(tarea_id)
+    return reclamadas
+
+
+def recuperar_huerfanas(timeout=TIMEOUT_TAREA):
+    """
+    Tareas EN_PROCESO reclamadas hace más de `timeout`: vuelven a PENDIENTE o,
+    si ya agotaron MAX_INTENTOS, quedan FALLIDA. Devuelve (reencoladas, fallidas).
+    """
+    return _liberar(TareaFondo.objects.filter(estado="EN_PROCESO", iniciada__lt=timezone.now() - timeout))
+
+
+def liberar_interrumpidas(tarea_ids):
+    """
+    Tareas cuyo proceso del pool murió (BrokenProcessPool): se reencolan o
+    fallan ya, como las huérfanas, sin esperar al timeout.
+    """
+    return _liberar(TareaFondo.objects.filter(pk__in=tarea_ids, estado="EN_PROCESO"))
+
+
+def _liberar(tareas):
+    fallidas = tareas.filter(intentos__gte=MAX_INTENTOS).update(
+        estado="FALLIDA",
+        error="El worker se interrumpió mientras la procesaba",
+        terminada=timezone.now(),
+    )
+    reencoladas = tareas.filter(intentos__lt=MAX_INTENTOS).update(estado="PENDIENTE", iniciada=None)
+    return reencoladas, fallidas
+
+
+def ejecutar_tarea(tarea_id):
+    """Ejecuta una tarea ya reclamada y guarda su resultado. Devuelve el estado final."""
+    tarea = TareaFondo.objects.get(pk=tarea_id)
+    try:
+        funcion, _ = REGISTRO[tarea.tipo]
+        tarea.archivo.name = funcion(tarea)
+        tarea.estado = "COMPLETADA"
+    except Exception:
+        tarea.estado = "FALLIDA"
+        tarea.error = traceback.format_exc()
+    tarea.terminada = timezone.now()
+    tarea.save(update_fields=["archivo", "estado", "error", "terminada"])
+    return tarea.estado
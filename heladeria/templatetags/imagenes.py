@@ -0,0 +1,38 @@
+from django import template
+from django.forms.utils import flatatt
+from django.utils.html import format_html
+
+register = template.Library()
+
+
+def _srcset(storage, rutas):
+    return ", ".join(
+        f"{storage.url(ruta)} {ancho}w"
+        for ancho, ruta in sorted(rutas.items(), key=lambda item: int(item[0]))
+    )
+
+
+@register.simple_tag
+def imagen_responsive(archivo, variantes, sizes, alt="", **atributos):
+    """
+    <picture> con las variantes WebP/JPEG de la imagen para que el navegador
+    descargue el tamaño que necesita. Sin variantes usa el original.
+    Uso: {% imagen_responsive producto.imagen producto.imagen_variantes "150px" alt=producto.nombre class="..." %}
+    """
+    if not archivo:
+        return ""
+
+    variantes = variantes or {}
+    jpeg, webp = variantes.get("jpeg"), variantes.get("webp")
+    if variantes.get("origen") != archivo.name or not jpeg:
+        return format_html('<img src="{}" alt="{}" loading="lazy"{}>', archivo.url, alt, flatatt(atributos))
+
+    storage = archivo.storage
+    fuente_webp = format_html(
+        '<source type="image/webp" srcset="{}" sizes="{}">', _srcset(storage, webp), sizes
+    ) if webp else ""
+    mayor = jpeg[max(jpeg, key=int)]
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" alt="{}" loading="lazy"{}></picture>',
+        fuente_webp, storage.url(mayor), _srcset(storage, jpeg), sizes, alt, flatatt(atributos),
+    )
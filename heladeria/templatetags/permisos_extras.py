@@ -1,8 +1,10 @@
 from django import template
 
+from heladeria.permisos import tiene_grupo as _tiene_grupo
+
 register = template.Library()
 
 @register.filter(name='tiene_grupo')
 def tiene_grupo(user, nombre_grupo):
     """Verifica si el usuario pertenece a un grupo específico"""
-    return user.groups.filter(name=nombre_grupo).exists()
\ No newline at end of file
+    return _tiene_grupo(user, nombre_grupo)
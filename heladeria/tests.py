@@ -1,3 +1,998 @@
-from django.test import TestCase
+import base64
+import json
+import shutil
+import tempfile
+import time
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, datetime, timedelta
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib import admin
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import SystemCheckError
+from django.db import IntegrityError, connection
+from django.test import RequestFactory, TestCase, override_settings, skipUnlessDBFeature
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from accounts.models import PerfilUsuario
+from heladeria import tareas
+from heladeria.admin import DetalleVentaAdmin
+from heladeria.carrito import MAX_CANTIDAD, TTL_CARRITO, Carrito
+from heladeria.catalogo import _clave_catalogo, apagina_catalogo, pagina_catalogo
+from heladeria.checkout import registrar_venta
+from heladeria.checks import verificar_perfil_produccion
+from heladeria.contadores import contadores_productos, contadores_ventas
+from heladeria.imagenes import generar_variantes
+from heladeria.middleware import ESTADISTICAS, EstadisticasVistas
+from heladeria.models import Cliente, DetalleVenta, Producto, ResumenVentaDiaria, TareaFondo, Venta
+from heladeria.resumen import reconstruir_resumen, sincronizar_resumen
+from heladeria.templatetags.imagenes import imagen_responsive
+from heladeria.versiones import aversion
+from productos.views import _estadisticas_producto
+from reportes.services import MAX_BUCKETS_SERIE, _ventas_filtradas, resumen_ventas_por_producto
+
+
+@skipUnlessDBFeature('supports_explaining_query_execution')
+class IndicesCompuestosTests(TestCase):
+    """Las consultas principales de reportes y listados usan los índices compuestos."""
+
+    def assertUsaIndice(self, queryset, indice):
+        plan = queryset.explain()
+        self.assertIn(indice, plan, f"{connection.vendor} no usó {indice}:\n{plan}")
+
+    def test_ventas_por_estado_y_rango_de_fechas(self):
+        ventas = _ventas_filtradas(['COMPLETED'], date(2025, 1, 1), date(2025, 1, 31), None)
+        self.assertUsaIndice(ventas, 'venta_estado_fecha_idx')
+
+    def test_rango_de_fechas_es_sargable(self):
+        sql = str(_ventas_filtradas(['COMPLETED'], date(2025, 1, 1), date(2025, 1, 31), None).query)
+        self.assertNotIn('django_datetime_cast_date', sql)
+        self.assertNotIn('DATE(', sql.upper())
+
+    def test_carrito_del_cajero(self):
+        self.assertUsaIndice(Venta.objects.filter(usuario_id=1, estado='CART'), 'venta_usuario_estado_idx')
+
+    def test_ventas_de_un_producto(self):
+        detalles = DetalleVenta.objects.filter(producto_id=1).values('venta_id')
+        self.assertUsaIndice(detalles, 'detalle_producto_venta_idx')
+
+    def test_productos_activos_por_nombre(self):
+        productos = Producto.objects.filter(state='ACTIVE').order_by('nombre')
+        self.assertUsaIndice(productos, 'producto_state_nombre_idx')
+
+
+class BuscarClientesTests(TestCase):
+    """El autocompletado de clientes acota el parámetro limit."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('cajero', password='x')
+        for i in range(3):
+            Cliente.objects.create(
+                rut=f'1111111{i}-{i}', nombre='Sofía', apellido=f'Muñoz {i}', email=f'sofia{i}@example.com'
+            )
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def buscar(self, limite):
+        return self.client.get(reverse('buscar_clientes_ajax'), {'q': 'so', 'limit': limite})
+
+    def test_limite_negativo_o_cero_devuelve_al_menos_uno(self):
+        for limite in ('-1', '0'):
+            response = self.buscar(limite)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.json()['resultados']), 1)
+
+    def test_limite_no_numerico_usa_el_valor_por_defecto(self):
+        response = self.buscar('abc')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['resultados']), 3)
+
+
+class TareasHuerfanasTests(TestCase):
+    """Las tareas que un worker dejó EN_PROCESO vuelven a la cola o fallan."""
+
+    def reclamar_y_abandonar(self, tarea):
+        self.assertEqual(tareas.reclamar_pendientes(1), [tarea.id])
+        TareaFondo.objects.filter(pk=tarea.pk).update(iniciada=timezone.now() - tareas.TIMEOUT_TAREA * 2)
+
+    def test_se_reencola_y_falla_al_agotar_intentos(self):
+        tarea = tareas.encolar('exportar_clientes')
+        for _ in range(tareas.MAX_INTENTOS - 1):
+            self.reclamar_y_abandonar(tarea)
+            self.assertEqual(tareas.recuperar_huerfanas(), (1, 0))
+            tarea.refresh_from_db()
+            self.assertEqual(tarea.estado, 'PENDIENTE')
+
+        self.reclamar_y_abandonar(tarea)
+        self.assertEqual(tareas.recuperar_huerfanas(), (0, 1))
+        tarea.refresh_from_db()
+        self.assertEqual(tarea.estado, 'FALLIDA')
+
+    def test_no_toca_tareas_en_curso(self):
+        tareas.encolar('exportar_clientes')
+        tareas.reclamar_pendientes(1)
+        self.assertEqual(tareas.recuperar_huerfanas(), (0, 0))
+
+    def test_un_hijo_muerto_no_tumba_el_worker(self):
+        class PoolRoto:
+            creados = 0
+
+            def __init__(self, *args, **kwargs):
+                PoolRoto.creados += 1
+
+            def submit(self, funcion, tarea_id):
+                futuro = Future()
+                futuro.set_exception(BrokenProcessPool('Un proceso del pool terminó de golpe'))
+                return futuro
+
+            def shutdown(self, *args, **kwargs):
+                pass
+
+        tarea = tareas.encolar('exportar_clientes')
+        salida = StringIO()
+        with mock.patch('heladeria.management.commands.procesar_tareas.ProcessPoolExecutor', PoolRoto):
+            call_command('procesar_tareas', '--una-vez', '--procesos', '1', stdout=salida)
+
+        tarea.refresh_from_db()
+        self.assertEqual(tarea.estado, 'FALLIDA')
+        self.assertEqual(tarea.intentos, tareas.MAX_INTENTOS)
+        # El pool inicial más uno nuevo tras cada muerte
+        self.assertEqual(PoolRoto.creados, tareas.MAX_INTENTOS + 1)
+        self.assertIn('Un proceso del pool murió', salida.getvalue())
+
+
+class ResumenIncrementalTests(TestCase):
+    """El resumen mantenido venta a venta coincide con reconstruirlo desde cero."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('cajero', password='x')
+        cls.productos = [
+            Producto.objects.create(nombre=f'Helado {i}', precio=1000 + i, precio_compra=400, stock=100)
+            for i in range(2)
+        ]
+        cls.clientes = [
+            Cliente.objects.create(
+                rut=f'2222222{i}-{i}', nombre='Ana', apellido=f'Rojas {i}', email=f'ana{i}@example.com'
+            )
+            for i in range(2)
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def vender(self, cantidades, cliente=None):
+        carrito = {self.productos[i].id: {'cantidad': n} for i, n in cantidades.items()}
+        with self.captureOnCommitCallbacks(execute=True):
+            venta, fallos = registrar_venta(self.usuario, carrito, cliente.id if cliente else None)
+        self.assertEqual(fallos, [])
+        return venta
+
+    def assertResumenCuadra(self):
+        def filas():
+            return list(
+                ResumenVentaDiaria.objects.order_by('fecha', 'producto_id', 'estado')
+                .values_list('fecha', 'producto_id', 'estado', 'unidades', 'ingreso', 'costo', 'ordenes', 'clientes')
+            )
+        incremental = filas()
+        reconstruir_resumen()
+        self.assertEqual(incremental, filas())
+
+    def test_venta_cambio_de_estado_y_borrado(self):
+        a = self.vender({0: 2, 1: 1}, self.clientes[0])
+        b = self.vender({0: 1}, self.clientes[0])
+        self.vender({0: 3}, self.clientes[1])
+        self.vender({1: 1})
+        self.assertResumenCuadra()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('cambiar_estado', args=[a.id]), {'estado': 'COMPLETED'})
+        self.assertResumenCuadra()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('eliminar_venta', args=[b.id]))
+        self.assertResumenCuadra()
+        self.assertFalse(Venta.objects.filter(pk=b.pk).exists())
+
+    def test_cambio_de_un_dia_pasado(self):
+        venta = self.vender({0: 1}, self.clientes[0])
+        Venta.objects.filter(pk=venta.pk).update(fecha=timezone.now() - timedelta(days=3))
+        reconstruir_resumen()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('cambiar_estado', args=[venta.id]), {'estado': 'CART'})
+        self.assertResumenCuadra()
+        self.assertFalse(ResumenVentaDiaria.objects.exists())
+
+    def test_editar_y_borrar_lineas_desde_el_admin(self):
+        venta = self.vender({0: 2, 1: 1}, self.clientes[0])
+        request = RequestFactory().post('/')
+        request.user = self.usuario
+        lineas_admin = DetalleVentaAdmin(DetalleVenta, admin.site)
+
+        linea = DetalleVenta.objects.get(venta=venta, producto=self.productos[0])
+        linea.cantidad = 5
+        with self.captureOnCommitCallbacks(execute=True):
+            lineas_admin.save_model(request, linea, None, True)
+        venta.refresh_from_db()
+        self.assertEqual(venta.total, 5 * 1000 + 1001)
+        self.assertEqual(venta.ganancia, venta.total - 6 * 400)
+        self.assertResumenCuadra()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            lineas_admin.delete_queryset(request, DetalleVenta.objects.filter(pk=linea.pk))
+        venta.refresh_from_db()
+        self.assertEqual(venta.total, 1001)
+        self.assertResumenCuadra()
+
+    def test_el_bloque_que_falla_no_toca_el_resumen(self):
+        venta = self.vender({0: 1})
+        antes = list(ResumenVentaDiaria.objects.values_list('estado', 'ordenes'))
+        with self.assertRaises(RuntimeError):
+            with sincronizar_resumen([venta.id]):
+                Venta.objects.filter(pk=venta.pk).update(estado='COMPLETED')
+                raise RuntimeError
+        self.assertEqual(Venta.objects.get(pk=venta.pk).estado, 'PENDING')
+        self.assertEqual(list(ResumenVentaDiaria.objects.values_list('estado', 'ordenes')), antes)
+
+
+class CheckoutTests(TestCase):
+    """registrar_venta y confirmar_venta: todo o nada en stock y ventas."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('cajero', password='x')
+        cls.frutilla = Producto.objects.create(nombre='Frutilla', precio=1500, precio_compra=600, stock=1)
+        cls.chocolate = Producto.objects.create(nombre='Chocolate', precio=1800, precio_compra=700, stock=10)
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def assertSinCambios(self):
+        self.assertFalse(Venta.objects.exists())
+        self.assertFalse(DetalleVenta.objects.exists())
+        self.assertEqual(Producto.objects.get(pk=self.frutilla.pk).stock, 1)
+        self.assertEqual(Producto.objects.get(pk=self.chocolate.pk).stock, 10)
+
+    def test_sin_stock_devuelve_409_con_fallos(self):
+        response = self.client.post(
+            reverse('confirmar_venta'),
+            {'carrito_json': json.dumps({self.frutilla.id: {'cantidad': 5}})},
+            headers={'X-Requested-With': 'XMLHttpRequest'},
+        )
+        self.assertEqual(response.status_code, 409)
+        datos = response.json()
+        self.assertFalse(datos['success'])
+        self.assertEqual([f['producto_id'] for f in datos['fallos']], [self.frutilla.id])
+        self.assertSinCambios()
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_venta_parcial_deja_en_el_carrito_lo_que_fallo(self):
+        cache.clear()
+        carrito = Carrito(self.usuario)
+        carrito.agregar(self.frutilla.id, 3)
+        carrito.agregar(self.chocolate.id, 2)
+
+        response = self.client.post(reverse('confirmar_venta'), headers={'X-Requested-With': 'XMLHttpRequest'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([f['producto_id'] for f in response.json()['fallos']], [self.frutilla.id])
+        self.assertEqual(Carrito(self.usuario).items, {self.frutilla.id: 3})
+        self.assertEqual(Producto.objects.get(pk=self.chocolate.pk).stock, 8)
+
+    def test_un_error_a_mitad_revierte_todas_las_lineas(self):
+        carrito = {self.frutilla.id: {'cantidad': 1}, self.chocolate.id: {'cantidad': 2}}
+        with mock.patch.object(DetalleVenta.objects, 'bulk_create', side_effect=IntegrityError):
+            with self.assertRaises(IntegrityError):
+                registrar_venta(self.usuario, carrito)
+        self.assertSinCambios()
+
+    def test_un_error_del_resumen_no_revierte_la_venta(self):
+        carrito = {self.chocolate.id: {'cantidad': 2}}
+        with mock.patch('heladeria.resumen._aplicar_aportes', side_effect=IntegrityError):
+            with self.assertLogs('heladeria.resumen', 'ERROR'):
+                with self.captureOnCommitCallbacks(execute=True):
+                    venta, fallos = registrar_venta(self.usuario, carrito)
+        self.assertEqual(fallos, [])
+        self.assertTrue(Venta.objects.filter(pk=venta.pk).exists())
+        self.assertEqual(Producto.objects.get(pk=self.chocolate.pk).stock, 8)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class CarritoTests(TestCase):
+    """El carrito del POS vive en la caché, por cajero y con vencimiento."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('cajero', password='x')
+        cls.producto = Producto.objects.create(nombre='Vainilla', precio=1200, precio_compra=500, stock=50)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.usuario)
+
+    def modificar(self, accion, **datos):
+        return self.client.post(reverse('carrito_modificar', args=[accion]), datos).json()
+
+    def test_agregar_actualizar_y_vaciar(self):
+        self.modificar('agregar', producto_id=self.producto.id, cantidad=2)
+        datos = self.modificar('agregar', producto_id=self.producto.id)
+        self.assertEqual(datos['items'][0]['cantidad'], 3)
+        self.assertEqual(datos['total'], 3600)
+
+        datos = self.modificar('actualizar', producto_id=self.producto.id, cantidad=MAX_CANTIDAD + 5)
+        self.assertEqual(datos['items'][0]['cantidad'], MAX_CANTIDAD)
+
+        datos = self.modificar('actualizar', producto_id=self.producto.id, cantidad=0)
+        self.assertEqual(datos['items'], [])
+
+        self.modificar('agregar', producto_id=self.producto.id)
+        datos = self.modificar('vaciar')
+        self.assertEqual(datos['items'], [])
+        self.assertEqual(Carrito(self.usuario).items, {})
+        self.assertFalse(Venta.objects.exists())
+
+    def test_vence_tras_ttl_carrito(self):
+        Carrito(self.usuario).agregar(self.producto.id, 2)
+        self.assertEqual(Carrito(self.usuario).items, {self.producto.id: 2})
+
+        vencido = time.time() + TTL_CARRITO + 1
+        with mock.patch('django.core.cache.backends.locmem.time.time', return_value=vencido):
+            self.assertEqual(Carrito(self.usuario).items, {})
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class CatalogoCacheTests(TestCase):
+    """La caché del catálogo del POS se indexa por la página servida, no por la pedida."""
+
+    @classmethod
+    def setUpTestData(cls):
+        for nombre in ('Frutilla', 'Lúcuma', 'Menta'):
+            Producto.objects.create(nombre=nombre, precio=1000, precio_compra=400, stock=5)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_paginas_fuera_de_rango_comparten_la_entrada(self):
+        ultima = pagina_catalogo('', 2, 2)
+        with self.assertNumQueries(0):
+            self.assertEqual(pagina_catalogo('', '99999', 2), ultima)
+        primera = pagina_catalogo('', 1, 2)
+        with self.assertNumQueries(0):
+            self.assertEqual(pagina_catalogo('', 'abc', 2), primera)
+            self.assertEqual(pagina_catalogo('', '0', 2), ultima)
+
+    async def test_version_async(self):
+        await apagina_catalogo('', '99999', 2)
+        version_catalogo = await aversion('catalogo')
+        self.assertIsNotNone(await cache.aget(_clave_catalogo(version_catalogo, '', 2, 2)))
+        self.assertIsNone(await cache.aget(_clave_catalogo(version_catalogo, '', '99999', 2)))
+
+
+class CursorInvalidoTests(TestCase):
+    """Un cursor mal formado o manipulado sirve la primera página en vez de un 500."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('cajero', password='x')
+        cls.ventas = [Venta.objects.create(usuario=cls.usuario, estado='COMPLETED', total=i) for i in range(3)]
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def cursor(self, datos):
+        return base64.urlsafe_b64encode(json.dumps(datos).encode()).decode()
+
+    def test_cursores_invalidos_sirven_la_primera_pagina(self):
+        cursores = [
+            '%%%no-es-base64',
+            self.cursor([1, 2]),
+            self.cursor({'v': 'no es una fecha', 'id': 1, 's': 'n'}),
+            self.cursor({'v': {'x': 1}, 'id': 1, 's': 'p'}),
+            self.cursor({'v': '2025-01-01 00:00:00', 'id': 'x', 's': 'n'}),
+        ]
+        for cursor in cursores:
+            with self.subTest(cursor=cursor):
+                response = self.client.get(reverse('lista_ventas'), {'sort': 'fecha', 'cursor': cursor})
+                self.assertEqual(response.status_code, 200)
+                page_obj = response.context['page_obj']
+                self.assertFalse(page_obj.has_previous)
+                self.assertEqual(len(page_obj), 3)
+
+    def test_valor_de_otro_tipo_en_campo_decimal(self):
+        cursor = self.cursor({'v': 'abc', 'id': 1, 's': 'n'})
+        response = self.client.get(reverse('lista_ventas_ajax'), {'sort': 'total', 'cursor': cursor})
+        self.assertEqual(response.status_code, 200)
+
+
+class VariantesImagenTests(TestCase):
+    """Variantes WebP/JPEG de imágenes y la etiqueta imagen_responsive."""
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        ajustes = override_settings(MEDIA_ROOT=media)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def png(self, ancho, alto):
+        buffer = BytesIO()
+        Image.new('RGBA', (ancho, alto), (255, 0, 0, 128)).save(buffer, 'PNG')
+        return ContentFile(buffer.getvalue())
+
+    def test_genera_anchos_menores_al_original_sin_agrandar(self):
+        producto = Producto.objects.create(nombre='Pistacho', precio=1000, stock=1)
+        producto.imagen.save('pistacho.png', self.png(500, 250))
+        variantes = generar_variantes(producto.imagen)
+
+        self.assertEqual(variantes['origen'], producto.imagen.name)
+        self.assertEqual(sorted(variantes['jpeg'], key=int), ['160', '320'])
+        self.assertEqual(sorted(variantes['webp'], key=int), ['160', '320'])
+        with default_storage.open(variantes['jpeg']['320']) as f:
+            self.assertEqual(Image.open(f).size, (320, 160))
+
+        producto.imagen.save('mini.png', self.png(100, 100))
+        self.assertEqual(list(generar_variantes(producto.imagen)['jpeg']), ['100'])
+
+    def test_imagen_responsive(self):
+        producto = Producto.objects.create(nombre='Mango', precio=1000, stock=1)
+        producto.imagen.save('mango.png', self.png(700, 700))
+
+        html = imagen_responsive(producto.imagen, {}, '48px', alt='Mango')
+        self.assertTrue(html.startswith('<img'))
+        self.assertNotIn('srcset', html)
+
+        html = imagen_responsive(producto.imagen, generar_variantes(producto.imagen), '48px', alt='Mango')
+        self.assertIn('<source type="image/webp"', html)
+        self.assertIn('160w', html)
+        self.assertIn('640w', html)
+        self.assertIn('sizes="48px"', html)
+
+    def test_el_avatar_por_defecto_no_encola_tareas_y_se_genera_una_vez(self):
+        default_storage.save(PerfilUsuario._meta.get_field('avatar').default, self.png(400, 400))
+        User.objects.create_user('ana', password='x')
+        User.objects.create_user('beto', password='x')
+        self.assertFalse(TareaFondo.objects.filter(tipo='variantes_imagen').exists())
+
+        call_command('generar_variantes_imagenes', stdout=StringIO())
+        variantes = set(
+            json.dumps(v, sort_keys=True) for v in PerfilUsuario.objects.values_list('avatar_variantes', flat=True)
+        )
+        self.assertEqual(len(variantes), 1)
+
+        nuevo = User.objects.create_user('carla', password='x')
+        self.assertIn('jpeg', PerfilUsuario.objects.get(user=nuevo).avatar_variantes)
+        self.assertFalse(TareaFondo.objects.filter(tipo='variantes_imagen').exists())
+
+
+class MetricasTests(TestCase):
+    """MetricasMiddleware: cabecera Server-Timing solo para el staff y percentiles por vista."""
+
+    def setUp(self):
+        ESTADISTICAS.limpiar()
+        self.addCleanup(ESTADISTICAS.limpiar)
+
+    def test_server_timing_solo_para_staff(self):
+        self.assertNotIn('Server-Timing', self.client.get(reverse('pos_home')))
+
+        self.client.force_login(User.objects.create_user('cajero', password='x'))
+        self.assertNotIn('Server-Timing', self.client.get(reverse('pos_home')))
+
+        self.client.force_login(User.objects.create_user('admin', password='x', is_staff=True))
+        cabecera = self.client.get(reverse('pos_home'))['Server-Timing']
+        self.assertRegex(cabecera, r'^total;dur=[\d.]+, sql;dur=[\d.]+;desc="\d+ consultas", dup;desc="\d+ duplicadas"$')
+
+    @override_settings(DEBUG=True)
+    def test_server_timing_con_debug(self):
+        self.assertIn('Server-Timing', self.client.get(reverse('pos_home')))
+
+    def test_se_registra_por_vista(self):
+        self.client.get(reverse('pos_home'))
+        self.assertEqual([fila['vista'] for fila in ESTADISTICAS.resumen()], ['pos_home'])
+
+    def test_percentiles(self):
+        estadisticas = EstadisticasVistas(maximo=100)
+        for ms in range(1, 101):
+            estadisticas.registrar('lenta', ms, consultas=ms % 7, sql_ms=ms / 2, duplicadas=ms % 3)
+        estadisticas.registrar('rapida', 5, consultas=1, sql_ms=1, duplicadas=0)
+        # La ventana es de 100 muestras: la más antigua (1 ms) sale
+        estadisticas.registrar('lenta', 101, consultas=0, sql_ms=0, duplicadas=0)
+
+        lenta, rapida = estadisticas.resumen()
+        self.assertEqual(lenta['vista'], 'lenta')
+        self.assertEqual(lenta['peticiones'], 100)
+        self.assertEqual(lenta['p50_ms'], 52)
+        self.assertEqual(lenta['p95_ms'], 96)
+        self.assertEqual(lenta['consultas_max'], 6)
+        self.assertEqual(lenta['duplicadas_max'], 2)
+        self.assertEqual(rapida['p95_ms'], 5)
+
+
+class VistasAsyncTests(TestCase):
+    """Las vistas AJAX async responden sin tocar el ORM sync desde el event loop."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('admin', password='x')
+        cls.usuario.groups.add(Group.objects.create(name='Admin'))
+        cls.producto = Producto.objects.create(nombre='Cookies', precio=2000, precio_compra=800, stock=20)
+        cls.cliente = Cliente.objects.create(
+            rut='33333333-3', nombre='Rocío', apellido='Soto', email='rocio@example.com'
+        )
+        venta = Venta.objects.create(usuario=cls.usuario, cliente=cls.cliente, estado='COMPLETED', total=6000)
+        DetalleVenta.objects.create(venta=venta, producto=cls.producto, cantidad=3, precio_unitario=2000)
+
+    def setUp(self):
+        # Los grupos cacheados de otras pruebas no deben filtrarse a estas
+        cache.clear()
+        self.async_client.force_login(self.usuario)
+
+    async def get_json(self, nombre, *args, **params):
+        response = await self.async_client.get(reverse(nombre, args=args), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    async def test_pos_ajax(self):
+        response = await self.async_client.get(reverse('pos_ajax'), {'q': 'cook'})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Cookies')
+
+    async def test_lista_productos_ajax(self):
+        self.assertIn('Cookies', (await self.get_json('lista_productos_ajax', q='coo'))['html'])
+
+    async def test_lista_ventas_ajax(self):
+        datos = await self.get_json('lista_ventas_ajax', estado='COMPLETED')
+        self.assertIn('Rocío', datos['html'])
+
+    async def test_lista_clientes_ajax(self):
+        self.assertIn('Soto', (await self.get_json('lista_clientes_ajax', q='rocio'))['html'])
+
+    async def test_detalle_productos_ajax(self):
+        datos = await self.get_json('detalle_productos_ajax', self.producto.pk, estado='COMPLETED')
+        self.assertEqual(datos['stats']['total_vendido'], 3)
+        self.assertEqual(datos['stats']['total_ganado'], '6.000')
+        self.assertIn('html', datos)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class CacheGruposTests(TestCase):
+    """Quitar a alguien de un grupo le retira el acceso en la petición siguiente."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.grupo = Group.objects.create(name='Admin')
+        cls.usuario = User.objects.create_user('admin', password='x')
+
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.usuario.groups.add(self.grupo)
+        self.client.force_login(self.usuario)
+        # Deja los grupos en la caché
+        self.assertEqual(self.client.get(reverse('lista_productos')).status_code, 200)
+
+    def assertSinAcceso(self):
+        self.assertEqual(self.client.get(reverse('lista_productos')).status_code, 403)
+
+    def test_remove(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.usuario.groups.remove(self.grupo)
+            # Nada se invalida antes del commit
+            self.assertIsNotNone(cache.get(f'grupos_usuario:{self.usuario.pk}'))
+        self.assertTrue(callbacks)
+        self.assertSinAcceso()
+
+    def test_clear_desde_el_usuario(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.usuario.groups.clear()
+        self.assertSinAcceso()
+
+    def test_clear_desde_el_grupo(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.grupo.user_set.clear()
+        self.assertSinAcceso()
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class DashboardConsultasTests(TestCase):
+    """El dashboard hace un número fijo de consultas, sin importar cuántas ventas o días haya."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('gerente', password='x')
+        cls.productos = [
+            Producto.objects.create(nombre=f'Sabor {i}', precio=1000 + i, precio_compra=300, stock=1000)
+            for i in range(6)
+        ]
+        cliente = Cliente.objects.create(rut='44444444-4', nombre='Luis', apellido='Vera', email='luis@example.com')
+        ahora = timezone.now()
+        for dias in (0, 1, 3, 9, 40, 200, 400):
+            for producto in cls.productos:
+                venta = Venta.objects.create(
+                    usuario=cls.usuario, cliente=cliente, estado='COMPLETED', fecha=ahora - timedelta(days=dias)
+                )
+                DetalleVenta.objects.create(venta=venta, producto=producto, cantidad=2, precio_unitario=producto.precio)
+        reconstruir_resumen()
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.usuario)
+
+    # Sesión, usuario y grupos; resumen diario, órdenes por día, productos del
+    # ranking y productos del selector; sin filtro de productos, además los
+    # clientes distintos de las tarjetas
+    CONSULTAS_SIN_FILTRO = 8
+    CONSULTAS_CON_PRODUCTOS = 7
+
+    def assertConsultas(self, esperadas, **params):
+        cache.clear()
+        with self.assertNumQueries(esperadas):
+            response = self.client.get(reverse('reporte_dashboard'), params)
+        self.assertEqual(response.status_code, 200)
+
+    def test_doce_meses(self):
+        self.assertConsultas(self.CONSULTAS_SIN_FILTRO, periodo='12meses')
+        self.assertConsultas(self.CONSULTAS_CON_PRODUCTOS, periodo='12meses', productos=[p.id for p in self.productos[:3]])
+
+    def test_siete_dias(self):
+        self.assertConsultas(self.CONSULTAS_SIN_FILTRO, periodo='7dias')
+        self.assertConsultas(self.CONSULTAS_CON_PRODUCTOS, periodo='7dias', productos=[p.id for p in self.productos[:3]])
+
+    def test_no_depende_del_volumen(self):
+        ahora = timezone.now()
+        for dias in range(0, 365, 5):
+            venta = Venta.objects.create(usuario=self.usuario, estado='COMPLETED', fecha=ahora - timedelta(days=dias))
+            DetalleVenta.objects.create(venta=venta, producto=self.productos[dias % 6], cantidad=1)
+        reconstruir_resumen()
+        self.assertConsultas(self.CONSULTAS_SIN_FILTRO, periodo='12meses')
+        self.assertConsultas(self.CONSULTAS_CON_PRODUCTOS, periodo='7dias', productos=[self.productos[0].id])
+
+
+class PosPerPageTests(TestCase):
+    """El POS acota per_page en vez de fallar con 0, negativos o valores enormes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('cajero', password='x')
+        for i in range(3):
+            Producto.objects.create(nombre=f'Sabor {i}', precio=1000, stock=5)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.usuario)
+
+    def test_per_page_fuera_de_rango(self):
+        for per_page in ('0', '-5', '100000', 'abc'):
+            with self.subTest(per_page=per_page):
+                self.assertEqual(self.client.get(reverse('pos_home'), {'per_page': per_page}).status_code, 200)
+                self.assertEqual(self.client.get(reverse('pos_ajax'), {'per_page': per_page}).status_code, 200)
+
+    def test_per_page_cero_muestra_un_producto(self):
+        response = self.client.get(reverse('pos_home'), {'per_page': '0'})
+        self.assertEqual(response.context['per_page'], 1)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class EstadisticasProductoTests(TestCase):
+    """Estadísticas del detalle de producto: una consulta, precios históricos y caché por versión."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('admin', password='x')
+        cls.producto = Producto.objects.create(nombre='Maracuyá', precio=1500, precio_compra=500, stock=50)
+        for estado, cantidad, precio in (('COMPLETED', 2, 1000), ('COMPLETED', 1, 1200), ('PENDING', 4, 1500),
+                                         ('CANCELLED', 9, 1500)):
+            venta = Venta.objects.create(usuario=cls.usuario, estado=estado)
+            DetalleVenta.objects.create(venta=venta, producto=cls.producto, cantidad=cantidad, precio_unitario=precio)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_totales_a_precio_historico(self):
+        with self.assertNumQueries(1):
+            stats = _estadisticas_producto(self.producto.id)
+        self.assertEqual(stats, {
+            'total_vendido': 3,
+            'total_ganado': 3200.0,
+            'unidades_pendientes': 4,
+            'ingreso_pendiente': 6000.0,
+            'ingreso_potencial': 9200.0,
+        })
+
+    def test_cacheadas_hasta_la_proxima_venta(self):
+        _estadisticas_producto(self.producto.id)
+        with self.assertNumQueries(0):
+            _estadisticas_producto(self.producto.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            registrar_venta(self.usuario, {self.producto.id: {'cantidad': 1}})
+        self.assertEqual(_estadisticas_producto(self.producto.id)['unidades_pendientes'], 5)
+
+
+class DetalleClienteTests(TestCase):
+    """Series mensuales y mezcla de productos del detalle de cliente."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('admin', password='x')
+        cls.cliente = Cliente.objects.create(rut='55555555-5', nombre='Rosa', apellido='Díaz', email='rosa@example.com')
+        otro = Cliente.objects.create(rut='66666666-6', nombre='Iván', apellido='Soto', email='ivan@example.com')
+        menta, lucuma, pina = (
+            Producto.objects.create(nombre=nombre, precio=100, precio_compra=40, stock=100)
+            for nombre in ('Menta', 'Lúcuma', 'Piña')
+        )
+        for cliente, fecha, total, lineas in (
+            (cls.cliente, date(2025, 1, 10), 1000, [(menta, 10)]),
+            (cls.cliente, date(2025, 1, 25), 3000, [(lucuma, 9)]),
+            (cls.cliente, date(2025, 2, 3), 2500, [(menta, 10), (pina, 1)]),
+            (otro, date(2025, 2, 4), 9900, [(pina, 50)]),
+        ):
+            venta = Venta.objects.create(
+                usuario=cls.usuario, cliente=cliente, estado='COMPLETED', total=total,
+                fecha=timezone.make_aware(datetime.combine(fecha, datetime.min.time())),
+            )
+            for producto, cantidad in lineas:
+                DetalleVenta.objects.create(venta=venta, producto=producto, cantidad=cantidad, precio_unitario=100)
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def test_series_mensuales_en_orden_cronologico(self):
+        respuesta = self.client.get(reverse('detalle_cliente', args=[self.cliente.id]))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(json.loads(respuesta.context['monthly_labels']), ['2025-01', '2025-02'])
+        self.assertEqual(json.loads(respuesta.context['monthly_total_spend']), [4000.0, 2500.0])
+        self.assertEqual(json.loads(respuesta.context['monthly_avg_spend']), [2000.0, 2500.0])
+
+    def test_mezcla_agrupa_los_productos_menores_en_otros(self):
+        respuesta = self.client.get(reverse('detalle_cliente', args=[self.cliente.id]))
+        # Piña es 1 de 30 unidades (< 5 %); las ventas de otro cliente no cuentan
+        self.assertEqual(json.loads(respuesta.context['product_labels']), ['Menta', 'Lúcuma', 'Otros'])
+        self.assertEqual(json.loads(respuesta.context['product_counts']), [20, 9, 1])
+
+    def test_filtros_se_aplican_a_las_series(self):
+        respuesta = self.client.get(reverse('detalle_cliente', args=[self.cliente.id]), {'min_precio': 2000})
+        # Sin la primera venta, Piña llega justo al 5 % y ya no se agrupa
+        self.assertEqual(json.loads(respuesta.context['monthly_total_spend']), [3000.0, 2500.0])
+        self.assertEqual(json.loads(respuesta.context['product_labels']), ['Menta', 'Lúcuma', 'Piña'])
+
+
+class SerieTemporalTests(TestCase):
+    """Serie de gráficos por producto: buckets con ceros y tope de puntos."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('admin', password='x')
+        cls.usuario.groups.add(Group.objects.create(name='Admin'))
+        cls.producto = Producto.objects.create(nombre='Coco', precio=1000, precio_compra=400, stock=100)
+        otro = Producto.objects.create(nombre='Nuez', precio=1000, precio_compra=400, stock=100)
+        for producto, fecha, cantidad in (
+            (cls.producto, date(2025, 1, 15), 2),
+            (cls.producto, date(2025, 3, 2), 3),
+            (cls.producto, date(2025, 3, 20), 1),
+            (otro, date(2025, 2, 10), 7),
+        ):
+            venta = Venta.objects.create(
+                usuario=cls.usuario, estado='COMPLETED',
+                fecha=timezone.make_aware(datetime.combine(fecha, datetime.min.time())),
+            )
+            DetalleVenta.objects.create(
+                venta=venta, producto=producto, cantidad=cantidad, precio_unitario=1000, precio_compra=400
+            )
+        reconstruir_resumen()
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.usuario)
+        self.url = reverse('graficos_producto_datos', args=[self.producto.id])
+
+    def test_meses_sin_ventas_van_en_cero(self):
+        datos = self.client.get(self.url, {'desde': '2025-01-01', 'hasta': '2025-04-30'}).json()
+        self.assertEqual(datos['buckets'], ['2025-01-01', '2025-02-01', '2025-03-01', '2025-04-01'])
+        self.assertEqual(datos['unidades'], [2, 0, 4, 0])
+        self.assertEqual(datos['ingreso'], [2000.0, 0, 4000.0, 0])
+        self.assertEqual(datos['ganancia'], [1200.0, 0, 2400.0, 0])
+
+    def test_semanas_empiezan_en_lunes(self):
+        datos = self.client.get(self.url, {'desde': '2025-03-01', 'hasta': '2025-03-16', 'granularidad': 'semana'}).json()
+        # 2025-03-01 es sábado: su semana empieza el lunes 24/02
+        self.assertEqual(datos['buckets'], ['2025-02-24', '2025-03-03', '2025-03-10'])
+        self.assertEqual(datos['unidades'], [3, 0, 0])
+
+    def test_rango_sobre_el_tope_responde_400(self):
+        hasta = date(2025, 12, 31)
+        en_el_tope = {'granularidad': 'dia', 'desde': (hasta - timedelta(days=MAX_BUCKETS_SERIE - 1)).isoformat(),
+                      'hasta': hasta.isoformat()}
+        respuesta = self.client.get(self.url, en_el_tope)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(len(respuesta.json()['buckets']), MAX_BUCKETS_SERIE)
+
+        sobre_el_tope = {**en_el_tope, 'desde': (hasta - timedelta(days=MAX_BUCKETS_SERIE)).isoformat()}
+        self.assertEqual(self.client.get(self.url, sobre_el_tope).status_code, 400)
+
+    def test_parametros_invalidos_responden_400(self):
+        self.assertEqual(self.client.get(self.url, {'granularidad': 'hora'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'desde': '2025-05-01', 'hasta': '2025-04-01'}).status_code, 400)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ResumenPorProductoTests(TestCase):
+    """Reporte por producto con fila de totales, y caché de los períodos cerrados."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('admin', password='x')
+        cls.productos = [
+            Producto.objects.create(nombre=f'Sabor {i}', precio=1000, precio_compra=300, stock=100)
+            for i in range(3)
+        ]
+        cls.hace_una_semana = timezone.localdate() - timedelta(days=7)
+        cls.ventas = []
+        for estado, dias, lineas in (
+            ('COMPLETED', 7, [(0, 2, 1000), (1, 1, 1500)]),
+            ('COMPLETED', 6, [(0, 1, 1200), (2, 4, 900)]),
+            ('PENDING', 6, [(1, 8, 1500)]),
+            ('COMPLETED', 0, [(2, 1, 1000)]),
+        ):
+            venta = Venta.objects.create(
+                usuario=cls.usuario, estado=estado, fecha=timezone.now() - timedelta(days=dias)
+            )
+            for i, cantidad, precio in lineas:
+                DetalleVenta.objects.create(
+                    venta=venta, producto=cls.productos[i], cantidad=cantidad,
+                    precio_unitario=precio, precio_compra=300,
+                )
+            cls.ventas.append(venta)
+        reconstruir_resumen()
+
+    def setUp(self):
+        cache.clear()
+
+    def assertTotalesCuadran(self, reporte):
+        for campo in ('unidades_vendidas', 'total_vendido', 'ganancia'):
+            self.assertEqual(reporte['totales'][campo], sum(fila[campo] for fila in reporte['productos']))
+
+    def test_totales_son_la_suma_de_las_filas(self):
+        with self.assertNumQueries(1):
+            reporte = resumen_ventas_por_producto(self.hace_una_semana, timezone.localdate())
+        self.assertTotalesCuadran(reporte)
+        self.assertEqual(reporte['totales']['unidades_vendidas'], 9)
+        self.assertEqual(reporte['totales']['total_vendido'], 9300)
+        self.assertEqual(
+            [fila['total_vendido'] for fila in reporte['productos']],
+            sorted((fila['total_vendido'] for fila in reporte['productos']), reverse=True),
+        )
+
+    def test_filtros_de_producto_y_estado(self):
+        reporte = resumen_ventas_por_producto(
+            self.hace_una_semana, timezone.localdate(), ['COMPLETED', 'PENDING'], [self.productos[1].id]
+        )
+        self.assertEqual([fila['producto_id'] for fila in reporte['productos']], [self.productos[1].id])
+        self.assertEqual(reporte['totales']['unidades_vendidas'], 9)
+        self.assertTotalesCuadran(reporte)
+
+    def test_periodo_cerrado_cacheado_hasta_que_cambia_un_dia_pasado(self):
+        ayer = timezone.localdate() - timedelta(days=1)
+        reporte = resumen_ventas_por_producto(self.hace_una_semana, ayer)
+        self.assertEqual(reporte['totales']['unidades_vendidas'], 8)
+        with self.assertNumQueries(0):
+            self.assertEqual(resumen_ventas_por_producto(self.hace_una_semana, ayer), reporte)
+
+        pendiente = self.ventas[2]
+        with self.captureOnCommitCallbacks(execute=True):
+            with sincronizar_resumen([pendiente.id]):
+                Venta.objects.filter(pk=pendiente.pk).update(estado='COMPLETED')
+        reporte = resumen_ventas_por_producto(self.hace_una_semana, ayer)
+        self.assertEqual(reporte['totales']['unidades_vendidas'], 16)
+        self.assertTotalesCuadran(reporte)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ContadoresTests(TestCase):
+    """Contadores cacheados de los listados, invalidados también tras los update() masivos."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('admin', password='x')
+        cls.producto = Producto.objects.create(nombre='Limón', precio=1000, precio_compra=400, stock=2)
+        cls.ventas = [Venta.objects.create(usuario=cls.usuario, estado='PENDING') for _ in range(3)]
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.usuario)
+
+    def test_cacheados_en_una_consulta(self):
+        with self.assertNumQueries(1):
+            contadores = contadores_ventas()
+        self.assertEqual(contadores, {
+            'total_ventas': 3, 'ventas_completadas': 0, 'ventas_pendientes': 3, 'ventas_canceladas': 0,
+        })
+        with self.assertNumQueries(0):
+            contadores_ventas()
+
+    def test_cambio_de_estado_masivo(self):
+        contadores_ventas()
+        ids = [venta.id for venta in self.ventas[:2]]
+        with self.captureOnCommitCallbacks(execute=True):
+            respuesta = self.client.post(
+                reverse('cambiar_estado_multiples'),
+                json.dumps({'ids': ids, 'nuevo_estado': 'COMPLETED'}),
+                content_type='application/json',
+            )
+        self.assertTrue(respuesta.json()['success'])
+        contadores = contadores_ventas()
+        self.assertEqual(contadores['ventas_completadas'], 2)
+        self.assertEqual(contadores['ventas_pendientes'], 1)
+
+    def test_stock_descontado_en_el_checkout(self):
+        self.assertEqual(contadores_productos()['productos_sin_stock'], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            registrar_venta(self.usuario, {self.producto.id: {'cantidad': 2}})
+        self.assertEqual(contadores_productos()['productos_sin_stock'], 1)
+        self.assertEqual(contadores_ventas()['total_ventas'], 4)
+
+
+PERFIL_PRODUCCION = {
+    'DEBUG': False,
+    'SECRET_KEY': 'clave-de-produccion-larga-y-aleatoria-para-las-pruebas-0123456789',
+    'TEMPLATES': [{
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [],
+        'OPTIONS': {'loaders': [('django.template.loaders.cached.Loader', [
+            'django.template.loaders.app_directories.Loader',
+        ])]},
+    }],
+    'CACHES': {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+    'STORAGES': {
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.ManifestStaticFilesStorage'},
+    },
+    'ALLOWED_HOSTS': ['heladeria.example.com'],
+}
+
+
+# Cada error del perfil y el ajuste que lo provoca
+AJUSTES_ERRONEOS = {
+    'heladeria.E001': {'DEBUG': True},
+    'heladeria.E002': {'SECRET_KEY': 'dev-unsafe', 'SECRET_KEY_INSEGURA': 'dev-unsafe'},
+    'heladeria.E003': {'TEMPLATES': [{**PERFIL_PRODUCCION['TEMPLATES'][0], 'APP_DIRS': True, 'OPTIONS': {}}]},
+    'heladeria.E004': {'CACHES': {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}},
+    'heladeria.E005': {'STORAGES': {
+        **PERFIL_PRODUCCION['STORAGES'],
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    }},
+}
+
+
+class PerfilProduccionTests(TestCase):
+    """check --deploy rechaza un perfil de producción mal configurado."""
+
+    def errores(self):
+        return {error.id for error in verificar_perfil_produccion(None) if error.id.startswith('heladeria.E')}
+
+    def test_perfil_correcto_sin_errores(self):
+        with override_settings(**PERFIL_PRODUCCION):
+            self.assertEqual(self.errores(), set())
+
+    def test_cada_error_por_su_ajuste(self):
+        for id_error, ajustes in AJUSTES_ERRONEOS.items():
+            with self.subTest(id_error), override_settings(**{**PERFIL_PRODUCCION, **ajustes}):
+                self.assertEqual(self.errores(), {id_error})
+
+    def test_check_deploy_falla_con_el_perfil_de_desarrollo(self):
+        desarrollo = {}
+        for ajustes in AJUSTES_ERRONEOS.values():
+            desarrollo.update(ajustes)
+        with override_settings(**desarrollo), self.assertRaises(SystemCheckError) as error:
+            call_command('check', '--deploy', stdout=StringIO(), stderr=StringIO())
+        for id_error in AJUSTES_ERRONEOS:
+            self.assertIn(id_error, str(error.exception))
@@ -8,10 +8,17 @@ urlpatterns = [
     path('pos/ajax/', views.pos_ajax, name='pos_ajax'),
     path('add_to_cart/<int:producto_id>/', views.add_to_cart, name='add_to_cart'),
     path('confirmar_venta/', views.confirmar_venta, name='confirmar_venta'),
+    path('carrito/', views.carrito_estado, name='carrito_estado'),
+    path('carrito/<str:accion>/', views.carrito_modificar, name='carrito_modificar'),
+    path('tareas/<str:tipo>/encolar/', views.encolar_tarea, name='encolar_tarea'),
+    path('tareas/<int:tarea_id>/', views.estado_tarea, name='estado_tarea'),
+    path('tareas/<int:tarea_id>/descargar/', views.descargar_tarea, name='descargar_tarea'),
+    path('metricas/', views.metricas, name='metricas'),
     path('clientes/', include('clientes.urls')),
     path('ventas/', include('ventas.urls')),
     path('productos/', include('productos.urls')),
     path('categorias/', include('categorias.urls')),
+    path('reportes/ventas/', views.reportes_ventas, name='reportes_ventas'),
     path("reportes/", include("reportes.urls")),
 ]
 
@@ -0,0 +1,37 @@
+import time
+
+from django.core.cache import cache
+
+
+def _clave(nombre):
+    return f"version:{nombre}"
+
+
+def version(nombre):
+    """
+    Versión actual de un conjunto de datos cacheados. Se incluye en las claves
+    de caché: al incrementarla, las entradas anteriores quedan inalcanzables
+    y expiran solas.
+    """
+    valor = cache.get(_clave(nombre))
+    if valor is None:
+        # Partir del reloj evita reutilizar una versión vieja si la clave se pierde
+        cache.add(_clave(nombre), int(time.time()), None)
+        valor = cache.get(_clave(nombre))
+    return valor
+
+
+async def aversion(nombre):
+    valor = await cache.aget(_clave(nombre))
+    if valor is None:
+        await cache.aadd(_clave(nombre), int(time.time()), None)
+        valor = await cache.aget(_clave(nombre))
+    return valor
+
+
+def incrementar_version(nombre):
+    try:
+        return cache.incr(_clave(nombre))
+    except ValueError:
+        cache.add(_clave(nombre), int(time.time()), None)
+        return cache.get(_clave(nombre))
@@ -1,19 +1,59 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from django.utils import timezone
-from django.utils.timezone import now, timedelta
+from django.utils.dateparse import parse_date
 from django.template.loader import render_to_string
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, FileResponse, Http404
+from django.core.exceptions import PermissionDenied
+from django.urls import reverse
 from django.db import models
-from django.db.models import Sum, F, Q
+from django.db.models import Sum, F, Q, Count
+from django.db.models.functions import Coalesce
+from decimal import Decimal
 from django.contrib import messages
-from datetime import timedelta, datetime
-from .models import Producto, Venta, DetalleVenta, Cliente
+from datetime import timedelta
+from .models import Producto, Venta, DetalleVenta, Cliente, TareaFondo
+from .carrito import Carrito
+from .catalogo import apagina_catalogo, pagina_catalogo, productos_activos
+from .checkout import registrar_venta
+from . import tareas
+from .middleware import ESTADISTICAS, MUESTRAS_POR_VISTA
+from reportes.services import resumen_ventas_por_producto
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import TemplateView
 import json
+import os
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 
+CLIENTES_RECIENTES_POS = 50
+
+
+def _estadisticas_pos(usuario, productos_qs):
+    """Totales del POS con agregados en base de datos; no depende del historial del cajero."""
+    estadisticas = Venta.objects.filter(usuario=usuario).aggregate(
+        total_ventas=Count('id'),
+        total_ganancias=Coalesce(Sum('total'), Decimal('0')),
+    )
+    estadisticas['total_stock'] = productos_qs.aggregate(
+        total=Coalesce(Sum('stock'), 0)
+    )['total']
+    return estadisticas
+
+
+def _clientes_recientes(usuario, limite=CLIENTES_RECIENTES_POS):
+    """Clientes atendidos en las últimas ventas del cajero, en orden de recencia."""
+    ids = (
+        Venta.objects
+        .filter(usuario=usuario, cliente__isnull=False)
+        .order_by('-fecha')
+        .values_list('cliente_id', flat=True)[:limite]
+    )
+    ids = list(dict.fromkeys(ids))
+    clientes = Cliente.objects.in_bulk(ids)
+    return [clientes[i] for i in ids if i in clientes]
+
+
 class DashboardView(LoginRequiredMixin, TemplateView):
     template_name = "heladeria/pos_home.html"
     login_url = "login"
@@ -22,171 +62,133 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         context = super().get_context_data(**kwargs)
 
         productos = Producto.objects.filter(state="ACTIVE")
-        ventas = Venta.objects.filter(usuario=self.request.user)
 
-        total_ventas = ventas.count()
-        total_productos = productos.count()
-        total_stock = sum([p.stock for p in productos])
-        total_ganancias = sum([v.total() for v in ventas])
-
-        context.update({
-            'total_ventas': total_ventas,
-            'total_productos': total_productos,
-            'total_stock': total_stock,
-            'total_ganancias': total_ganancias,
-        })
+        context.update(_estadisticas_pos(self.request.user, productos))
+        context['total_productos'] = productos.count()
 
         return context
 
 
-@login_required
-def pos_home(request):
-    q = (request.GET.get("q") or "").strip()
-    productos_qs = Producto.objects.filter(state="ACTIVE").order_by("nombre")
-
-    if q:
-        productos_qs = productos_qs.filter(Q(nombre__icontains=q))
-
-    per_page = request.GET.get("per_page", 8)
-    try:
-        per_page = int(per_page)
-    except ValueError:
-        per_page = 8
+# Tope de productos por página del POS; el selector ofrece 8, 12 y 16
+MAX_PER_PAGE_POS = 48
 
-    paginator = Paginator(productos_qs, per_page)
-    page_number = request.GET.get("page")
 
+def _per_page_pos(request):
     try:
-        page_obj = paginator.page(page_number)
-    except PageNotAnInteger:
-        page_obj = paginator.page(1)
-    except EmptyPage:
-        page_obj = paginator.page(paginator.num_pages)
-
-    venta, created = Venta.objects.get_or_create(usuario=request.user, estado='CART')
-    detalles_venta = DetalleVenta.objects.filter(venta=venta)
+        return max(1, min(int(request.GET.get("per_page", 8)), MAX_PER_PAGE_POS))
+    except (TypeError, ValueError):
+        return 8
 
-    total_ventas = Venta.objects.filter(usuario=request.user).count()
-    total_productos = productos_qs.count()
-    clientes = Cliente.objects.all()
-    total_stock = sum([p.stock for p in productos_qs])
-    total_ganancias = sum([v.total() for v in Venta.objects.filter(usuario=request.user)])
-
-    total_carrito = 0
-    total_carrito = sum(d.subtotal() for d in detalles_venta)
 
+@login_required
+def pos_home(request):
+    q = (request.GET.get("q") or "").strip()
+    per_page = _per_page_pos(request)
+    catalogo = pagina_catalogo(q, request.GET.get("page"), per_page)
 
     params = request.GET.copy()
     params.pop("page", None)
     querystring = params.urlencode()
 
     context = {
-        'clientes': clientes,
-        'productos': page_obj.object_list,
-        'page_obj': page_obj,
-        'detalles_venta': detalles_venta,
-        'total_ventas': total_ventas,
-        'total_productos': total_productos,
-        'total_stock': total_stock,
-        'total_ganancias': total_ganancias,
-        'total_carrito': total_carrito,
+        'clientes': _clientes_recientes(request.user),
+        'catalogo_html': catalogo['html'],
+        'carrito': Carrito(request.user).resumen(),
+        'total_productos': catalogo['total'],
         'query': q,
         'querystring': querystring,
         'per_page': per_page, 
     }
-
-    if request.method == "POST" and 'confirmar_venta' in request.POST:
-        venta.estado = 'COMPLETED'
-        venta.fecha_venta = timezone.now()
-        venta.save()
-        messages.success(request, "La venta ha sido confirmada.")
-        return redirect('pos_home')
+    context.update(_estadisticas_pos(request.user, productos_activos(q)))
 
     return render(request, "heladeria/pos_home.html", context)
 
 @login_required
-def pos_ajax(request):
+async def pos_ajax(request):
     q = (request.GET.get("q") or "").strip()
-    per_page = request.GET.get("per_page", 8)
-    page = request.GET.get("page", 1)
-
-    try:
-        per_page = int(per_page)
-    except ValueError:
-        per_page = 8
-
-    productos_qs = Producto.objects.filter(state="ACTIVE").order_by("nombre")
-    if q:
-        productos_qs = productos_qs.filter(nombre__icontains=q)
-
-    paginator = Paginator(productos_qs, per_page)
-    try:
-        page_obj = paginator.page(page)
-    except (PageNotAnInteger, EmptyPage):
-        page_obj = paginator.page(1)
-
-    context = {
-        "productos": page_obj.object_list,
-        "page_obj": page_obj,
-        "query": q,
-        "per_page": per_page,
-    }
-
-    html = render_to_string("heladeria/_pos_parcial.html", context, request=request)
-    return HttpResponse(html)
+    catalogo = await apagina_catalogo(q, request.GET.get("page", 1), _per_page_pos(request))
+    return HttpResponse(catalogo["html"])
 
 @login_required
 def confirmar_venta(request):
     if request.method == "POST":
+        es_ajax = request.headers.get("X-Requested-With") == "XMLHttpRequest"
         try:
-            carrito_json = request.POST.get("carrito_json", "{}")
-            carrito = json.loads(carrito_json)
+            carrito_servidor = Carrito(request.user)
+            # El POS usa el carrito del servidor; carrito_json se acepta por compatibilidad
+            if "carrito_json" in request.POST:
+                carrito = json.loads(request.POST.get("carrito_json") or "{}")
+            else:
+                carrito = carrito_servidor.como_pedido()
 
             if not carrito:
                 messages.warning(request, "El carrito está vacío.")
+                if es_ajax:
+                    return JsonResponse({"success": False, "error": "El carrito está vacío.", "fallos": []}, status=400)
                 return redirect("pos_home")
 
-            cliente_id = request.POST.get("cliente")
-            cliente = None
-            if cliente_id:
-                cliente = Cliente.objects.filter(id=cliente_id).first()
-
-            venta = Venta.objects.create(
-                usuario=request.user,
-                cliente=cliente, 
-                estado="PENDING"
-            )
-
-            for producto_id, item in carrito.items():
-                try:
-                    producto = Producto.objects.get(pk=producto_id, state="ACTIVE")
-                    cantidad = int(item.get("cantidad", 1))
-                    cantidad = max(cantidad, 1)
+            venta, fallos = registrar_venta(request.user, carrito, request.POST.get("cliente"))
+            if venta:
+                # Solo salen del carrito las líneas vendidas: las que fallaron
+                # (sin stock, inactivas) quedan para que el cajero las corrija
+                carrito_servidor.quitar(venta.detalleventa_set.values_list("producto_id", flat=True))
 
-                    DetalleVenta.objects.create(
-                        venta=venta,
-                        producto=producto,
-                        cantidad=cantidad,
-                        precio_unitario=producto.precio,
-                        precio_compra=producto.precio_compra
-                    )
+            if es_ajax:
+                return JsonResponse(
+                    {"success": venta is not None, "venta_id": venta.id if venta else None, "fallos": fallos},
+                    status=200 if venta else 409,
+                )
 
-
-                    producto.stock = max(producto.stock - cantidad, 0)
-                    producto.save()
-
-                except Producto.DoesNotExist:
-                    continue  
-
-            
+            for fallo in fallos:
+                messages.warning(request, f"{fallo['nombre'] or fallo['producto_id']}: {fallo['motivo']}")
             return redirect("pos_home")
 
         except Exception as e:
+            if es_ajax:
+                return JsonResponse({"success": False, "error": str(e), "fallos": []}, status=500)
             messages.error(request, f"Ocurrió un error al procesar la venta: {e}")
             return redirect("pos_home")
 
     return redirect("pos_home")
 
+
+def _producto_y_cantidad(request):
+    try:
+        return int(request.POST["producto_id"]), int(request.POST.get("cantidad", 1))
+    except (KeyError, ValueError):
+        return None, None
+
+
+@login_required
+def carrito_estado(request):
+    return JsonResponse(Carrito(request.user).resumen())
+
+
+@login_required
+def carrito_modificar(request, accion):
+    """
+    API del carrito del POS (POST): agregar, actualizar (cantidad 0 quita el
+    producto) y vaciar. No escribe en la base de datos.
+    """
+    if request.method != "POST":
+        return JsonResponse({"success": False, "error": "Método no permitido"}, status=405)
+
+    carrito = Carrito(request.user)
+    if accion == "vaciar":
+        carrito.vaciar()
+    elif accion in ("agregar", "actualizar"):
+        producto_id, cantidad = _producto_y_cantidad(request)
+        if producto_id is None:
+            return JsonResponse({"success": False, "error": "Producto o cantidad inválidos"}, status=400)
+        if accion == "agregar":
+            carrito.agregar(producto_id, max(cantidad, 1))
+        else:
+            carrito.actualizar(producto_id, cantidad)
+    else:
+        return JsonResponse({"success": False, "error": "Acción desconocida"}, status=404)
+
+    return JsonResponse({"success": True, **carrito.resumen()})
+
 @login_required
 def products_list(request):
     productos = Producto.objects.filter(state="ACTIVE")
@@ -205,24 +207,8 @@ def venta_detail(request, venta_id):
 
 @login_required
 def add_to_cart(request, producto_id):
-    producto = get_object_or_404(Producto, id=producto_id)
-    venta, created = Venta.objects.get_or_create(usuario=request.user, estado='CART')
-    detalle, created = DetalleVenta.objects.get_or_create(venta=venta, producto=producto)
-    if not created:
-        detalle.cantidad += 1
-    else:
-        detalle.cantidad = 1
-    
-    detalle.save()
-
-    if request.method == "POST" and 'confirmar_venta' in request.POST:
-        venta.estado = 'COMPLETED'
-        venta.fecha_venta = timezone.now()
-        venta.save()
-
-        messages.success(request, f"La venta de {producto.nombre} ha sido confirmada.")
-        return redirect('pos_home')
-
+    producto = get_object_or_404(Producto, id=producto_id, state="ACTIVE")
+    Carrito(request.user).agregar(producto.id)
     messages.success(request, f"{producto.nombre} ha sido agregado al carrito.")
     return redirect('pos_home')
 
@@ -260,6 +246,24 @@ def listar_productos(request):
     }
     return render(request, "heladeria/listar_productos.html", context)
 
+def _periodo_reporte(periodo, fecha_inicio, fecha_fin):
+    """Rango de fechas (ambas incluidas) del período elegido en el reporte de ventas."""
+    hoy = timezone.localdate()
+    if periodo == "semana":
+        return hoy - timedelta(days=hoy.weekday()), hoy
+    if periodo == "mes":
+        return hoy.replace(day=1), hoy
+    if periodo == "año":
+        return hoy.replace(month=1, day=1), hoy
+    if periodo == "personalizado":
+        try:
+            desde, hasta = parse_date(fecha_inicio or ""), parse_date(fecha_fin or "")
+        except ValueError:
+            desde = hasta = None
+        if desde and hasta:
+            return desde, hasta
+    return hoy, hoy
+
 @login_required
 def reportes_ventas(request):
     productos = Producto.objects.filter(state="ACTIVE")
@@ -269,49 +273,85 @@ def reportes_ventas(request):
     fecha_inicio = request.GET.get("fecha_inicio")
     fecha_fin = request.GET.get("fecha_fin")
 
-    ventas = Venta.objects.filter(estado="COMPLETED")
-
-    hoy = now()
-    if periodo == "dia":
-        ventas = ventas.filter(fecha__date=hoy.date())
-    elif periodo == "semana":
-        inicio_semana = hoy - timedelta(days=hoy.weekday())
-        ventas = ventas.filter(fecha__date__gte=inicio_semana.date())
-    elif periodo == "mes":
-        ventas = ventas.filter(fecha__month=hoy.month, fecha__year=hoy.year)
-    elif periodo == "año":
-        ventas = ventas.filter(fecha__year=hoy.year)
-    elif periodo == "personalizado" and fecha_inicio and fecha_fin:
-        try:
-            f1 = datetime.strptime(fecha_inicio, "%Y-%m-%d")
-            f2 = datetime.strptime(fecha_fin, "%Y-%m-%d")
-            ventas = ventas.filter(fecha__date__range=[f1, f2])
-        except:
-            pass
-
-    if producto_id and producto_id != "todos":
-        ventas = ventas.filter(detalleventa__producto_id=producto_id)
-
-    detalles = DetalleVenta.objects.filter(venta__in=ventas)
-
-    if producto_id and producto_id != "todos":
-        detalles = detalles.filter(producto_id=producto_id)
-
-    resumen = detalles.values("producto__nombre").annotate(
-        total_vendido=Sum(F("cantidad") * F("producto__precio")),
-        unidades_vendidas=Sum("cantidad")
-    )
-
-    total_general = sum([r["total_vendido"] or 0 for r in resumen])
+    desde, hasta = _periodo_reporte(periodo, fecha_inicio, fecha_fin)
+    productos_ids = [int(producto_id)] if producto_id and producto_id.isdigit() else None
+    reporte = resumen_ventas_por_producto(desde, hasta, ["COMPLETED"], productos_ids)
 
     context = {
         "productos": productos,
-        "resumen": resumen,
-        "total_general": total_general,
+        "resumen": reporte["productos"],
+        "total_general": reporte["totales"]["total_vendido"],
+        "total_unidades": reporte["totales"]["unidades_vendidas"],
         "producto_seleccionado": producto_id,
         "periodo": periodo,
         "fecha_inicio": fecha_inicio,
         "fecha_fin": fecha_fin,
+        "desde": desde,
+        "hasta": hasta,
     }
 
-    return render(request, "heladeria/reportes_ventas.html", context)
\ No newline at end of file
+    return render(request, "heladeria/reportes_ventas.html", context)
+
+def _tarea_json(tarea):
+    return {
+        "id": tarea.id,
+        "tipo": tarea.tipo,
+        "estado": tarea.estado,
+        "intentos": tarea.intentos,
+        "error": tarea.error if tarea.estado == "FALLIDA" else "",
+        "url_estado": reverse("estado_tarea", args=[tarea.id]),
+        "url_descarga": reverse("descargar_tarea", args=[tarea.id]) if tarea.archivo else None,
+    }
+
+
+def _tarea_del_usuario(request, tarea_id):
+    tarea = get_object_or_404(TareaFondo, pk=tarea_id)
+    if tarea.usuario_id != request.user.id and not request.user.is_staff:
+        raise PermissionDenied
+    return tarea
+
+
+@login_required
+def encolar_tarea(request, tipo):
+    """Encola una exportación para el worker (manage.py procesar_tareas) y devuelve su id."""
+    if request.method != "POST":
+        return JsonResponse({"success": False, "error": "Método no permitido"}, status=405)
+    if tipo not in tareas.REGISTRO:
+        return JsonResponse({"success": False, "error": "Tarea desconocida"}, status=404)
+    if not tareas.puede_encolar(request.user, tipo):
+        raise PermissionDenied
+
+    parametros = {}
+    if tipo == "exportar_detalle_producto":
+        parametros = {
+            "producto_id": get_object_or_404(Producto, pk=request.POST.get("producto_id")).id,
+            "filtros": request.GET.dict(),
+        }
+
+    tarea = tareas.encolar(tipo, usuario=request.user, **parametros)
+    return JsonResponse({"success": True, **_tarea_json(tarea)}, status=202)
+
+
+@login_required
+def estado_tarea(request, tarea_id):
+    return JsonResponse(_tarea_json(_tarea_del_usuario(request, tarea_id)))
+
+
+@login_required
+def descargar_tarea(request, tarea_id):
+    tarea = _tarea_del_usuario(request, tarea_id)
+    if tarea.estado != "COMPLETADA" or not tarea.archivo:
+        raise Http404("La exportación todavía no está lista")
+    return FileResponse(tarea.archivo.open("rb"), as_attachment=True, filename=os.path.basename(tarea.archivo.name))
+
+
+@staff_member_required
+def metricas(request):
+    """Tiempos y consultas por vista recogidos por MetricasMiddleware."""
+    if request.method == "POST":
+        ESTADISTICAS.limpiar()
+        return redirect("metricas")
+    return render(request, "heladeria/metricas.html", {
+        "filas": ESTADISTICAS.resumen(),
+        "muestras_por_vista": MUESTRAS_POR_VISTA,
+    })
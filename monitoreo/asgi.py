@@ -3,6 +3,14 @@ ASGI config for monitoreo project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Los endpoints AJAX de solo lectura (POS, listados de ventas, clientes y
+productos) son vistas asíncronas; el resto corre en hilos vía sync_to_async.
+Para servirlo:
+
+    uvicorn monitoreo.asgi:application --workers 4
+
+y comparar contra el despliegue WSGI con ``manage.py prueba_carga``.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -12,5 +20,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'monitoreo.settings')
+os.environ.setdefault('DJANGO_SERVIDOR', 'asgi')
 
 application = get_asgi_application()
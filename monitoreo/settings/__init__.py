@@ -0,0 +1,22 @@
+"""
+Perfil de configuración según DJANGO_ENTORNO: "dev" (por defecto) o "prod".
+DJANGO_SETTINGS_MODULE sigue siendo monitoreo.settings en todos los casos.
+"""
+
+import os
+from pathlib import Path
+
+from django.core.exceptions import ImproperlyConfigured
+from dotenv import load_dotenv
+
+# El .env puede fijar DJANGO_ENTORNO, así que se carga antes de elegir
+load_dotenv(Path(__file__).resolve().parent.parent.parent / ".env")
+
+ENTORNO = os.getenv("DJANGO_ENTORNO", "dev")
+
+if ENTORNO == "prod":
+    from .prod import *  # noqa: F401,F403
+elif ENTORNO == "dev":
+    from .dev import *  # noqa: F401,F403
+else:
+    raise ImproperlyConfigured(f'DJANGO_ENTORNO debe ser "dev" o "prod", no "{ENTORNO}"')
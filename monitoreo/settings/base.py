@@ -1,5 +1,7 @@
 """
-Django settings for monitoreo project.
+Django settings for monitoreo project: configuración común a todos los
+entornos. dev.py y prod.py la extienden; monitoreo/settings/__init__.py elige
+uno según DJANGO_ENTORNO.
 
 Generated by 'django-admin startproject' using Django 5.2.6.
 
@@ -15,21 +17,17 @@ import os
 from dotenv import load_dotenv
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
-BASE_DIR = Path(__file__).resolve().parent.parent
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
 
-
-# Quick-start development settings - unsuitable for production
-# See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
-
-# SECURITY WARNING: keep the secret key used in production secret!
 load_dotenv(BASE_DIR / ".env")
 
-SECRET_KEY = os.getenv("DJANGO_SECRET_KEY", "dev-unsafe")
-DEBUG = os.getenv("DJANGO_DEBUG", "False") == "True"
+# SECURITY WARNING: keep the secret key used in production secret!
+SECRET_KEY_INSEGURA = "dev-unsafe"
+SECRET_KEY = os.getenv("DJANGO_SECRET_KEY", SECRET_KEY_INSEGURA)
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
-ALLOWED_HOSTS = ['*']
+DEBUG = False
+ALLOWED_HOSTS = []
 CSRF_TRUSTED_ORIGINS = ['https://secreto-heladeria.onrender.com']
 # Application definition
 
@@ -51,6 +49,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primero, para medir también sesión y autenticación
+    'heladeria.middleware.MetricasMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -60,6 +60,9 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Tiempos, consultas SQL y cabecera Server-Timing por petición (ver /heladeria/metricas/)
+METRICAS_HABILITADAS = os.getenv("METRICAS_HABILITADAS", "True") == "True"
+
 ROOT_URLCONF = 'monitoreo.urls'
 
 TEMPLATES = [
@@ -78,6 +81,10 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'monitoreo.wsgi.application'
+ASGI_APPLICATION = 'monitoreo.asgi.application'
+
+# "wsgi" (gunicorn/runserver) o "asgi" (uvicorn/daphne); monitoreo/asgi.py lo fija en "asgi"
+SERVIDOR = os.getenv("DJANGO_SERVIDOR", "wsgi")
 
 LOGIN_REDIRECT_URL = '/heladeria/pos'  
 
@@ -89,6 +96,12 @@ LOGOUT_REDIRECT_URL = '/accounts/login/'
 
 ENGINE = os.getenv("DB_ENGINE", "sqlite")
 
+# Conexiones persistentes: se reutilizan entre peticiones del mismo worker
+# durante CONN_MAX_AGE segundos y se verifican antes de reutilizarlas.
+# Bajo ASGI cada petición asíncrona corre en un hilo distinto y las conexiones
+# persistentes se acumulan sin reutilizarse, así que por defecto se cierran.
+DB_CONN_MAX_AGE = int(os.getenv("DB_CONN_MAX_AGE", "0" if SERVIDOR == "asgi" else "60"))
+
 if ENGINE == "mysql":
     DATABASES = {
         "default": {
@@ -98,7 +111,15 @@ if ENGINE == "mysql":
             "PASSWORD": os.getenv("DB_PASSWORD"),
             "HOST": os.getenv("DB_HOST", "localhost"),
             "PORT": os.getenv("DB_PORT", "3306"),
-            "OPTIONS": {"charset": "utf8mb4"},
+            "CONN_MAX_AGE": DB_CONN_MAX_AGE,
+            "CONN_HEALTH_CHECKS": True,
+            "OPTIONS": {
+                "charset": "utf8mb4",
+                "connect_timeout": 5,
+                # READ COMMITTED evita bloqueos de rango (gap locks) entre cajas que venden a la vez
+                "isolation_level": "read committed",
+                "init_command": "SET sql_mode='STRICT_TRANS_TABLES', innodb_lock_wait_timeout=10",
+            },
         }
     }
 else:  # SQLite por defecto
@@ -106,9 +127,55 @@ else:  # SQLite por defecto
         "default": {
             "ENGINE": "django.db.backends.sqlite3",
             "NAME": BASE_DIR / os.getenv("DB_NAME", "db.sqlite3"),
+            "CONN_MAX_AGE": DB_CONN_MAX_AGE,
+            "CONN_HEALTH_CHECKS": True,
+            "OPTIONS": {
+                # Segundos que una escritura espera el bloqueo antes de "database is locked"
+                "timeout": 20,
+                # Las transacciones toman el bloqueo de escritura al empezar: sin esto, dos
+                # transacciones que leen y luego escriben fallan sin esperar el timeout
+                "transaction_mode": "IMMEDIATE",
+            },
         }
     }
 
+# PRAGMAs que se aplican a cada conexión SQLite nueva (heladeria.conexiones).
+# WAL permite leer mientras otra conexión escribe.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 20000,
+    "cache_size": -20000,  # KiB (negativo), ~20 MB por conexión
+    "mmap_size": 134217728,  # 128 MB
+    "temp_store": "MEMORY",
+}
+
+# Caché: locmem para un solo proceso; file o redis para compartirla entre workers
+def configurar_cache(backend):
+    if backend == "redis":
+        return {
+            "default": {
+                "BACKEND": "django.core.cache.backends.redis.RedisCache",
+                "LOCATION": os.getenv("CACHE_LOCATION", "redis://127.0.0.1:6379/1"),
+            }
+        }
+    if backend == "file":
+        return {
+            "default": {
+                "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                "LOCATION": os.getenv("CACHE_LOCATION", BASE_DIR / "cache"),
+            }
+        }
+    return {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "heladeria",
+        }
+    }
+
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "locmem")
+CACHES = configurar_cache(CACHE_BACKEND)
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -148,6 +215,11 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
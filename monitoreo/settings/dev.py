@@ -0,0 +1,7 @@
+"""Desarrollo local: DEBUG activo y cualquier host."""
+
+from .base import *  # noqa: F401,F403
+from .base import os
+
+DEBUG = os.getenv("DJANGO_DEBUG", "True") == "True"
+ALLOWED_HOSTS = ['*']
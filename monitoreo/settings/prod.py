@@ -0,0 +1,52 @@
+"""
+Producción. Sin DEBUG, Django no acumula cada consulta en
+connection.queries, así que los workers de larga vida no crecen en memoria.
+`manage.py verificar_produccion` comprueba esta configuración antes de desplegar.
+"""
+
+from .base import *  # noqa: F401,F403
+from .base import DATABASES, SERVIDOR, TEMPLATES, configurar_cache, os
+
+DEBUG = False
+
+ALLOWED_HOSTS = [
+    host.strip()
+    for host in os.getenv("DJANGO_ALLOWED_HOSTS", "secreto-heladeria.onrender.com").split(",")
+    if host.strip()
+]
+
+# Plantillas compiladas una vez por proceso
+TEMPLATES[0]['APP_DIRS'] = False
+TEMPLATES[0]['OPTIONS']['loaders'] = [
+    ('django.template.loaders.cached.Loader', [
+        'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+    ]),
+]
+
+# Las invalidaciones por versión (catálogo, permisos, contadores...) tienen que
+# verse en todos los workers: en producción la caché no puede ser locmem
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "file")
+CACHES = configurar_cache(CACHE_BACKEND)
+
+# Las métricas por petición se activan a mano para diagnosticar, no por defecto
+METRICAS_HABILITADAS = os.getenv("METRICAS_HABILITADAS", "False") == "True"
+
+# Conexiones persistentes más largas que en desarrollo (salvo bajo ASGI, ver base)
+DATABASES['default']['CONN_MAX_AGE'] = int(
+    os.getenv("DB_CONN_MAX_AGE", "0" if SERVIDOR == "asgi" else "600")
+)
+
+# Nombres con hash para cachear los estáticos indefinidamente; requiere collectstatic
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.ManifestStaticFilesStorage"},
+}
+
+# Detrás del proxy TLS del hosting
+SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
+SECURE_SSL_REDIRECT = os.getenv("DJANGO_SSL_REDIRECT", "True") == "True"
+SESSION_COOKIE_SECURE = True
+CSRF_COOKIE_SECURE = True
+SECURE_HSTS_SECONDS = int(os.getenv("DJANGO_HSTS_SECONDS", "3600"))
+SECURE_CONTENT_TYPE_NOSNIFF = True
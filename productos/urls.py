@@ -9,6 +9,7 @@ urlpatterns = [
     path('<int:pk>/', views.detalle_productos, name='detalle_productos'),
     path("<int:pk>/ajax/", views.detalle_productos_ajax, name="detalle_productos_ajax"),
     path('<int:pk>/graficos/', views.graficos_producto, name='graficos_producto'),
+    path('<int:pk>/graficos/datos/', views.graficos_producto_datos, name='graficos_producto_datos'),
     path('exportar/', views.exportar_productos_excel, name='exportar_productos_excel'),
     path('eliminar-multiples/', views.eliminar_productos_multiples, name='eliminar_productos_multiples'),
     path('ajax/', views.lista_productos_ajax, name='lista_productos_ajax'),
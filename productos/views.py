@@ -1,15 +1,29 @@
-from django.shortcuts import render, get_object_or_404, redirect
+from asgiref.sync import sync_to_async
+from django.shortcuts import render, get_object_or_404, aget_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse, HttpResponse
+from django.core.cache import cache
 from django.db.models import Q, Sum
-from heladeria.models import Producto, DetalleVenta
+from heladeria.models import PRECIO_EFECTIVO, Producto, DetalleVenta
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from dateutil.relativedelta import relativedelta
 from .forms import ProductoForm
 from django.core.paginator import Paginator
 from django.template.loader import render_to_string
 from django.utils.timezone import make_naive
 import openpyxl, json
 import pandas as pd
+from heladeria.contadores import contadores_productos
 from heladeria.decorators import grupo_requerido
+from heladeria.exportacion import exportar, filas_detalle_producto, filas_productos
+from heladeria.paginacion import apagina, apaginar, paginar
+from heladeria.resumen import ESTADOS_RESUMIDOS
+from heladeria.versiones import aversion, version
+from reportes.services import GRANULARIDADES, MAX_BUCKETS_SERIE, buckets_entre, serie_temporal
+
+# Columnas sin nulos por las que se puede paginar con cursor
+CAMPOS_CURSOR_PRODUCTOS = ("nombre", "precio", "stock", "created_at", "id")
 
 @grupo_requerido('Admin')
 @login_required
@@ -26,7 +40,7 @@ def lista_productos(request):
     except:
         per_page = 10
 
-    productos = Producto.objects.all()
+    productos = Producto.objects.select_related("categoria")
 
     if query:
         productos = productos.filter(
@@ -42,9 +56,7 @@ def lista_productos(request):
     else:
         productos = productos.order_by(sort)
 
-    paginator = Paginator(productos, per_page)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginar(request, productos, sort, direction, per_page, CAMPOS_CURSOR_PRODUCTOS)
 
     next_direction = "desc" if direction == "asc" else "asc"
 
@@ -57,14 +69,12 @@ def lista_productos(request):
         "next_direction": next_direction,
         "per_page": per_page,
         "stock": stock,
-        "total_productos": Producto.objects.count(),
-        "productos_con_stock": Producto.objects.filter(stock__gt=0).count(),
-        "productos_sin_stock": Producto.objects.filter(stock=0).count(),
+        **contadores_productos(),
     })
 
 @grupo_requerido('Admin')
 @login_required
-def lista_productos_ajax(request):
+async def lista_productos_ajax(request):
 
     query = request.GET.get("q", "")
     sort = request.GET.get("sort", "nombre")
@@ -77,7 +87,7 @@ def lista_productos_ajax(request):
     except:
         per_page = 10
 
-    productos = Producto.objects.all()
+    productos = Producto.objects.select_related("categoria")
 
     if query:
         productos = productos.filter(
@@ -94,9 +104,7 @@ def lista_productos_ajax(request):
     else:
         productos = productos.order_by(sort)
 
-    paginator = Paginator(productos, per_page)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    page_obj = await apaginar(request, productos, sort, direction, per_page, CAMPOS_CURSOR_PRODUCTOS)
 
     html = render_to_string("productos/_tabla_productos.html", {
         "page_obj": page_obj,
@@ -193,27 +201,77 @@ def eliminar_productos_multiples(request):
 @grupo_requerido('Admin')
 @login_required
 def exportar_productos_excel(request):
-    productos = Producto.objects.all()
+    return exportar(request, "productos", "Productos", *filas_productos())
+
+from django.db.models import F, ExpressionWrapper, DecimalField
 
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Productos"
+TTL_ESTADISTICAS_PRODUCTO = 60 * 60 * 24
 
-    ws.append(["Nombre", "Precio", "Stock"])
 
-    for p in productos:
-        ws.append([p.nombre, float(p.precio), p.stock])
+def _clave_estadisticas(producto_id, version_producto, version_resumen):
+    return f"estadisticas_producto:{producto_id}:{version_producto}:{version_resumen}"
 
-    response = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+def _consulta_estadisticas(producto_id):
+    ingreso = F("cantidad") * PRECIO_EFECTIVO
+    completadas = Q(venta__estado="COMPLETED")
+    pendientes = Q(venta__estado="PENDING")
+    return DetalleVenta.objects.filter(producto_id=producto_id), dict(
+        total_vendido=Sum("cantidad", filter=completadas, default=0),
+        total_ganado=Sum(ingreso, filter=completadas, default=0, output_field=DecimalField()),
+        unidades_pendientes=Sum("cantidad", filter=pendientes, default=0),
+        ingreso_pendiente=Sum(ingreso, filter=pendientes, default=0, output_field=DecimalField()),
     )
-    response["Content-Disposition"] = 'attachment; filename="productos.xlsx"'
-    wb.save(response)
-    return response
 
-from django.db.models import F, ExpressionWrapper, DecimalField, Sum
+
+def _stats_desde_totales(totales):
+    return {
+        "total_vendido": totales["total_vendido"],
+        "total_ganado": float(totales["total_ganado"]),
+        "unidades_pendientes": totales["unidades_pendientes"],
+        "ingreso_pendiente": float(totales["ingreso_pendiente"]),
+        "ingreso_potencial": float(totales["total_ganado"] + totales["ingreso_pendiente"]),
+    }
+
+
+def _estadisticas_producto(producto_id):
+    """
+    Unidades e ingresos (a precio histórico) de las ventas completadas y
+    pendientes de un producto, en una sola consulta. Se cachea hasta la
+    próxima venta del producto: el resumen incrementa su versión al cambiar.
+    """
+    clave = _clave_estadisticas(producto_id, version(f"producto:{producto_id}"), version("resumen"))
+    stats = cache.get(clave)
+    if stats is not None:
+        return stats
+
+    detalles, agregados = _consulta_estadisticas(producto_id)
+    stats = _stats_desde_totales(detalles.aggregate(**agregados))
+    cache.set(clave, stats, TTL_ESTADISTICAS_PRODUCTO)
+    return stats
+
+
+async def _aestadisticas_producto(producto_id):
+    """Versión async de _estadisticas_producto (misma clave de caché)."""
+    clave = _clave_estadisticas(
+        producto_id, await aversion(f"producto:{producto_id}"), await aversion("resumen")
+    )
+    stats = await cache.aget(clave)
+    if stats is not None:
+        return stats
+
+    detalles, agregados = _consulta_estadisticas(producto_id)
+    stats = _stats_desde_totales(await detalles.aaggregate(**agregados))
+    await cache.aset(clave, stats, TTL_ESTADISTICAS_PRODUCTO)
+    return stats
+
 
 def _get_filtered_queryset(producto, params):
+    return _filtrar_detalles(producto, params), _estadisticas_producto(producto.id)
+
+
+def _filtrar_detalles(producto, params):
+    """Líneas de venta del producto con los filtros del detalle. No consulta la base."""
     detalles = (
         DetalleVenta.objects
         .filter(
@@ -223,35 +281,12 @@ def _get_filtered_queryset(producto, params):
         .select_related("venta", "producto")
         .annotate(
             recaudacion=ExpressionWrapper(
-                F("cantidad") * F("producto__precio"),
+                F("cantidad") * PRECIO_EFECTIVO,
                 output_field=DecimalField(max_digits=12, decimal_places=2)
             )
         )
     )
 
-    ventas_validas = detalles.order_by("-venta__fecha")
-
-    ventas_completadas = ventas_validas.filter(venta__estado="COMPLETED")
-
-    total_vendido = ventas_completadas.aggregate(
-        total=Sum("cantidad")
-    )["total"] or 0
-
-    total_ganado = ventas_completadas.aggregate(
-        total=Sum("recaudacion")
-    )["total"] or 0
-
-    ventas_pendientes = ventas_validas.filter(venta__estado="PENDING")
-
-    unidades_pendientes = ventas_pendientes.aggregate(
-        total=Sum("cantidad")
-    )["total"] or 0
-
-    ingreso_pendiente = ventas_pendientes.aggregate(
-        total=Sum("recaudacion")
-    )["total"] or 0
-
-    ingreso_potencial = total_ganado + ingreso_pendiente
     filtered = detalles
 
     estado = params.get("estado")
@@ -286,16 +321,7 @@ def _get_filtered_queryset(producto, params):
         except ValueError:
             pass
 
-    stats = {
-        "total_vendido": total_vendido,
-        "total_ganado": float(total_ganado),
-        "unidades_pendientes": unidades_pendientes,
-        "ingreso_pendiente": float(ingreso_pendiente),
-        "ingreso_potencial": float(ingreso_potencial),
-        "ventas_validas_qs": ventas_validas,
-    }
-
-    return filtered, stats
+    return filtered
 
 @grupo_requerido('Admin')
 @login_required
@@ -304,29 +330,9 @@ def detalle_productos(request, pk):
     filtered, stats = _get_filtered_queryset(producto, request.GET)
 
     if request.GET.get("export") == "excel":
-        import pandas as pd
-        from django.http import HttpResponse
-
-        registros = []
-
-        for item in filtered.select_related("venta", "producto"):
-            registros.append({
-                "ID Venta": item.venta.id,
-                "Fecha": make_naive(item.venta.fecha),
-                "Cantidad": item.cantidad,
-                "Subtotal": item.producto.precio * item.cantidad,
-                "Estado": item.venta.estado,
-            })
-
-        df = pd.DataFrame(registros)
-
-        response = HttpResponse(
-            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        return exportar(
+            request, f"detalle_producto_{producto.id}", "Detalle", *filas_detalle_producto(filtered)
         )
-        response["Content-Disposition"] = f'attachment; filename=\"detalle_producto_{producto.id}.xlsx\"'  # noqa
-
-        df.to_excel(response, index=False)
-        return response
 
 
     try:
@@ -363,40 +369,33 @@ def detalle_productos(request, pk):
         "ingreso_pendiente": stats["ingreso_pendiente"],
         "ingreso_potencial": stats["ingreso_potencial"],
 
-        "ventas": stats["ventas_validas_qs"],
     })
 
+def _detalle_excel(request, producto, filtered):
+    return exportar(
+        request, f"detalle_producto_{producto.id}", "Detalle", *filas_detalle_producto(filtered)
+    )
+
 @grupo_requerido('Admin')
 @login_required
-def detalle_productos_ajax(request, pk):
-    producto = get_object_or_404(Producto, pk=pk)
+async def detalle_productos_ajax(request, pk):
+    producto = await aget_object_or_404(Producto, pk=pk)
 
-    filtered, stats = _get_filtered_queryset(producto, request.GET)
+    filtered = _filtrar_detalles(producto, request.GET)
 
     if request.GET.get("export") == "excel":
-        rows = []
-        for d in filtered.order_by("-venta__fecha"):
-            rows.append({
-                "Fecha": d.venta.fecha,
-                "Estado": d.venta.estado,
-                "Cantidad": d.cantidad,
-                "Precio": float(d.producto.precio),
-                "Subtotal": float(d.subtotal()),
-            })
-        df = pd.DataFrame(rows)
-        response = HttpResponse(content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-        response["Content-Disposition"] = f'attachment; filename="detalle_{producto.id}.xlsx"'
-        df.to_excel(response, index=False)
-        return response
+        # Escribir el libro es trabajo bloqueante de principio a fin: va a un hilo
+        return await sync_to_async(_detalle_excel)(request, producto, filtered)
+
+    stats = await _aestadisticas_producto(producto.id)
 
     try:
         page_size = int(request.GET.get("page_size", 5))
     except:
         page_size = 5
 
-    paginator = Paginator(filtered.order_by("-venta__fecha"), page_size)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    page_obj = await apagina(filtered.order_by("-venta__fecha"), page_size, request.GET.get("page"))
+    paginator = page_obj.paginator
 
     querydict = request.GET.copy()
     if "page" in querydict:
@@ -425,25 +424,69 @@ def detalle_productos_ajax(request, pk):
         }
     })
 
+def _parse_fecha(valor):
+    try:
+        return parse_date(valor) if valor else None
+    except ValueError:
+        return None
+
+
+def _rango_serie(params, granularidad):
+    """Rango pedido (?desde=&hasta=, AAAA-MM-DD) o, por defecto, los últimos 12 períodos."""
+    hasta = _parse_fecha(params.get("hasta")) or timezone.localdate()
+    desde = _parse_fecha(params.get("desde"))
+    if desde is None:
+        desde = buckets_entre(hasta - relativedelta(years=1), hasta, granularidad)[-12]
+    return desde, hasta
+
+
 @grupo_requerido('Admin')
 @login_required
 def graficos_producto(request, pk):
     producto = get_object_or_404(Producto, pk=pk)
 
-    ventas = DetalleVenta.objects.filter(producto=producto).select_related("venta")
+    top_clientes = (
+        DetalleVenta.objects
+        .filter(producto=producto, venta__estado="COMPLETED", venta__cliente__isnull=False)
+        .values("venta__cliente__nombre", "venta__cliente__apellido")
+        .annotate(unidades=Sum("cantidad"))
+        .order_by("-unidades")[:5]
+    )
+
+    return render(request, "productos/graficos_productos.html", {
+        "producto": producto,
+        "top_clientes_labels": [
+            f"{fila['venta__cliente__nombre']} {fila['venta__cliente__apellido']}" for fila in top_clientes
+        ],
+        "top_clientes_cant": [fila["unidades"] for fila in top_clientes],
+    })
+
 
-    data_por_mes = {}
+@grupo_requerido('Admin')
+@login_required
+def graficos_producto_datos(request, pk):
+    """
+    Serie de unidades, ingreso y ganancia del producto para los gráficos.
+    ?granularidad=dia|semana|mes, ?estado= (repetible) y ?desde=/?hasta=.
+    """
+    producto = get_object_or_404(Producto, pk=pk)
 
-    for v in ventas:
-        mes = v.venta.fecha.strftime("%Y-%m")
-        data_por_mes.setdefault(mes, 0)
-        data_por_mes[mes] += v.cantidad
+    granularidad = request.GET.get("granularidad", "mes")
+    if granularidad not in GRANULARIDADES:
+        return JsonResponse({"error": "Granularidad inválida"}, status=400)
 
-    labels = list(data_por_mes.keys())
-    data = list(data_por_mes.values())
+    estados = [e for e in request.GET.getlist("estado") if e in ESTADOS_RESUMIDOS] or ["COMPLETED"]
+    desde, hasta = _rango_serie(request.GET, granularidad)
+    if desde > hasta:
+        return JsonResponse({"error": "Rango de fechas inválido"}, status=400)
+    if len(buckets_entre(desde, hasta, granularidad)) > MAX_BUCKETS_SERIE:
+        return JsonResponse({"error": "Rango demasiado largo para esa granularidad"}, status=400)
 
-    return render(request, "productos/graficos_producto.html", {
-        "producto": producto,
-        "labels": labels,
-        "data": data,
+    serie = serie_temporal(desde, hasta, granularidad, estados, [producto.id])
+    return JsonResponse({
+        "producto": producto.id,
+        "estados": estados,
+        "desde": desde.isoformat(),
+        "hasta": hasta.isoformat(),
+        **serie,
     })
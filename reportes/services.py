@@ -0,0 +1,427 @@
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from dateutil.relativedelta import relativedelta
+from django.core.cache import cache
+from django.db.models import CharField, Count, Exists, F, IntegerField, OuterRef, Q, Sum, Value
+from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from heladeria.models import DetalleVenta, Producto, ResumenVentaDiaria, Venta
+from heladeria.resumen import rango_fechas
+from heladeria.versiones import version
+
+
+def calcular_porcentaje(actual, anterior):
+    actual_float = float(actual) if isinstance(actual, Decimal) else float(actual)
+    anterior_float = float(anterior) if isinstance(anterior, Decimal) else float(anterior)
+
+    if anterior_float == 0 and actual_float == 0:
+        return 0
+
+    if anterior_float == 0:
+        return 100 if actual_float > 0 else -100
+
+    return round(((actual_float - anterior_float) / anterior_float) * 100, 1)
+
+
+def calcular_periodos(periodo_filtro, hoy):
+    """Rangos de fechas de tarjetas y gráficos para el período pedido."""
+    if periodo_filtro == '10semanas':
+        inicio_actual = hoy - timedelta(days=hoy.weekday())  # Lunes de esta semana
+        periodos = {
+            'granularidad': 'semana',
+            'label': '10 semanas',
+            'inicio_grafico': hoy - timedelta(weeks=10),
+            'inicio_actual': inicio_actual,
+            'inicio_anterior': inicio_actual - timedelta(weeks=1),
+            'fin_anterior': inicio_actual - timedelta(days=1),
+            'buckets': [hoy - timedelta(weeks=i, days=hoy.weekday()) for i in range(9, -1, -1)],
+        }
+        periodos['inicio_grafico_anterior'] = periodos['inicio_grafico'] - timedelta(weeks=10)
+        periodos['labels'] = [f"Sem {p.strftime('%d/%m')}" for p in periodos['buckets']]
+    elif periodo_filtro == '7dias':
+        periodos = {
+            'granularidad': 'dia',
+            'label': '7 días',
+            'inicio_grafico': hoy - timedelta(days=7),
+            'inicio_actual': hoy,
+            'inicio_anterior': hoy - timedelta(days=1),
+            'fin_anterior': hoy - timedelta(days=1),
+            'buckets': [hoy - timedelta(days=i) for i in range(6, -1, -1)],
+        }
+        periodos['inicio_grafico_anterior'] = periodos['inicio_grafico'] - timedelta(days=7)
+        periodos['labels'] = [d.strftime("%d/%m") for d in periodos['buckets']]
+    else:
+        # 12 meses: el gráfico muestra los últimos 12 meses y las tarjetas
+        # comparan el mes en curso con el mes anterior completo
+        base_mes = hoy.replace(day=1)
+        ultimo_dia_mes_anterior = base_mes - timedelta(days=1)
+        periodos = {
+            'granularidad': 'mes',
+            'label': '12 meses',
+            'inicio_grafico': hoy - relativedelta(months=12),
+            'inicio_actual': base_mes,
+            'inicio_anterior': ultimo_dia_mes_anterior.replace(day=1),
+            'fin_anterior': ultimo_dia_mes_anterior,
+            'buckets': [base_mes - relativedelta(months=i) for i in range(11, -1, -1)],
+        }
+        periodos['inicio_grafico_anterior'] = periodos['inicio_grafico'] - relativedelta(months=12)
+        periodos['labels'] = [m.strftime("%b %Y") for m in periodos['buckets']]
+
+    periodos['fin_grafico'] = hoy
+    periodos['fin_actual'] = hoy
+    periodos['fin_grafico_anterior'] = periodos['inicio_grafico'] - timedelta(days=1)
+    return periodos
+
+
+def inicio_bucket(dia, granularidad):
+    if granularidad == 'mes':
+        return dia.replace(day=1)
+    if granularidad == 'semana':
+        return dia - timedelta(days=dia.weekday())
+    return dia
+
+
+GRANULARIDADES = ('dia', 'semana', 'mes')
+
+# Tope de puntos de una serie, para que un rango diario de años no arme miles de buckets
+MAX_BUCKETS_SERIE = 400
+
+_TRUNCAR_FECHA = {
+    'dia': lambda: F('fecha'),
+    'semana': lambda: TruncWeek('fecha'),
+    'mes': lambda: TruncMonth('fecha'),
+}
+
+
+def siguiente_bucket(bucket, granularidad):
+    if granularidad == 'mes':
+        return bucket + relativedelta(months=1)
+    if granularidad == 'semana':
+        return bucket + timedelta(weeks=1)
+    return bucket + timedelta(days=1)
+
+
+def buckets_entre(desde, hasta, granularidad):
+    """Inicio de cada día, semana (lunes) o mes entre dos fechas, ambas incluidas."""
+    buckets = []
+    bucket = inicio_bucket(desde, granularidad)
+    while bucket <= hasta:
+        buckets.append(bucket)
+        bucket = siguiente_bucket(bucket, granularidad)
+    return buckets
+
+
+def etiqueta_bucket(bucket, granularidad):
+    if granularidad == 'mes':
+        return bucket.strftime("%b %Y")
+    if granularidad == 'semana':
+        return f"Sem {bucket.strftime('%d/%m')}"
+    return bucket.strftime("%d/%m")
+
+
+def serie_temporal(desde, hasta, granularidad='mes', estados=('COMPLETED',), productos_ids=None):
+    """
+    Unidades, ingreso y ganancia por día, semana o mes entre dos fechas, con
+    ceros en los períodos sin ventas. Una sola consulta agrupada sobre el
+    resumen diario, así que el costo no depende de cuántas ventas haya.
+    """
+    buckets = buckets_entre(desde, hasta, granularidad)
+    resumen = ResumenVentaDiaria.objects.filter(
+        estado__in=estados,
+        fecha__gte=desde,
+        fecha__lte=hasta,
+    )
+    if productos_ids:
+        resumen = resumen.filter(producto_id__in=productos_ids)
+
+    filas = (
+        resumen
+        .annotate(bucket=_TRUNCAR_FECHA[granularidad]())
+        .values('bucket')
+        .annotate(
+            total_unidades=Sum('unidades'),
+            total_ingreso=Sum('ingreso'),
+            total_costo=Sum('costo'),
+        )
+        .order_by()
+    )
+    por_bucket = {fila['bucket']: fila for fila in filas}
+
+    unidades, ingreso, ganancia = [], [], []
+    for bucket in buckets:
+        fila = por_bucket.get(bucket)
+        unidades.append(fila['total_unidades'] if fila else 0)
+        ingreso.append(float(fila['total_ingreso']) if fila else 0)
+        ganancia.append(float(fila['total_ingreso'] - fila['total_costo']) if fila else 0)
+
+    return {
+        'granularidad': granularidad,
+        'buckets': [bucket.isoformat() for bucket in buckets],
+        'labels': [etiqueta_bucket(bucket, granularidad) for bucket in buckets],
+        'unidades': unidades,
+        'ingreso': ingreso,
+        'ganancia': ganancia,
+    }
+
+
+TTL_PERIODO_CERRADO = 60 * 60 * 24
+
+
+def _resumen_por_producto(desde, hasta, estados, productos_ids):
+    resumen = ResumenVentaDiaria.objects.filter(estado__in=estados, fecha__gte=desde, fecha__lte=hasta)
+    if productos_ids:
+        resumen = resumen.filter(producto_id__in=productos_ids)
+
+    metricas = {
+        'total_unidades': Sum('unidades'),
+        'total_ingreso': Sum('ingreso'),
+        'total_costo': Sum('costo'),
+    }
+    por_producto = resumen.values('producto_id', 'producto__nombre').annotate(**metricas).order_by()
+    # Fila de totales (producto NULL), como la que agrega GROUP BY ... WITH ROLLUP
+    total = (
+        resumen
+        .annotate(fila_id=Value(None, IntegerField()), fila_nombre=Value(None, CharField()))
+        .values('fila_id', 'fila_nombre')
+        .annotate(**metricas)
+        .order_by()
+    )
+    filas = list(por_producto.union(total, all=True))
+
+    productos, totales = [], None
+    for fila in filas:
+        datos = {
+            'producto_id': fila['producto_id'],
+            'producto__nombre': fila['producto__nombre'],
+            'unidades_vendidas': fila['total_unidades'] or 0,
+            'total_vendido': fila['total_ingreso'] or 0,
+            'ganancia': (fila['total_ingreso'] or 0) - (fila['total_costo'] or 0),
+        }
+        if fila['producto_id'] is None:
+            totales = datos
+        else:
+            productos.append(datos)
+    productos.sort(key=lambda fila: fila['total_vendido'], reverse=True)
+    return {'productos': productos, 'totales': totales}
+
+
+def resumen_ventas_por_producto(desde, hasta, estados=('COMPLETED',), productos_ids=None):
+    """
+    Unidades, ingreso y ganancia por producto entre dos fechas (incluidas) más
+    la fila de totales, en una sola consulta sobre el resumen diario (precios
+    históricos). Los períodos ya cerrados se cachean: solo cambian si se
+    modifica una venta de un día pasado, y eso incrementa la versión
+    "resumen_cerrado".
+    """
+    if hasta >= timezone.localdate():
+        return _resumen_por_producto(desde, hasta, estados, productos_ids)
+
+    clave = "resumen_por_producto:{}:{}:{}:{}:{}:{}".format(
+        version('resumen'), version('resumen_cerrado'), desde.isoformat(), hasta.isoformat(),
+        ",".join(sorted(estados)), ",".join(str(p) for p in sorted(productos_ids or [])),
+    )
+    resultado = cache.get(clave)
+    if resultado is None:
+        resultado = _resumen_por_producto(desde, hasta, estados, productos_ids)
+        cache.set(clave, resultado, TTL_PERIODO_CERRADO)
+    return resultado
+
+
+def _lineas_por_dia(estados, desde, hasta, productos_ids):
+    """Unidades, ingreso y ganancia por (día, producto), leídos del resumen diario."""
+    resumen = ResumenVentaDiaria.objects.filter(
+        estado__in=estados,
+        fecha__gte=desde,
+        fecha__lte=hasta,
+    )
+    if productos_ids:
+        resumen = resumen.filter(producto_id__in=productos_ids)
+
+    filas = (
+        resumen
+        .values('fecha', 'producto_id')
+        .annotate(
+            total_unidades=Sum('unidades'),
+            total_ingreso=Sum('ingreso'),
+            total_costo=Sum('costo'),
+        )
+        .order_by()
+    )
+    return [
+        {
+            'dia': fila['fecha'],
+            'producto_id': fila['producto_id'],
+            'unidades': fila['total_unidades'],
+            'ingreso': fila['total_ingreso'],
+            'ganancia': fila['total_ingreso'] - fila['total_costo'],
+        }
+        for fila in filas
+    ]
+
+
+def _en_rango(desde, hasta):
+    inicio, fin = rango_fechas(desde, hasta)
+    return Q(fecha__gte=inicio, fecha__lt=fin)
+
+
+def _ventas_filtradas(estados, desde, hasta, productos_ids):
+    ventas = Venta.objects.filter(_en_rango(desde, hasta), estado__in=estados)
+    if productos_ids:
+        ventas = ventas.filter(Exists(
+            DetalleVenta.objects.filter(venta=OuterRef('pk'), producto_id__in=productos_ids)
+        ))
+    return ventas
+
+
+def _ordenes_por_dia(estados, desde, hasta, productos_ids):
+    filas = (
+        _ventas_filtradas(estados, desde, hasta, productos_ids)
+        .annotate(dia=TruncDate('fecha'))
+        .values('dia')
+        .annotate(ordenes=Count('id'))
+        .order_by()
+    )
+    return {fila['dia']: fila['ordenes'] for fila in filas}
+
+
+def calcular_dashboard(hoy, estados, periodo_filtro, productos_ids):
+    """
+    Calcula tarjetas, series de gráficos, top productos, ticket promedio y
+    producto estrella con un número fijo de consultas agrupadas por día; el
+    resto del trabajo se hace en Python sobre esas filas.
+    """
+    p = calcular_periodos(periodo_filtro, hoy)
+    granularidad = p['granularidad']
+
+    desde = min(p['inicio_grafico'], p['inicio_anterior'], p['buckets'][0])
+    lineas = _lineas_por_dia(estados, desde, hoy, productos_ids)
+    ordenes_dia = _ordenes_por_dia(
+        estados, min(desde, p['inicio_grafico_anterior']), hoy, productos_ids
+    )
+
+    def sumar_lineas(campo, inicio, fin, producto_id=None):
+        total = 0
+        for fila in lineas:
+            if not inicio <= fila['dia'] <= fin:
+                continue
+            if producto_id is not None and fila['producto_id'] != producto_id:
+                continue
+            total += fila[campo] or 0
+        return total
+
+    def sumar_ordenes(inicio, fin):
+        return sum(n for dia, n in ordenes_dia.items() if inicio <= dia <= fin)
+
+    actual = (p['inicio_actual'], p['fin_actual'])
+    anterior = (p['inicio_anterior'], p['fin_anterior'])
+    grafico = (p['inicio_grafico'], p['fin_grafico'])
+
+    # Unidades por producto en la ventana del gráfico (top y producto estrella)
+    unidades_producto = defaultdict(int)
+    for fila in lineas:
+        if grafico[0] <= fila['dia'] <= grafico[1]:
+            unidades_producto[fila['producto_id']] += fila['unidades'] or 0
+    ranking = sorted(unidades_producto.items(), key=lambda item: item[1], reverse=True)
+
+    productos = Producto.objects.in_bulk(
+        set(productos_ids) | {producto_id for producto_id, _ in ranking[:5]}
+    )
+
+    # ========================================================================
+    # TARJETAS (períodos cortos)
+    # ========================================================================
+
+    cards = []
+    if productos_ids:
+        for producto_id in productos_ids:
+            producto = productos.get(producto_id)
+            if producto is None:
+                continue
+
+            unidades_actual = sumar_lineas('unidades', *actual, producto_id=producto_id)
+            unidades_anterior = sumar_lineas('unidades', *anterior, producto_id=producto_id)
+            dinero_actual = sumar_lineas('ingreso', *actual, producto_id=producto_id)
+            dinero_anterior = sumar_lineas('ingreso', *anterior, producto_id=producto_id)
+
+            cards.append({
+                'titulo': f'{producto.nombre} - Unidades',
+                'valor': unidades_actual,
+                'moneda': False,
+                'porcentaje': calcular_porcentaje(unidades_actual, unidades_anterior)
+            })
+            cards.append({
+                'titulo': f'{producto.nombre} - Ventas',
+                'valor': dinero_actual,
+                'moneda': True,
+                'porcentaje': calcular_porcentaje(dinero_actual, dinero_anterior)
+            })
+    else:
+        clientes = _ventas_filtradas(estados, anterior[0], actual[1], productos_ids).aggregate(
+            actual=Count('cliente', distinct=True, filter=_en_rango(*actual)),
+            anterior=Count('cliente', distinct=True, filter=_en_rango(*anterior)),
+        )
+
+        metricas = [
+            ('Unidades vendidas', False,
+             sumar_lineas('unidades', *actual), sumar_lineas('unidades', *anterior)),
+            ('Órdenes realizadas', False,
+             sumar_ordenes(*actual), sumar_ordenes(*anterior)),
+            ('Dinero recibido', True,
+             sumar_lineas('ingreso', *actual), sumar_lineas('ingreso', *anterior)),
+            ('Clientes con pedido', False,
+             clientes['actual'], clientes['anterior']),
+        ]
+        for titulo, moneda, valor, valor_anterior in metricas:
+            cards.append({
+                'titulo': titulo,
+                'valor': valor,
+                'moneda': moneda,
+                'porcentaje': calcular_porcentaje(valor, valor_anterior)
+            })
+
+    # ========================================================================
+    # GRÁFICOS (período largo)
+    # ========================================================================
+
+    ganancias_bucket = defaultdict(Decimal)
+    for fila in lineas:
+        ganancias_bucket[inicio_bucket(fila['dia'], granularidad)] += fila['ganancia'] or 0
+
+    ordenes_bucket = defaultdict(int)
+    for dia, n in ordenes_dia.items():
+        ordenes_bucket[inicio_bucket(dia, granularidad)] += n
+
+    chart_data = [float(ganancias_bucket[b]) for b in p['buckets']]
+    ordenes_chart_data = [ordenes_bucket[b] for b in p['buckets']]
+
+    # ========================================================================
+    # MÉTRICAS ADICIONALES (período largo)
+    # ========================================================================
+
+    top_productos = []
+    for producto_id, total in ranking[:5]:
+        producto = productos[producto_id]
+        producto.total_vendidos = total
+        top_productos.append(producto)
+
+    ordenes_total = sumar_ordenes(*grafico)
+    ordenes_anterior_total = sumar_ordenes(p['inicio_grafico_anterior'], p['fin_grafico_anterior'])
+
+    total_ventas = sumar_lineas('ingreso', *grafico)
+    ticket_promedio = total_ventas / ordenes_total if ordenes_total > 0 else 0
+
+    return {
+        'cards': cards,
+        'chart_labels': p['labels'],
+        'chart_data': chart_data,
+        'ordenes_chart_data': ordenes_chart_data,
+        'top_productos': top_productos,
+        'ordenes_total': ordenes_total,
+        'crecimiento_ordenes': calcular_porcentaje(ordenes_total, ordenes_anterior_total),
+        'ticket_promedio': ticket_promedio,
+        'producto_top': top_productos[0].nombre if top_productos else 'N/A',
+        'periodo_label': p['label'],
+    }
@@ -3,13 +3,26 @@ from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from heladeria.models import Venta, DetalleVenta
-from django.db.models import Sum, F, Q, FloatField
+from django.db.models import Q
 import json
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
-from openpyxl import Workbook
-from django.http import HttpResponse
+from django.utils.dateparse import parse_date
 from django.template.loader import render_to_string
 from heladeria.decorators import grupo_requerido
+from heladeria.exportacion import exportar, filas_ventas
+from heladeria.paginacion import apaginar, paginar
+from heladeria.permisos import ausuario
+from heladeria.contadores import contadores_ventas, invalidar_contadores
+from heladeria.resumen import rango_fechas, sincronizar_resumen
+
+# Columnas sin nulos por las que se puede paginar con cursor
+CAMPOS_CURSOR_VENTAS = ('fecha', 'total', 'estado', 'id')
+
+
+def _parse_fecha(valor):
+    try:
+        return parse_date(valor) if valor else None
+    except ValueError:
+        return None
 
 @login_required
 def lista_ventas(request):
@@ -23,7 +36,7 @@ def lista_ventas(request):
     except ValueError:
         per_page = 10
 
-    ventas = Venta.objects.all()
+    ventas = Venta.objects.select_related('cliente')
 
     if estado:
         ventas = ventas.filter(estado=estado)
@@ -34,19 +47,9 @@ def lista_ventas(request):
             Q(cliente__rut__icontains=query)
         )
 
-    ventas = ventas.annotate(
-        total_calc=Sum(
-            F('detalleventa__producto__precio') * F('detalleventa__cantidad'),
-            output_field=FloatField()
-        )
-    )
-
-    sort_field = 'total_calc' if sort == 'total' else sort
-    ventas = ventas.order_by(f"-{sort_field}" if direction == "desc" else sort_field)
+    ventas = ventas.order_by(f"-{sort}" if direction == "desc" else sort)
 
-    paginator = Paginator(ventas, per_page)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginar(request, ventas, sort, direction, per_page, CAMPOS_CURSOR_VENTAS)
 
     next_direction = "desc" if direction == "asc" else "asc"
     rangos_pagina = [5, 10, 20, 50]
@@ -61,14 +64,12 @@ def lista_ventas(request):
         'next_direction': next_direction,
         'per_page': per_page,
         'rangos_pagina': rangos_pagina,
-        "total_ventas": Venta.objects.count(),
-        "ventas_completadas": Venta.objects.filter(estado="COMPLETED").count(),
-        "ventas_pendientes": Venta.objects.filter(estado="PENDING").count(),
-        "ventas_canceladas": Venta.objects.filter(estado="CANCELLED").count(),
+        **contadores_ventas(),
     })
 
 @login_required
-def lista_ventas_ajax(request):
+async def lista_ventas_ajax(request):
+    await ausuario(request)
     query = request.GET.get('q', '')
     estado = request.GET.get('estado', '')
     sort = request.GET.get('sort', 'fecha')
@@ -79,7 +80,7 @@ def lista_ventas_ajax(request):
     except ValueError:
         per_page = 10
 
-    ventas = Venta.objects.all()
+    ventas = Venta.objects.select_related('cliente')
 
     # filtros
     if estado:
@@ -97,31 +98,26 @@ def lista_ventas_ajax(request):
     fecha_inicio = request.GET.get('fecha_inicio')
     fecha_fin = request.GET.get('fecha_fin')
 
-    ventas = ventas.annotate(
-        total_calc=Sum(F('detalleventa__producto__precio')*F('detalleventa__cantidad'), output_field=FloatField())
-    )
-
     if min_total:
         try:
-            ventas = ventas.filter(total_calc__gte=float(min_total))
+            ventas = ventas.filter(total__gte=float(min_total))
         except:
             pass
     if max_total:
         try:
-            ventas = ventas.filter(total_calc__lte=float(max_total))
+            ventas = ventas.filter(total__lte=float(max_total))
         except:
             pass
+    fecha_inicio = _parse_fecha(fecha_inicio)
+    fecha_fin = _parse_fecha(fecha_fin)
     if fecha_inicio:
-        ventas = ventas.filter(fecha__date__gte=fecha_inicio)
+        ventas = ventas.filter(fecha__gte=rango_fechas(fecha_inicio, fecha_inicio)[0])
     if fecha_fin:
-        ventas = ventas.filter(fecha__date__lte=fecha_fin)
+        ventas = ventas.filter(fecha__lt=rango_fechas(fecha_fin, fecha_fin)[1])
 
-    sort_field = 'total_calc' if sort == 'total' else sort
-    ventas = ventas.order_by(f"-{sort_field}" if direction == "desc" else sort_field)
+    ventas = ventas.order_by(f"-{sort}" if direction == "desc" else sort)
 
-    paginator = Paginator(ventas, per_page)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    page_obj = await apaginar(request, ventas, sort, direction, per_page, CAMPOS_CURSOR_VENTAS)
 
     html = render_to_string("ventas/_tabla_ventas.html", {
         'page_obj': page_obj,
@@ -144,7 +140,8 @@ def detalle_venta(request, venta_id):
 def eliminar_venta(request, venta_id):
     if request.method == 'POST':
         venta = get_object_or_404(Venta, id=venta_id)
-        venta.delete()
+        with sincronizar_resumen([venta.id]):
+            venta.delete()
         return JsonResponse({'success': True})
     return JsonResponse({'success': False})
 
@@ -154,7 +151,8 @@ def eliminar_multiples(request):
     if request.method == 'POST':
         data = json.loads(request.body)
         ids = data.get('ids', [])
-        Venta.objects.filter(id__in=ids).delete()
+        with sincronizar_resumen(ids):
+            Venta.objects.filter(id__in=ids).delete()
         return JsonResponse({'success': True})
     return JsonResponse({'success': False})
 
@@ -167,39 +165,16 @@ def cambiar_estado_multiples(request):
         nuevo_estado = data.get('nuevo_estado')
         if nuevo_estado not in ['PENDING', 'COMPLETED', 'CANCELLED']:
             return JsonResponse({'success': False, 'error': 'Estado inválido'})
-        Venta.objects.filter(id__in=ids).update(estado=nuevo_estado)
+        with sincronizar_resumen(ids):
+            Venta.objects.filter(id__in=ids).update(estado=nuevo_estado)
+            # update() no dispara post_save
+            invalidar_contadores('ventas')
         return JsonResponse({'success': True})
     return JsonResponse({'success': False})
 
 @login_required
 def exportar_ventas_excel(request):
-
-    ventas = Venta.objects.annotate(
-        total_calc=Sum(F('detalleventa__producto__precio') * F('detalleventa__cantidad'), output_field=FloatField())
-    )
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Ventas"
-
-    ws.append(["ID", "Usuario", "Cliente", "Fecha", "Estado", "Total"])
-
-    for v in ventas:
-        ws.append([
-            v.id,
-            v.usuario.username,
-            v.cliente.nombre_completo if v.cliente else "-",
-            v.fecha.strftime("%Y-%m-%d %H:%M"),
-            v.get_estado_display(),
-            float(v.total_calc or 0)
-        ])
-
-    response = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
-    response["Content-Disposition"] = 'attachment; filename="ventas.xlsx"'
-    wb.save(response)
-    return response
+    return exportar(request, "ventas", "Ventas", *filas_ventas())
 
 @csrf_exempt
 @login_required
@@ -211,8 +186,9 @@ def cambiar_estado(request, venta_id):
         if nuevo_estado not in ['PENDING', 'COMPLETED', 'CANCELLED', 'CART']:
             return redirect('detalle_venta', venta_id=venta.id)
 
-        venta.estado = nuevo_estado
-        venta.save()
+        with sincronizar_resumen([venta.id]):
+            venta.estado = nuevo_estado
+            venta.save()
 
         return redirect('detalle_venta', venta_id=venta.id)
     